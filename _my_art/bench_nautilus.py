@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+"""
+Benchmark the vectorized nautilus generator against the original
+point-by-point implementation. That both give identical output is checked by
+test/test_axicli/test_nautilus.py.
+
+Usage:
+  python _my_art/bench_nautilus.py [repeats]
+"""
+import math
+import sys
+import timeit
+
+from nautilus import generate_nautilus_with_crossbeams
+
+# Parameters used by make_sonar.generate_painting, and a smaller shell:
+CASES = [
+  (150, 100, 295, 295, 3, 0.19, 0.9, 15000, 15*math.pi, 0.2),
+  (150, 100, 295, 295, 10, 0.12, 0.95, 500, 6*math.pi, 0.2),
+]
+
+def reference_nautilus_with_crossbeams(center_x, center_y, canvas_width, canvas_height, a=1, b=0.15, taper=0.9, num_points=1000, max_theta=4*math.pi, beam_curvature=0.3, beam_segments=19):
+  """
+  Generate a nautilus shell with an inner spiral, outer spiral, and connecting crossbeams.
+
+  Parameters:
+  - center_x, center_y: Center of the shell.
+  - canvas_width, canvas_height: Dimensions of the drawing canvas.
+  - a: Initial scaling factor for the spirals.
+  - b: Growth rate of the spirals (controls how fast they expand).
+  - taper: Tapering factor to decrease size outward (0 < taper <= 1).
+  - num_points: Number of points to generate for the spirals.
+  - max_theta: Maximum angle for the spirals in radians.
+  - beam_curvature: Curvature factor for the crossbeams.
+
+  Returns:
+  - A dictionary with:
+    - 'inner_spiral': List of (x, y) points for the inner spiral.
+    - 'outer_spiral': List of (x, y) points for the outer spiral.
+    - 'crossbeams': List of beam paths, where each beam is a list of (x, y) points.
+  """
+  golden_ratio = (1 + math.sqrt(5)) / 2  # Golden ratio
+  inner_spiral = []
+  outer_spiral = []
+  crossbeams = []
+
+  last_beam_inner = None  # Tracks the last inner spiral position to enforce spacing
+
+  for i in range(num_points):
+    theta = i * max_theta / num_points  # Increment angle
+    r_inner = a * golden_ratio**(b * theta) * taper**(theta / max_theta)  # Inner spiral
+    r_outer = r_inner * 1.5  # Slightly larger radius for outer spiral
+
+    # Compute inner and outer spiral points
+    x_inner = center_x + r_inner * math.cos(theta)
+    y_inner = center_y + r_inner * math.sin(theta)
+    x_outer = center_x + r_outer * math.cos(theta)
+    y_outer = center_y + r_outer * math.sin(theta)
+
+    inner_spiral.append((x_inner, y_inner))
+    outer_spiral.append((x_outer, y_outer))
+
+    # Calculate beam length (distance between inner and outer endpoints)
+    beam_length = math.sqrt((x_outer - x_inner)**2 + (y_outer - y_inner)**2)
+
+    # Enforce spacing based on the inner spiral points
+    if last_beam_inner:
+      distance_to_last_inner = math.sqrt((x_inner - last_beam_inner[0])**2 + (y_inner - last_beam_inner[1])**2)
+      if distance_to_last_inner < beam_length:
+        continue  # Skip adding this beam if spacing is insufficient
+
+    beam_curve = []
+    for t in range(beam_segments + 1):  # Generate beam_segments points along the curve
+      t /= beam_segments  # Normalize t to [0, 1]
+      # Quadratic Bézier formula:
+      # B(t) = (1-t)^2 * P0 + 2*(1-t)*t * P1 + t^2 * P2
+      bx = (1 - t)**2 * x_inner + 2 * (1 - t) * t * (x_inner + beam_curvature * (y_outer - y_inner)) + t**2 * x_outer
+      by = (1 - t)**2 * y_inner + 2 * (1 - t) * t * (y_inner - beam_curvature * (x_outer - x_inner)) + t**2 * y_outer
+      beam_curve.append((bx, by))
+
+    crossbeams.append(beam_curve)  # Add the full curve to the crossbeams list
+    last_beam_inner = (x_inner, y_inner)
+
+  return {
+    'inner_spiral': inner_spiral,
+    'outer_spiral': outer_spiral,
+    'crossbeams': crossbeams
+  }
+
+def main():
+  repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+  for case in CASES:
+    vectorized = generate_nautilus_with_crossbeams(*case)
+    reference_time = min(timeit.repeat(lambda: reference_nautilus_with_crossbeams(*case),
+      number=1, repeat=repeats))
+    vectorized_time = min(timeit.repeat(lambda: generate_nautilus_with_crossbeams(*case),
+      number=1, repeat=repeats))
+    print(f"num_points={case[7]}, beams={len(vectorized['crossbeams'])}")
+    print(f"  reference:         {reference_time * 1000:.2f} ms")
+    print(f"  vectorized:        {vectorized_time * 1000:.2f} ms")
+    print(f"  speedup:           {reference_time / vectorized_time:.1f}x")
+
+if __name__ == '__main__':
+  main()
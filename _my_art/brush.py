@@ -0,0 +1,194 @@
+#!/usr/bin/env python
+"""
+Paint-load model and reload scheduler for brush jobs.
+
+A loaded brush paints a limited pen-down distance before it runs dry. Given
+the strokes of a job and one or more paint-well positions, the scheduler
+decides where to go back for paint so that no stretch between reloads is
+longer than one load, while adding as little extra time as possible.
+
+Reloads are only placed between strokes, or at evenly spaced split points
+inside strokes that are too long for a single load.
+
+All distances are in the units of the stroke coordinates (typically mm).
+"""
+import collections
+
+import numpy as np
+
+
+def stroke_lengths(points):
+  """
+  Return the cumulative pen-down distance along a stroke, one value per vertex.
+  """
+  points = np.asarray(points, dtype=float)
+  if len(points) < 2:
+    return np.zeros(len(points))
+  segments = np.hypot(*np.diff(points, axis=0).T)
+  return np.concatenate(([0.0], np.cumsum(segments)))
+
+
+def _split_stroke(points, max_length):
+  """
+  Split one stroke into consecutive pieces no longer than max_length,
+  inserting a new vertex at each split distance.
+  """
+  points = np.asarray(points, dtype=float)
+  cumulative = stroke_lengths(points)
+  total = cumulative[-1]
+  count = int(np.ceil(total / max_length))
+  if count <= 1:
+    return [points]
+  cuts = total * np.arange(1, count) / count
+  cut_points = np.column_stack((np.interp(cuts, cumulative, points[:, 0]),
+                                np.interp(cuts, cumulative, points[:, 1])))
+  # Vertices strictly between consecutive cuts belong to the piece between them
+  inner_start = np.searchsorted(cumulative, np.concatenate(([0.0], cuts)), side='right')
+  inner_end = np.searchsorted(cumulative, np.concatenate((cuts, [total])), side='left')
+  ends = np.vstack((points[:1], cut_points, points[-1:]))
+  pieces = []
+  for index in range(count):
+    pieces.append(np.vstack((ends[index], points[inner_start[index]:inner_end[index]],
+      ends[index + 1])))
+  return pieces
+
+
+class PaintLoad:
+  """
+  How far a brush paints on one load of paint, and where it can be reloaded.
+
+  Parameters:
+  - distance_per_load: Pen-down distance that one load of paint covers.
+  - wells: A list of (x, y) paint-well positions.
+  - dip_time: Time taken by one dip in a well, in seconds.
+  - travel_speed: Average pen-up travel speed, in distance units per second.
+  - split_fraction: Strokes longer than one load are split into pieces of at
+    most this fraction of a load, giving the scheduler points to reload at.
+  """
+
+  def __init__(self, distance_per_load, wells, dip_time=3.0, travel_speed=100.0,
+      split_fraction=0.25):
+    if distance_per_load <= 0:
+      raise ValueError("distance_per_load must be positive.")
+    if not wells:
+      raise ValueError("At least one paint well is required.")
+    self.distance_per_load = distance_per_load
+    self.wells = np.asarray(wells, dtype=float).reshape(-1, 2)
+    self.dip_time = dip_time
+    self.travel_speed = travel_speed
+    self.split_fraction = split_fraction
+
+  def _pieces(self, strokes):
+    """ Split strokes that do not fit in one load; return pieces and stroke indices """
+    pieces = []
+    owners = []
+    for index, stroke in enumerate(strokes):
+      if len(stroke) < 2:
+        continue
+      points = np.asarray(stroke, dtype=float)
+      if stroke_lengths(points)[-1] > self.distance_per_load:
+        split = _split_stroke(points, self.distance_per_load * self.split_fraction)
+      else:
+        split = [points]
+      pieces.extend(split)
+      owners.extend([index] * len(split))
+    return pieces, owners
+
+  def _reload_costs(self, pieces, start):
+    """
+    Time (s) added by reloading right before each piece, and the best well for it.
+    The detour replaces the direct move from the previous end point.
+    """
+    starts = np.array([piece[0] for piece in pieces])
+    ends = np.array([piece[-1] for piece in pieces])
+    previous = np.vstack((np.asarray(start, dtype=float), ends[:-1]))
+    to_well = np.linalg.norm(previous[:, None, :] - self.wells[None, :, :], axis=2)
+    from_well = np.linalg.norm(starts[:, None, :] - self.wells[None, :, :], axis=2)
+    via_well = to_well + from_well
+    best_well = np.argmin(via_well, axis=1)
+    detour = via_well[np.arange(len(pieces)), best_well] -\
+      np.linalg.norm(starts - previous, axis=1)
+    return self.dip_time + detour / self.travel_speed, detour, best_well
+
+  def _plan(self, strokes, start):
+    """
+    Choose reload points. Dynamic program over pieces: best[j] is the least
+    added time for a schedule that reloads right before piece j; the previous
+    reload must lie within one load of pen-down distance. A sliding-window
+    minimum keeps this linear in the number of pieces.
+    """
+    pieces, owners = self._pieces(strokes)
+    if not pieces:
+      return [], [], [], np.zeros(0), np.zeros(0), np.zeros(0, dtype=int)
+    costs, detours, wells = self._reload_costs(pieces, start)
+    lengths = np.array([stroke_lengths(piece)[-1] for piece in pieces])
+    before = np.concatenate(([0.0], np.cumsum(lengths))) # Pen-down distance before piece j
+    capacity = self.distance_per_load * (1 + 1e-9)
+
+    count = len(pieces)
+    best = np.zeros(count)
+    parent = np.full(count, -1)
+    window = collections.deque() # Candidate previous reloads, increasing best[]
+    best[0] = costs[0] # The brush starts dry
+    window.append(0)
+    for j in range(1, count):
+      while before[j] - before[window[0]] > capacity:
+        window.popleft()
+      parent[j] = window[0]
+      best[j] = costs[j] + best[window[0]]
+      while window and best[window[-1]] >= best[j]:
+        window.pop()
+      window.append(j)
+
+    finals = np.nonzero(before[-1] - before[:-1] <= capacity)[0]
+    last = int(finals[np.argmin(best[finals])])
+    reloads = []
+    while last >= 0:
+      reloads.append(last)
+      last = int(parent[last])
+    reloads.reverse()
+    return pieces, owners, reloads, costs, detours, wells
+
+  def schedule(self, strokes, start=(0, 0)):
+    """
+    Plan a brush job.
+
+    Parameters:
+    - strokes: A list of strokes, each a list of (x, y) points, in painting order.
+    - start: The (x, y) position of the brush before the job starts.
+
+    Returns:
+    - A list of steps in execution order, each either
+      ('reload', (x, y)) for a dip in the paint well at (x, y), or
+      ('stroke', points) for a pen-down stroke, points being a list of [x, y].
+    """
+    pieces, owners, reloads, _costs, _detours, wells = self._plan(strokes, start)
+    reload_set = set(reloads)
+    steps = []
+    for index, piece in enumerate(pieces):
+      if index in reload_set:
+        steps.append(('reload', tuple(self.wells[wells[index]])))
+      elif steps and steps[-1][0] == 'stroke' and owners[index] == owners[index - 1]:
+        steps[-1] = ('stroke', steps[-1][1] + piece[1:].tolist()) # Rejoin split stroke
+        continue
+      steps.append(('stroke', piece.tolist()))
+    return steps
+
+  def simulate(self, strokes, start=(0, 0)):
+    """
+    Estimate the cost of reloading for a brush job, without running it.
+
+    Returns:
+    - A dict with:
+      - 'reloads': Number of dips in a paint well.
+      - 'pendown_distance': Total pen-down distance of the job.
+      - 'added_travel': Extra pen-up travel caused by going to the wells.
+      - 'reload_time': Time spent on reloads (dips and extra travel), in seconds.
+    """
+    pieces, _owners, reloads, costs, detours, _wells = self._plan(strokes, start)
+    return {
+      'reloads': len(reloads),
+      'pendown_distance': float(sum(stroke_lengths(piece)[-1] for piece in pieces)),
+      'added_travel': float(np.sum(detours[reloads])) if reloads else 0.0,
+      'reload_time': float(np.sum(costs[reloads])) if reloads else 0.0,
+    }
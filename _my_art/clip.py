@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+"""
+Batched rectangle clipping for generated strokes.
+
+clip_polylines clips every segment of every polyline against a rectangle at
+once (Liang-Barsky), then joins the visible pieces back into strokes. Where a
+polyline leaves the rectangle, the stroke ends exactly on the edge, and a new
+stroke starts where the polyline comes back in. Nothing is drawn across the
+part outside of the rectangle.
+
+All coordinates are in the same units as the rectangle (typically mm).
+"""
+import numpy as np
+
+
+def clip_segments(starts, ends, box):
+  """
+  Liang-Barsky clipping of many segments against one rectangle.
+
+  Parameters:
+  - starts, ends: (n, 2) arrays of segment start and end points.
+  - box: The rectangle (min_x, min_y, max_x, max_y).
+
+  Returns:
+  - A tuple (t_enter, t_exit, visible) of (n,) arrays: the visible part of
+    segment i runs from start + t_enter * (end - start) to
+    start + t_exit * (end - start), where visible[i] is True.
+  """
+  min_x, min_y, max_x, max_y = box
+  delta = ends - starts
+  p = np.stack((-delta[:, 0], delta[:, 0], -delta[:, 1], delta[:, 1]), axis=1)
+  q = np.stack((starts[:, 0] - min_x, max_x - starts[:, 0],
+    starts[:, 1] - min_y, max_y - starts[:, 1]), axis=1)
+  with np.errstate(divide='ignore', invalid='ignore'):
+    ratio = q / p
+  t_enter = np.max(np.where(p < 0, ratio, 0.0), axis=1, initial=0.0)
+  t_exit = np.min(np.where(p > 0, ratio, 1.0), axis=1, initial=1.0)
+  parallel_outside = np.any((p == 0) & (q < 0), axis=1)
+  visible = (t_enter <= t_exit) & ~parallel_outside
+  return t_enter, t_exit, visible
+
+
+def clip_polylines(polylines, box):
+  """
+  Clip polylines to a rectangle, splitting them where they leave it.
+
+  Parameters:
+  - polylines: A list of polylines, each a list of (x, y) points.
+  - box: The rectangle (min_x, min_y, max_x, max_y).
+
+  Returns:
+  - A list of strokes inside the rectangle, each a list of (x, y) points, in
+    the order of the input.
+  """
+  arrays = [np.asarray(line, dtype=float).reshape(-1, 2) for line in polylines]
+  arrays = [line for line in arrays if len(line) >= 2]
+  if not arrays:
+    return []
+  points = np.concatenate(arrays)
+  counts = np.array([len(line) for line in arrays])
+  line_starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+
+  # Segments run from point i to point i + 1, except across polylines
+  segment = np.ones(len(points) - 1, dtype=bool)
+  segment[line_starts[1:] - 1] = False
+  index = np.nonzero(segment)[0]
+  starts = points[index]
+  ends = points[index + 1]
+  t_enter, t_exit, visible = clip_segments(starts, ends, box)
+
+  # A visible segment continues the previous stroke if it follows on from a
+  # visible segment of the same polyline without leaving the rectangle.
+  first = np.zeros(len(index), dtype=bool)
+  first[np.searchsorted(index, line_starts)] = True
+  continues = np.zeros(len(index), dtype=bool)
+  continues[1:] = ~first[1:] & visible[:-1] & (t_exit[:-1] >= 1.0) & (t_enter[1:] <= 0.0)
+
+  kept = np.nonzero(visible)[0]
+  delta = ends[kept] - starts[kept]
+  entry = starts[kept] + t_enter[kept, None] * delta
+  exit_point = starts[kept] + t_exit[kept, None] * delta
+  new_stroke = ~continues[kept]
+
+  stroke_starts = np.nonzero(new_stroke)[0]
+  strokes = []
+  for first_entry, exits in zip(entry[stroke_starts].tolist(), np.split(exit_point, stroke_starts[1:])):
+    stroke = [tuple(first_entry)] + list(map(tuple, exits.tolist()))
+    if len(stroke) > 2 or stroke[0] != stroke[1]: # Skip strokes that only touch an edge
+      strokes.append(stroke)
+  return strokes
@@ -0,0 +1,290 @@
+#!/usr/bin/env python
+"""
+Fill generators for polygons painted with a brush.
+
+Two fill modes are provided:
+- scanline_fill: Horizontal hatching, one stroke per scan line segment.
+- contour_fill: Contour-parallel fill; the polygon is inset repeatedly by the
+  brush width and each ring is painted as one closed stroke. Consecutive rings
+  are linked inward so that most of the fill is a single continuous spiral.
+
+All coordinates are in the same units as the polygon vertices (typically mm).
+"""
+import numpy as np
+
+EPSILON = 1e-9
+
+
+def scanline_fill(vertices, brush_diameter):
+  """
+  Fill a polygon with horizontal scan lines, spaced by the brush diameter.
+
+  Parameters:
+  - vertices: A list of (x, y) vertices of a simple polygon.
+  - brush_diameter: Diameter of the brush used for filling the polygon.
+
+  Returns:
+  - A list of filling paths (each path is a list of two (x, y) points).
+  """
+  fill_paths = []
+  min_y = min(v[1] for v in vertices)
+  max_y = max(v[1] for v in vertices)
+  current_y = min_y
+
+  while current_y <= max_y:
+    path = []
+    for i in range(len(vertices)):
+      # Get the current and next vertex
+      v1 = vertices[i]
+      v2 = vertices[(i + 1) % len(vertices)]
+
+      # Check if the current scan line intersects this edge
+      if (v1[1] <= current_y <= v2[1]) or (v2[1] <= current_y <= v1[1]):
+        # Calculate the intersection point
+        if v1[1] != v2[1]:  # Avoid division by zero
+          t = (current_y - v1[1]) / (v2[1] - v1[1])
+          intersect_x = v1[0] + t * (v2[0] - v1[0])
+          path.append(intersect_x)
+
+    # Sort intersection points and pair them
+    if len(path) >= 2:
+      path.sort()
+      for i in range(0, len(path) - 1, 2):
+        fill_paths.append([(path[i], current_y), (path[i + 1], current_y)])
+
+    current_y += brush_diameter  # Move to the next line
+
+  return fill_paths
+
+
+def _signed_area(points):
+  """Shoelace signed area of one (n, 2) ring, or of a (k, n, 2) stack of rings."""
+  x = points[..., 0]
+  y = points[..., 1]
+  return 0.5 * np.sum(x * np.roll(y, -1, axis=-1) - np.roll(x, -1, axis=-1) * y, axis=-1)
+
+
+def _miter_vectors(polygon):
+  """
+  Return the per-vertex offset direction of a counter-clockwise polygon.
+
+  Moving vertex i by t * miter[i] offsets both of its adjacent edges inward
+  by exactly t, so a whole family of inset rings is polygon + t * miter.
+  Also return the rate at which each edge length changes with t.
+  """
+  edges = np.roll(polygon, -1, axis=0) - polygon
+  tangents = edges / np.linalg.norm(edges, axis=1)[:, None]
+  normals = np.column_stack((-tangents[:, 1], tangents[:, 0])) # Inward, for CCW polygons
+  normals_prev = np.roll(normals, 1, axis=0)
+  denominator = np.maximum(1 + np.sum(normals * normals_prev, axis=1), EPSILON)
+  miter = (normals + normals_prev) / denominator[:, None]
+  rates = np.sum((np.roll(miter, -1, axis=0) - miter) * tangents, axis=1)
+  return miter, rates
+
+
+def _self_intersecting(rings):
+  """
+  Vectorized check over a (k, n, 2) stack of rings: True where a ring crosses itself.
+  Adjacent edges (which share a vertex) are not compared.
+  """
+  start = rings
+  end = np.roll(rings, -1, axis=1)
+  p = start[:, :, None, :]
+  r = (end - start)[:, :, None, :]
+  q = start[:, None, :, :]
+  s = (end - start)[:, None, :, :]
+  qp = q - p
+  r_cross_s = r[..., 0] * s[..., 1] - r[..., 1] * s[..., 0]
+  with np.errstate(divide='ignore', invalid='ignore'):
+    t = (qp[..., 0] * s[..., 1] - qp[..., 1] * s[..., 0]) / r_cross_s
+    u = (qp[..., 0] * r[..., 1] - qp[..., 1] * r[..., 0]) / r_cross_s
+  crossing = (t > EPSILON) & (t < 1 - EPSILON) & (u > EPSILON) & (u < 1 - EPSILON)
+  count = rings.shape[1]
+  index = np.arange(count)
+  separation = np.abs(index[:, None] - index[None, :])
+  non_adjacent = (separation > 1) & (separation < count - 1)
+  return np.any(crossing & non_adjacent, axis=(1, 2))
+
+
+def _split_pieces(polygon, offset):
+  """
+  Inset a polygon by offset with pyclipper, returning the resulting simple
+  polygons. Used only at split events, where an inset polygon falls apart
+  into several pieces. Return None if pyclipper is not available.
+  """
+  try:
+    # pyclipper is a non-pure Python dependency (installed with axidrawinternal
+    # for hidden-line removal), so only import it when necessary.
+    import pyclipper
+  except ImportError:
+    return None
+  offsetter = pyclipper.PyclipperOffset(miter_limit=100)
+  offsetter.AddPath(pyclipper.scale_to_clipper(polygon.tolist()),
+    pyclipper.JT_MITER, pyclipper.ET_CLOSEDPOLYGON)
+  pieces = pyclipper.scale_from_clipper(offsetter.Execute(pyclipper.scale_to_clipper(-offset)))
+  return [np.asarray(piece, dtype=float) for piece in pieces if len(piece) >= 3]
+
+
+def _inset_until_split(polygon, spacing, first_offset, max_rings):
+  """
+  Vectorized inset of a counter-clockwise polygon, up to the first split event.
+
+  Between topology changes, every ring is an affine function of the offset
+  distance (polygon + t * miter), so all rings up to the next edge collapse
+  are produced in one array operation. When an edge shrinks to zero length it
+  is removed and the offset directions are recomputed, which happens at most
+  once per polygon vertex.
+
+  Return the rings and the offset at which the polygon splits, or None.
+  """
+  rings = []
+  base = 0.0 # Inset distance of the current polygon
+  next_offset = first_offset
+
+  while len(rings) < max_rings:
+    # Drop degenerate edges left over from the previous collapse event
+    edge_lengths = np.linalg.norm(np.roll(polygon, -1, axis=0) - polygon, axis=1)
+    polygon = polygon[edge_lengths > EPSILON * max(1.0, spacing)]
+    if len(polygon) < 3 or _signed_area(polygon) <= EPSILON:
+      break
+
+    miter, rates = _miter_vectors(polygon)
+    edge_lengths = np.linalg.norm(np.roll(polygon, -1, axis=0) - polygon, axis=1)
+    shrinking = rates < -EPSILON
+    if not np.any(shrinking):
+      break # Cannot happen for a bounded polygon; guard against numerical trouble
+    collapse = np.full(len(polygon), np.inf)
+    collapse[shrinking] = -edge_lengths[shrinking] / rates[shrinking]
+    event = float(np.min(collapse))
+
+    # All ring offsets that fall before the next collapse event:
+    count = int(np.floor((base + event - next_offset) / spacing)) + 1
+    count = min(max(count, 0), max_rings - len(rings))
+    if count > 0:
+      offsets = next_offset + spacing * np.arange(count) - base
+      batch = polygon[None, :, :] + offsets[:, None, None] * miter[None, :, :]
+      valid = (_signed_area(batch) > -EPSILON) & ~_self_intersecting(batch)
+      split = not np.all(valid)
+      if split:
+        count = int(np.argmin(valid)) # Keep rings before the first invalid one
+        batch = batch[:count]
+      perimeters = np.sum(np.linalg.norm(np.roll(batch, -1, axis=1) - batch, axis=2), axis=1)
+      closed = np.concatenate((batch, batch[:, :1]), axis=1)
+      rings.extend(closed[perimeters > EPSILON * spacing]) # Skip rings shrunk to a point
+      next_offset += spacing * count
+      if split:
+        return rings, next_offset
+
+    # Advance to the collapse event and remove the collapsed edges
+    polygon = polygon + event * miter
+    base += event
+    if _self_intersecting(polygon[None])[0]:
+      return rings, next_offset
+
+  return rings, None
+
+
+def inset_rings(vertices, spacing, first_offset=None, max_rings=1000):
+  """
+  Repeatedly inset a simple polygon, returning one closed ring per inset step.
+
+  Most of the work is vectorized; see _inset_until_split. When a reflex vertex
+  reaches an opposite edge, the polygon splits in two. The pieces are then
+  computed with pyclipper and each is inset in turn.
+
+  Parameters:
+  - vertices: A list of (x, y) vertices of a simple polygon, either orientation.
+  - spacing: Distance between consecutive rings.
+  - first_offset: Inset distance of the first ring. Defaults to spacing.
+  - max_rings: Upper limit on the number of rings returned.
+
+  Returns:
+  - A tuple containing:
+    - A list of closed rings, in painting order; each an (n, 2) array whose
+      last vertex repeats the first.
+    - A list of polygons left unfilled, because they could not be split
+      without pyclipper. Empty in the normal case.
+  """
+  polygon = np.asarray(vertices, dtype=float)
+  if len(polygon) > 1 and np.allclose(polygon[0], polygon[-1]):
+    polygon = polygon[:-1] # Drop duplicate closing vertex
+  if len(polygon) < 3:
+    return [], []
+  if _signed_area(polygon) < 0:
+    polygon = polygon[::-1] # Work in counter-clockwise order
+  if first_offset is None:
+    first_offset = spacing
+
+  rings, split_offset = _inset_until_split(polygon, spacing, first_offset, max_rings)
+  if split_offset is None or len(rings) >= max_rings:
+    return rings, []
+
+  pieces = _split_pieces(polygon, split_offset)
+  if pieces is None:
+    return rings, [rings[-1][:-1] if rings else polygon]
+
+  unfilled = []
+  for piece in pieces:
+    piece_rings, piece_unfilled = inset_rings(piece, spacing, 0, max_rings - len(rings))
+    rings.extend(piece_rings)
+    unfilled.extend(piece_unfilled)
+  return rings, unfilled
+
+
+def link_rings(rings, max_gap):
+  """
+  Join consecutive closed rings into continuous strokes.
+
+  Each ring is rotated to start at its vertex closest to where the previous
+  ring ended, and appended to the same stroke if that connecting step is no
+  longer than max_gap. Otherwise a new stroke (pen lift) is started.
+
+  Parameters:
+  - rings: A list of closed (n, 2) rings, outermost first.
+  - max_gap: Longest pen-down connector allowed between rings.
+
+  Returns:
+  - A list of strokes, each a list of [x, y] points.
+  """
+  strokes = []
+  current = None
+  for ring in rings:
+    loop = ring[:-1]
+    if current is None:
+      current = [ring]
+      continue
+    end = current[-1][-1]
+    distances = np.hypot(loop[:, 0] - end[0], loop[:, 1] - end[1])
+    start = int(np.argmin(distances))
+    rotated = np.vstack((np.roll(loop, -start, axis=0), loop[start:start + 1]))
+    if distances[start] <= max_gap:
+      current.append(rotated)
+    else:
+      strokes.append(current)
+      current = [rotated]
+  if current is not None:
+    strokes.append(current)
+  return [np.vstack(parts).tolist() for parts in strokes]
+
+
+def contour_fill(vertices, brush_diameter):
+  """
+  Fill a polygon with contour-parallel rings, spaced by the brush diameter.
+
+  The first ring is inset by one brush diameter, so it sits right inside the
+  painted outline. Rings are linked inward into a continuous spiral wherever
+  the step between rings is short. Should a split polygon be left unfilled
+  (pyclipper not installed), the remaining core is filled with scan lines.
+
+  Parameters:
+  - vertices: A list of (x, y) vertices of a simple polygon.
+  - brush_diameter: Diameter of the brush used for filling the polygon.
+
+  Returns:
+  - A list of filling paths (each path is a list of (x, y) points).
+  """
+  rings, unfilled = inset_rings(vertices, brush_diameter)
+  fill_paths = link_rings(rings, 2 * brush_diameter)
+  for core in unfilled:
+    fill_paths.extend(scanline_fill(core.tolist(), brush_diameter))
+  return fill_paths
@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+"""
+Curve sampling for the generated artwork, by arc length and chord error.
+
+Sampling a curve at constant angle puts far too many points where the curve is
+tight or short (the center of a spiral, small circles) and too few where it is
+long. Here, each curve is sampled so that the chord between two consecutive
+points deviates from the true curve by at most a given tolerance. The spacing
+of points along the curve then follows the local radius of curvature.
+
+The default tolerance is a few motor steps: finer detail than that cannot be
+reproduced by the plotter anyway.
+
+All distances are in millimeters.
+"""
+import math
+
+import numpy as np
+
+# Longest distance covered by one motor step, in mm (16X microstepping, diagonal move)
+STEP_SIZE = 0.000348 * 25.4
+
+# Default chord error: a few motor steps, well below the width of any pen or brush line
+TOLERANCE = 4 * STEP_SIZE
+
+
+def chord_angle(radius, tolerance=TOLERANCE):
+  """
+  Return the angle subtended by the longest chord of a circular arc of the given
+  radius, whose distance to the arc (sagitta) is no more than tolerance.
+  Capped at a quarter turn, so that small curves keep at least a few points.
+  """
+  ratio = np.clip(1 - tolerance / np.maximum(radius, 1e-12), 0.0, 1.0)
+  return np.minimum(2 * np.arccos(ratio), math.pi / 2)
+
+
+def sample_by_arc_length(speed, curvature_radius, start, stop, tolerance=TOLERANCE, grid=4096):
+  """
+  Choose parameter values along a parametric curve, spaced by the longest arc
+  that keeps the chord error within tolerance.
+
+  The number of segments needed per unit of parameter is speed / step, where
+  step = radius * chord_angle(radius) is the arc length allowed at the local
+  radius of curvature. This density is integrated over a fine parameter grid,
+  and the parameter values are found where the running segment count reaches
+  each whole number. The chord error of an arc depends on its tightest
+  curvature, so this is done twice: the second time, the density over each
+  segment of the first pass uses the smallest radius within that segment.
+
+  Parameters:
+  - speed: Function of a parameter array, returning |dP/dt| (arc length per unit of t).
+  - curvature_radius: Function of a parameter array, returning the radius of curvature.
+  - start, stop: Parameter range.
+  - tolerance: Largest allowed chord error.
+  - grid: Number of intervals in the integration grid.
+
+  Returns:
+  - Array of parameter values, including start and stop.
+  """
+  t = np.linspace(start, stop, grid + 1)
+  radius = curvature_radius(t)
+  speeds = speed(t)
+
+  def place(radius):
+    density = speeds / (radius * chord_angle(radius, tolerance))
+    segments = np.concatenate(([0.0], np.cumsum(0.5 * (density[1:] + density[:-1]) * np.diff(t))))
+    count = max(int(math.ceil(segments[-1])), 1)
+    return np.interp(np.linspace(0.0, segments[-1], count + 1), segments, t)
+
+  samples = place(radius)
+  # Grid points from each sample up to (and including) the next one form a segment
+  first = np.minimum(np.searchsorted(t, samples[:-1], side='right') - 1, grid - 1)
+  segment_min = np.minimum.reduceat(radius, first)
+  last = np.searchsorted(t, samples[1:], side='left')
+  segment_min = np.minimum(segment_min, radius[np.minimum(last, grid)])
+  owner = np.searchsorted(samples[1:-1], t, side='right') # Segment of each grid point
+  return place(np.minimum(radius, segment_min[owner]))
+
+
+def circle_points(center_x, center_y, radius, tolerance=TOLERANCE):
+  """
+  Generate a closed circle with evenly spaced points, as few as the tolerance allows.
+
+  Returns:
+  - (n + 1, 2) array of points; the last point repeats the first.
+  """
+  count = max(int(math.ceil(2 * math.pi / chord_angle(radius, tolerance))), 4)
+  theta = 2 * math.pi * np.arange(count + 1) / count
+  theta[-1] = 0.0 # Close exactly on the first point
+  return np.column_stack((center_x + radius * np.cos(theta), center_y + radius * np.sin(theta)))
+
+
+def archimedean_spiral_points(center_x, center_y, total_radius, line_spacing, tolerance=TOLERANCE):
+  """
+  Generate an Archimedean spiral r = line_spacing * theta / (2 pi), from the
+  center out to total_radius, sampled by arc length.
+
+  With a = line_spacing / (2 pi), the spiral has speed sqrt(r^2 + a^2) and
+  radius of curvature (r^2 + a^2)^1.5 / (r^2 + 2 a^2).
+
+  Returns:
+  - (n, 2) array of points, starting at the center.
+  """
+  a = line_spacing / (2 * math.pi)
+  max_theta = total_radius / a
+
+  def speed(theta):
+    return np.sqrt((a * theta)**2 + a**2)
+
+  def curvature_radius(theta):
+    r_squared = (a * theta)**2
+    return (r_squared + a**2)**1.5 / (r_squared + 2 * a**2)
+
+  grid = max(4096, int(64 * max_theta)) # Resolve every loop
+  theta = sample_by_arc_length(speed, curvature_radius, 0.0, max_theta, tolerance, grid)
+  r = a * theta
+  return np.column_stack((center_x + r * np.cos(theta), center_y + r * np.sin(theta)))
+
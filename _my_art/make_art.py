@@ -5,19 +5,37 @@ import sys
 import os.path
 from pyaxidraw import axidraw
 
+import clip
+import geometry
+import rays
+import scene
+
 MARGIN = 5
 CANVAS_HEIGHT = 297
 CANVAS_WIDTH = 420
 MAX_X = CANVAS_WIDTH - MARGIN*2
 MAX_Y = CANVAS_HEIGHT - MARGIN*2
 
+# Tools (brushes, pens or colours) that elements are painted with
+TOOLS = ['black', 'red', 'blue']
+TOOL_CHANGE_TIME = 30 # Estimated time for the operator to change tools, in seconds
+
+# Progress journal. After a crash, run again with --recover to skip what was already drawn.
+JOURNAL_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'make_art_journal.jsonl')
+
 ## CONNECT
 ad = axidraw.AxiDraw() # Initialize class
 ad.interactive()            # Enter interactive mode
-connected = ad.connect()    # Open serial port to AxiDraw
+ad.journal_file = JOURNAL_FILE
+if '--recover' in sys.argv:
+  connected = ad.recover()  # Reconnect (start from Home) and skip what was already drawn
+else:
+  ad.journal_data = {'seed': random.randrange(2**32)}
+  connected = ad.connect()    # Open serial port to AxiDraw
 if not connected:
   print('cannot connect to AxiDraw')
   sys.exit() # end script
+random.seed(ad.journal_data['seed']) # Same random artwork when recovering
 
 # ## OPTIONS
 ad.options.speed_pendown = 20       # Set maximum pen-down speed to 90%
@@ -31,84 +49,65 @@ ad.goto(0,0)
 
 ## FUNCTIONS
 
-def generate_archimedean_spiral(center_x, center_y, total_radius, line_spacing):
+def generate_archimedean_spiral(center_x, center_y, total_radius, line_spacing, tolerance=geometry.TOLERANCE):
   """
   Generate an Archimedean spiral centered at (center_x, center_y).
 
+  Points are spaced by arc length, so that no chord strays from the true spiral
+  by more than tolerance: dense where the spiral is tight near its center,
+  sparse on the wide outer loops.
+
   Parameters:
   - center_x, center_y: The center of the spiral.
   - total_radius: The maximum radius of the spiral.
   - line_spacing: The distance between spiral lines.
+  - tolerance: Largest allowed chord error (mm). Defaults to a few motor steps.
 
   Returns:
-  - A list of (x, y) points representing the spiral.
+  - A list of strokes, each a list of (x, y) points, making up the part of
+    the spiral inside the canvas margins.
   """
   print('generate_archimedean_spiral', center_x, center_y, total_radius, line_spacing)
-  # Calculate the number of loops needed
-  num_loops = total_radius / line_spacing
-
-  # The growth factor b is equal to the line spacing
-  b = line_spacing
-
-  # Maximum theta for the spiral
-  max_theta = 2 * math.pi * num_loops
-
-  # Number of points to generate (increase for smoother spirals)
-  num_points = int(num_loops * 400)
-
-  # Angle increment
-  delta_theta = max_theta / num_points
-
-  # Generate spiral points
-  vertices = []
-  for i in range(num_points + 1):
-    theta = i * delta_theta
-    r = b * theta / (2 * math.pi)  # Linear relationship: r = b * loops
+  points = geometry.archimedean_spiral_points(center_x, center_y, total_radius, line_spacing, tolerance)
 
-    if r > total_radius:
-        break
-    x = center_x + r * math.cos(theta)
-    y = center_y + r * math.sin(theta)
-    # if vertice is out of bounds, skip it
-    if x < MARGIN or x > MAX_X or y < MARGIN or y > MAX_Y:
-      continue
-    else:
-      vertices.append((x, y))
+  # Split the spiral where it leaves the canvas
+  return clip.clip_polylines([points], (MARGIN, MARGIN, MAX_X, MAX_Y))
 
-  return vertices
-
-def generate_circle(center_x, center_y, total_radius, num_points=360):
+def generate_circle(center_x, center_y, total_radius, num_points=None, tolerance=geometry.TOLERANCE):
   """
   Generate points for a circle centered at (center_x, center_y).
 
   Parameters:
   - center_x, center_y: The center of the circle.
   - total_radius: The radius of the circle.
-  - num_points: The number of points to generate for the circle (higher = smoother).
+  - num_points: A fixed number of points for the circle. By default, the number
+    of points follows the radius, keeping the chord error within tolerance.
+  - tolerance: Largest allowed chord error (mm). Defaults to a few motor steps.
 
   Returns:
-  - A list of (x, y) points representing the circle.
+  - A list of strokes, each a list of (x, y) points, making up the part of
+    the circle inside the canvas margins. A circle fully inside the margins
+    is a single closed stroke.
   """
-  print('generate_circle', center_x, center_y, total_radius, num_points)
-  vertices = []
-  angle_increment = 2 * math.pi / num_points  # Full circle divided into num_points
-
-  for i in range(num_points):
-    theta = i * angle_increment
-    x = center_x + total_radius * math.cos(theta)
-    y = center_y + total_radius * math.sin(theta)
-    # If the vertice is out of bounds, skip it
-    if x < MARGIN or x > MAX_X or y < MARGIN or y > MAX_Y:
-        continue  # Skip this point
-    else:
-      vertices.append((x, y))
+  if num_points:
+    theta = [2 * math.pi * i / num_points for i in range(num_points)]
+    points = [(center_x + total_radius * math.cos(t), center_y + total_radius * math.sin(t))
+      for t in theta]
+  else:
+    points = geometry.circle_points(center_x, center_y, total_radius, tolerance)[:-1]
+  print('generate_circle', center_x, center_y, total_radius, len(points))
 
   # Connect the circle by appending the first point at the end
-  vertices.append(vertices[0])
+  points = list(points) + [points[0]]
+
+  # Split the circle where it leaves the canvas
+  strokes = clip.clip_polylines([points], (MARGIN, MARGIN, MAX_X, MAX_Y))
+  if len(strokes) > 1 and strokes[-1][-1] == strokes[0][0]:
+    strokes[0] = strokes.pop()[:-1] + strokes[0] # Rejoin the arc through the first point
 
-  return vertices
+  return strokes
 
-def generate_rays(origin_x, origin_y, angle, num_rays, spread, max_bounces=10):
+def generate_rays(origin_x, origin_y, angle, num_rays, spread, max_bounces=10, max_length=None):
   """
   Generate rays originating from a point, with a spread and bouncing off canvas walls.
 
@@ -117,8 +116,8 @@ def generate_rays(origin_x, origin_y, angle, num_rays, spread, max_bounces=10):
   - angle: Initial direction of the center ray, in degrees.
   - num_rays: Total number of rays to generate.
   - spread: Total spread angle, in degrees (e.g., 30 means rays spread ±15° from the center angle).
-  - canvas_width, canvas_height: Dimensions of the canvas.
   - max_bounces: Maximum number of wall bounces per ray.
+  - max_length: Optional cap on the total length of each ray.
 
   Returns:
   - A list of rays, where each ray is a list of (x, y) points.
@@ -138,57 +137,28 @@ def generate_rays(origin_x, origin_y, angle, num_rays, spread, max_bounces=10):
     origin_y = MAX_Y
 
 
-  rays = []
-  center_angle = math.radians(angle)
-  half_spread = math.radians(spread / 2)
-
-  # Generate angles for rays
-  ray_angles = [
-    center_angle + (i - (num_rays - 1) / 2) * (half_spread * 2 / (num_rays - 1))
-    for i in range(num_rays)
-  ]
-
-  # For each ray, calculate its path with bounces
-  for ray_angle in ray_angles:
-    ray_points = [(origin_x, origin_y)]  # Start at the origin
-    current_angle = ray_angle
-    x, y = origin_x, origin_y
-
-    for _ in range(max_bounces):
-      # Determine the next intersection with the canvas boundary
-      if math.cos(current_angle) > 0:  # Moving right
-        next_x = MAX_X
-        t_x = (next_x - x) / math.cos(current_angle)
-      else:  # Moving left
-        next_x = MARGIN
-        t_x = (next_x - x) / math.cos(current_angle)
-
-      if math.sin(current_angle) > 0:  # Moving down
-        next_y = MAX_Y
-        t_y = (next_y - y) / math.sin(current_angle)
-      else:  # Moving up
-        next_y = MARGIN
-        t_y = (next_y - y) / math.sin(current_angle)
-
-      # Use the smaller t to find the actual next point
-      if t_x < t_y:
-        x = next_x
-        y += t_x * math.sin(current_angle)
-        current_angle = math.pi - current_angle  # Reflect horizontally
-      else:
-        x += t_y * math.cos(current_angle)
-        y = next_y
-        current_angle = -current_angle  # Reflect vertically
-
-      ray_points.append((x, y))
-
-      # Stop if the ray is out of bounds (shouldn't happen now)
-      if x < MARGIN or x > MAX_X or y < MARGIN or y > MAX_Y:
-          break
-
-    rays.append(ray_points)
-
-  return rays
+  # Trace all rays and bounces at once
+  angles = rays.ray_angles(angle, num_rays, spread)
+  traced = rays.bounce_rays(origin_x, origin_y, angles, (MARGIN, MARGIN, MAX_X, MAX_Y),
+    max_bounces, max_length)
+
+  return [list(map(tuple, ray.tolist())) for ray in traced]
+
+def paint_strokes(ad, strokes):
+  """
+  Paint a list of strokes. Ctrl+C pauses the drawing, which can then continue
+  from where it stopped.
+
+  Parameters:
+  - ad: The AxiDraw object.
+  - strokes: A list of strokes, each a list of (x, y) points.
+  """
+  try:
+    print("Press Ctrl+C to pause drawing.")
+    ad.draw_paths(strokes)
+  except KeyboardInterrupt:
+    input("Paused drawing. Press Ctrl+C again to stop, or Enter to continue.")
+    ad.resume() # Continue from where the drawing stopped
 
 def paint_archimedean_spiral(ad, center_x, center_y, total_radius, line_spacing):
   """
@@ -201,16 +171,11 @@ def paint_archimedean_spiral(ad, center_x, center_y, total_radius, line_spacing)
   - line_spacing: The distance between spiral lines.
   """
   print('paint_archimedean_spiral', center_x, center_y, total_radius, line_spacing)
-  spiral_points = generate_archimedean_spiral(center_x, center_y, total_radius, line_spacing)
-  try:
-    print("Press Ctrl+C to pause drawing.")
-    ad.draw_path(spiral_points)
-  except KeyboardInterrupt:
-    input("Paused drawing. Press Ctrl+C again to stop, or Enter to continue.")
-    ad.draw_path(spiral_points)
+  spiral_strokes = generate_archimedean_spiral(center_x, center_y, total_radius, line_spacing)
+  paint_strokes(ad, spiral_strokes)
 
 
-def paint_circle(ad, center_x, center_y, total_radius, num_points=360):
+def paint_circle(ad, center_x, center_y, total_radius, num_points=None):
   """
   Paint a circle centered at (center_x, center_y).
 
@@ -218,16 +183,12 @@ def paint_circle(ad, center_x, center_y, total_radius, num_points=360):
   - ad: The AxiDraw object.
   - center_x, center_y: The center of the circle.
   - total_radius: The radius of the circle.
-  - num_points: The number of points to generate for the circle (higher = smoother).
+  - num_points: A fixed number of points for the circle. By default, the number
+    of points follows the radius.
   """
   print('paint_circle', center_x, center_y, total_radius, num_points)
-  circle_points = generate_circle(center_x, center_y, total_radius, num_points)
-  try:
-    print("Press Ctrl+C to pause drawing.")
-    ad.draw_path(circle_points)
-  except KeyboardInterrupt:
-    input("Paused drawing. Press Ctrl+C again to stop, or Enter to continue.")
-    ad.draw_path(circle_points)
+  circle_strokes = generate_circle(center_x, center_y, total_radius, num_points)
+  paint_strokes(ad, circle_strokes)
 
 def paint_spread(ad, origin_x, origin_y, angle, num_rays, spread, max_bounces=10):
   """
@@ -243,40 +204,36 @@ def paint_spread(ad, origin_x, origin_y, angle, num_rays, spread, max_bounces=10
   """
   print('paint_spread', origin_x, origin_y, angle, num_rays, spread, max_bounces)
   ray_paths = generate_rays(origin_x, origin_y, angle, num_rays, spread, max_bounces)
-  for ray in ray_paths:
-    try:
-      print("Press Ctrl+C to pause drawing.")
-      ad.draw_path(ray)
-    except KeyboardInterrupt:
-      input("Paused drawing. Press Ctrl+C again to stop, or Enter to continue.")
-      ad.draw_path(ray)
-
-def rand_circle(ad):
+  paint_strokes(ad, ray_paths)
+
+def rand_circle(composition):
   """
-  Generate a random circle at a random position with a random radius
+  Add a circle at a random position with a random radius, painted with a random tool
   """
   print('rand_circle')
   radius = round(random.uniform(5,70), 2)
   center_x = round(random.uniform(0,MAX_X), 2)
   center_y = round(random.uniform(0,MAX_Y), 2)
-  circle_points = generate_circle(center_x, center_y, radius, 720)
-  paint_circle(ad, center_x, center_y, radius)
+  tool = random.choice(TOOLS)
+  composition.add(tool, generate_circle(center_x, center_y, radius), 'circle')
 
-def rand_spiral(ad):
+def rand_spiral(composition):
   """
-  Generate a random spiral at a random position with a random radius and line spacing
+  Add a spiral at a random position with a random radius and line spacing,
+  painted with a random tool
   """
   print('rand_spiral')
   total_radius = round(random.uniform(10,50), 2)
   line_spacing = round(random.uniform(2,8), 2)
   center_x = random.randint(0, MAX_X)
   center_y = random.randint(0, MAX_Y)
-  spiral_points = generate_archimedean_spiral(center_x, center_y, total_radius, line_spacing)
-  paint_archimedean_spiral(ad, center_x, center_y, total_radius, line_spacing)
+  tool = random.choice(TOOLS)
+  composition.add(tool, generate_archimedean_spiral(center_x, center_y, total_radius, line_spacing),
+    'spiral')
 
-def rand_spread(ad):
+def rand_spread(composition):
   """
-  Generate random rays at a random position with random parameters
+  Add random rays at a random position with random parameters, painted with a random tool
   """
   print('rand_spread')
   origin_x = random.randint(0, MAX_X)
@@ -285,25 +242,38 @@ def rand_spread(ad):
   num_rays = random.randint(3, 10)
   spread = random.randint(10, 60)
   max_bounces = random.randint(1, 10)
-  paint_spread(ad, origin_x, origin_y, angle, num_rays, spread, max_bounces)
+  tool = random.choice(TOOLS)
+  composition.add(tool, generate_rays(origin_x, origin_y, angle, num_rays, spread, max_bounces),
+    'spread')
 
-def pause_and_wait_for_user(ad):
-  """input the drawing and wait for user  before continuing"""
+def pause_and_wait_for_user(ad, tool=None):
+  """Return home and wait for the user to change tools before continuing"""
   print('pause_and_wait_for_user')
+  if ad.recovering:
+    return # Still skipping what was drawn before the crash
   ad.goto(0, 0)
-  print("If you want to adjust the pencil or brush and color, do it now.")
+  if tool is None:
+    print("If you want to adjust the pencil or brush and color, do it now.")
+  else:
+    print(f"Load tool: {tool}")
   input("Press Enter to continue...")
 
+def print_estimate(label, estimate):
+  """Print the tool changes, distances and time of a schedule"""
+  print(f"{label}: {estimate['tool_changes']} tool changes, "
+    f"{estimate['pendown_distance'] / 1000:.2f} m pen-down, "
+    f"{estimate['travel_distance'] / 1000:.2f} m travel, "
+    f"about {estimate['time'] / 60:.1f} min")
+
 def generate_painting(ad):
   """
   Generate a random painting with multiple elements, rays, circles and spirals
 
-  Loops through the canvas and generates random elements at each position.
+  All elements are generated first, each with a random tool. They are then
+  painted grouped by tool, in an order that keeps pen-up travel short, pausing
+  only when the tool changes.
   """
 
-  min_x, min_y = 5, 5
-  max_x, max_y = 415, 292
-
   # Randomize the number of elements
   rand_num_circles = random.randint(5, 10)
   rand_num_spirographs = random.randint(3, 5)
@@ -318,17 +288,26 @@ def generate_painting(ad):
   print('rand_num_spreads', rand_num_spreads)
 
   # Generate random elements
+  composition = scene.Scene(home=(0, 0), pendown_speed=ad.speed_pendown * 25.4,
+    travel_speed=ad.speed_penup * 25.4, tool_change_time=TOOL_CHANGE_TIME)
   for _ in range(rand_num_circles):
-    rand_circle(ad)
-    pause_and_wait_for_user(ad)
+    rand_circle(composition)
 
   for _ in range(rand_num_spirographs):
-    rand_spiral(ad)
-    pause_and_wait_for_user(ad)
+    rand_spiral(composition)
 
   for _ in range(rand_num_spreads):
-    rand_spread(ad)
-    pause_and_wait_for_user(ad)
+    rand_spread(composition)
+
+  plan = composition.schedule()
+  print_estimate('Unscheduled', composition.estimate(None))
+  print_estimate('Scheduled', composition.estimate(plan))
+
+  for tool, elements in plan:
+    pause_and_wait_for_user(ad, tool)
+    for element in elements:
+      print('paint', element.name, tool)
+      paint_strokes(ad, element.strokes)
 
 
 try:
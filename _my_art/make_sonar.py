@@ -5,19 +5,40 @@ import sys
 import os.path
 from pyaxidraw import axidraw
 
+import brush
+import clip
+import fill
+import geometry
+import rays
+from nautilus import generate_nautilus_with_crossbeams
+
 MARGIN = 5
 CANVAS_HEIGHT = 300
 CANVAS_WIDTH = 300
 MAX_X = CANVAS_WIDTH - MARGIN
 MAX_Y = CANVAS_HEIGHT - MARGIN
 
+# Brush paint load: pen-down distance (mm) painted per dip, and paint-well positions.
+# With no wells, the brush is re-dipped by hand at the center of each polygon.
+DISTANCE_PER_LOAD = 300
+PAINT_WELLS = []
+
+# Progress journal. After a crash, run again with --recover to skip what was already drawn.
+JOURNAL_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'make_sonar_journal.jsonl')
+
 ## CONNECT
 ad = axidraw.AxiDraw() # Initialize class
 ad.interactive()            # Enter interactive mode
-connected = ad.connect()    # Open serial port to AxiDraw
+ad.journal_file = JOURNAL_FILE
+if '--recover' in sys.argv:
+  connected = ad.recover()  # Reconnect (start from Home) and skip what was already drawn
+else:
+  ad.journal_data = {'seed': random.randrange(2**32)}
+  connected = ad.connect()    # Open serial port to AxiDraw
 if not connected:
   print('cannot connect to AxiDraw')
   sys.exit() # end script
+random.seed(ad.journal_data['seed']) # Same random artwork when recovering
 
 # ## OPTIONS
 ad.options.speed_pendown = 20       # Set maximum pen-down speed to 90%
@@ -32,84 +53,65 @@ ad.goto(0,0)
 
 ## FUNCTIONS
 
-def generate_archimedean_spiral(center_x, center_y, total_radius, line_spacing):
+def generate_archimedean_spiral(center_x, center_y, total_radius, line_spacing, tolerance=geometry.TOLERANCE):
   """
   Generate an Archimedean spiral centered at (center_x, center_y).
 
+  Points are spaced by arc length, so that no chord strays from the true spiral
+  by more than tolerance: dense where the spiral is tight near its center,
+  sparse on the wide outer loops.
+
   Parameters:
   - center_x, center_y: The center of the spiral.
   - total_radius: The maximum radius of the spiral.
   - line_spacing: The distance between spiral lines.
+  - tolerance: Largest allowed chord error (mm). Defaults to a few motor steps.
 
   Returns:
-  - A list of (x, y) points representing the spiral.
+  - A list of strokes, each a list of (x, y) points, making up the part of
+    the spiral inside the canvas margins.
   """
   print('generate_archimedean_spiral', center_x, center_y, total_radius, line_spacing)
-  # Calculate the number of loops needed
-  num_loops = total_radius / line_spacing
-
-  # The growth factor b is equal to the line spacing
-  b = line_spacing
-
-  # Maximum theta for the spiral
-  max_theta = 2 * math.pi * num_loops
-
-  # Number of points to generate (increase for smoother spirals)
-  num_points = int(num_loops * 400)
-
-  # Angle increment
-  delta_theta = max_theta / num_points
-
-  # Generate spiral points
-  vertices = []
-  for i in range(num_points + 1):
-    theta = i * delta_theta
-    r = b * theta / (2 * math.pi)  # Linear relationship: r = b * loops
-
-    if r > total_radius:
-        break
-    x = center_x + r * math.cos(theta)
-    y = center_y + r * math.sin(theta)
-    # if vertice is out of bounds, skip it
-    if x < MARGIN or x > MAX_X-MARGIN or y < MARGIN or y > MAX_Y-MARGIN:
-      continue
-    else:
-      vertices.append((x, y))
+  points = geometry.archimedean_spiral_points(center_x, center_y, total_radius, line_spacing, tolerance)
 
-  return vertices
+  # Split the spiral where it leaves the canvas
+  return clip.clip_polylines([points], (MARGIN, MARGIN, MAX_X-MARGIN, MAX_Y-MARGIN))
 
-def generate_circle(center_x, center_y, total_radius, num_points=360):
+def generate_circle(center_x, center_y, total_radius, num_points=None, tolerance=geometry.TOLERANCE):
   """
   Generate points for a circle centered at (center_x, center_y).
 
   Parameters:
   - center_x, center_y: The center of the circle.
   - total_radius: The radius of the circle.
-  - num_points: The number of points to generate for the circle (higher = smoother).
+  - num_points: A fixed number of points for the circle. By default, the number
+    of points follows the radius, keeping the chord error within tolerance.
+  - tolerance: Largest allowed chord error (mm). Defaults to a few motor steps.
 
   Returns:
-  - A list of (x, y) points representing the circle.
+  - A list of strokes, each a list of (x, y) points, making up the part of
+    the circle inside the canvas margins. A circle fully inside the margins
+    is a single closed stroke.
   """
-  print('generate_circle', center_x, center_y, total_radius, num_points)
-  vertices = []
-  angle_increment = 2 * math.pi / num_points  # Full circle divided into num_points
-
-  for i in range(num_points):
-    theta = i * angle_increment
-    x = center_x + total_radius * math.cos(theta)
-    y = center_y + total_radius * math.sin(theta)
-    # If the vertice is out of bounds, skip it
-    if x < MARGIN or x > MAX_X or y < MARGIN or y > MAX_Y:
-        continue  # Skip this point
-    else:
-      vertices.append((x, y))
+  if num_points:
+    theta = [2 * math.pi * i / num_points for i in range(num_points)]
+    points = [(center_x + total_radius * math.cos(t), center_y + total_radius * math.sin(t))
+      for t in theta]
+  else:
+    points = geometry.circle_points(center_x, center_y, total_radius, tolerance)[:-1]
+  print('generate_circle', center_x, center_y, total_radius, len(points))
 
   # Connect the circle by appending the first point at the end
-  vertices.append(vertices[0])
+  points = list(points) + [points[0]]
+
+  # Split the circle where it leaves the canvas
+  strokes = clip.clip_polylines([points], (MARGIN, MARGIN, MAX_X, MAX_Y))
+  if len(strokes) > 1 and strokes[-1][-1] == strokes[0][0]:
+    strokes[0] = strokes.pop()[:-1] + strokes[0] # Rejoin the arc through the first point
 
-  return vertices
+  return strokes
 
-def generate_rays(origin_x, origin_y, angle, num_rays, spread, max_bounces=10):
+def generate_rays(origin_x, origin_y, angle, num_rays, spread, max_bounces=10, max_length=None):
   """
   Generate rays originating from a point, with a spread and bouncing off canvas walls.
 
@@ -118,8 +120,8 @@ def generate_rays(origin_x, origin_y, angle, num_rays, spread, max_bounces=10):
   - angle: Initial direction of the center ray, in degrees.
   - num_rays: Total number of rays to generate.
   - spread: Total spread angle, in degrees (e.g., 30 means rays spread ±15° from the center angle).
-  - canvas_width, canvas_height: Dimensions of the canvas.
   - max_bounces: Maximum number of wall bounces per ray.
+  - max_length: Optional cap on the total length of each ray.
 
   Returns:
   - A list of rays, where each ray is a list of (x, y) points.
@@ -139,59 +141,14 @@ def generate_rays(origin_x, origin_y, angle, num_rays, spread, max_bounces=10):
     origin_y = MAX_Y-MARGIN
 
 
-  rays = []
-  center_angle = math.radians(angle)
-  half_spread = math.radians(spread / 2)
-
-  # Generate angles for rays
-  ray_angles = [
-    center_angle + (i - (num_rays - 1) / 2) * (half_spread * 2 / (num_rays - 1))
-    for i in range(num_rays)
-  ]
-
-  # For each ray, calculate its path with bounces
-  for ray_angle in ray_angles:
-    ray_points = [(origin_x, origin_y)]  # Start at the origin
-    current_angle = ray_angle
-    x, y = origin_x, origin_y
-
-    for _ in range(max_bounces):
-      # Determine the next intersection with the canvas boundary
-      if math.cos(current_angle) > 0:  # Moving right
-        next_x = MAX_X
-        t_x = (next_x - x) / math.cos(current_angle)
-      else:  # Moving left
-        next_x = MARGIN
-        t_x = (next_x - x) / math.cos(current_angle)
-
-      if math.sin(current_angle) > 0:  # Moving down
-        next_y = MAX_Y
-        t_y = (next_y - y) / math.sin(current_angle)
-      else:  # Moving up
-        next_y = MARGIN
-        t_y = (next_y - y) / math.sin(current_angle)
-
-      # Use the smaller t to find the actual next point
-      if t_x < t_y:
-        x = next_x
-        y += t_x * math.sin(current_angle)
-        current_angle = math.pi - current_angle  # Reflect horizontally
-      else:
-        x += t_y * math.cos(current_angle)
-        y = next_y
-        current_angle = -current_angle  # Reflect vertically
-
-      ray_points.append((x, y))
-
-      # Stop if the ray is out of bounds (shouldn't happen now)
-      if x < MARGIN or x > MAX_X-MARGIN or y < MARGIN-MARGIN or y > MAX_Y:
-          break
-
-    rays.append(ray_points)
-
-  return rays
-
-def generate_random_polygon(center_x, center_y, num_sides, bounding_circle_diameter, box_width, box_height, brush_diameter):
+  # Trace all rays and bounces at once
+  angles = rays.ray_angles(angle, num_rays, spread)
+  traced = rays.bounce_rays(origin_x, origin_y, angles, (MARGIN, MARGIN, MAX_X, MAX_Y),
+    max_bounces, max_length)
+
+  return [list(map(tuple, ray.tolist())) for ray in traced]
+
+def generate_random_polygon(center_x, center_y, num_sides, bounding_circle_diameter, box_width, box_height, brush_diameter, fill_mode='scanline'):
     """
     Generate a random polygon with a specified number of sides, fitting within a bounding circle
     and constrained by a bounding box, and prepare it for filling with a given brush diameter.
@@ -202,11 +159,14 @@ def generate_random_polygon(center_x, center_y, num_sides, bounding_circle_diame
     - bounding_circle_diameter: Diameter of the bounding circle in which the polygon is inscribed.
     - box_width, box_height: Width and height of the bounding box.
     - brush_diameter: Diameter of the brush used for filling the polygon.
+    - fill_mode: 'scanline' for horizontal hatching, or 'contour' for inset rings
+      linked into a continuous spiral (far fewer pen lifts and reloads).
 
     Returns:
     - A tuple containing:
       - A list of (x, y) vertices representing the random polygon.
       - A list of filling paths (each path is a list of (x, y) points).
+      - The (x, y) centroid of the polygon.
     """
     if num_sides < 3:
         raise ValueError("A polygon must have at least 3 sides.")
@@ -231,33 +191,12 @@ def generate_random_polygon(center_x, center_y, num_sides, bounding_circle_diame
         vertices.append((x, y))
 
     # Generate filling paths
-    fill_paths = []
-    min_y = min(v[1] for v in vertices)
-    max_y = max(v[1] for v in vertices)
-    current_y = min_y
-
-    while current_y <= max_y:
-        path = []
-        for i in range(len(vertices)):
-            # Get the current and next vertex
-            v1 = vertices[i]
-            v2 = vertices[(i + 1) % len(vertices)]
-
-            # Check if the current scan line intersects this edge
-            if (v1[1] <= current_y <= v2[1]) or (v2[1] <= current_y <= v1[1]):
-                # Calculate the intersection point
-                if v1[1] != v2[1]:  # Avoid division by zero
-                    t = (current_y - v1[1]) / (v2[1] - v1[1])
-                    intersect_x = v1[0] + t * (v2[0] - v1[0])
-                    path.append(intersect_x)
-
-        # Sort intersection points and pair them
-        if len(path) >= 2:
-            path.sort()
-            for i in range(0, len(path) - 1, 2):
-                fill_paths.append([(path[i], current_y), (path[i + 1], current_y)])
-
-        current_y += brush_diameter  # Move to the next line
+    if fill_mode == 'contour':
+        fill_paths = fill.contour_fill(vertices, brush_diameter)
+    elif fill_mode == 'scanline':
+        fill_paths = fill.scanline_fill(vertices, brush_diameter)
+    else:
+        raise ValueError(f"Unknown fill mode: {fill_mode}")
 
     # Calculate the centroid
     centroid_x = sum(v[0] for v in vertices) / len(vertices)
@@ -266,74 +205,6 @@ def generate_random_polygon(center_x, center_y, num_sides, bounding_circle_diame
 
     return vertices, fill_paths, centroid
 
-def generate_nautilus_with_crossbeams(center_x, center_y, canvas_width, canvas_height, a=1, b=0.15, taper=0.9, num_points=1000, max_theta=4*math.pi, beam_curvature=0.3, beam_segments=19):
-  """
-  Generate a nautilus shell with an inner spiral, outer spiral, and connecting crossbeams.
-
-  Parameters:
-  - center_x, center_y: Center of the shell.
-  - canvas_width, canvas_height: Dimensions of the drawing canvas.
-  - a: Initial scaling factor for the spirals.
-  - b: Growth rate of the spirals (controls how fast they expand).
-  - taper: Tapering factor to decrease size outward (0 < taper <= 1).
-  - num_points: Number of points to generate for the spirals.
-  - max_theta: Maximum angle for the spirals in radians.
-  - beam_curvature: Curvature factor for the crossbeams.
-
-  Returns:
-  - A dictionary with:
-    - 'inner_spiral': List of (x, y) points for the inner spiral.
-    - 'outer_spiral': List of (x, y) points for the outer spiral.
-    - 'crossbeams': List of beam paths, where each beam is a list of (x, y) points.
-  """
-  golden_ratio = (1 + math.sqrt(5)) / 2  # Golden ratio
-  inner_spiral = []
-  outer_spiral = []
-  crossbeams = []
-
-  last_beam_inner = None  # Tracks the last inner spiral position to enforce spacing
-
-  for i in range(num_points):
-    theta = i * max_theta / num_points  # Increment angle
-    r_inner = a * golden_ratio**(b * theta) * taper**(theta / max_theta)  # Inner spiral
-    r_outer = r_inner * 1.5  # Slightly larger radius for outer spiral
-
-    # Compute inner and outer spiral points
-    x_inner = center_x + r_inner * math.cos(theta)
-    y_inner = center_y + r_inner * math.sin(theta)
-    x_outer = center_x + r_outer * math.cos(theta)
-    y_outer = center_y + r_outer * math.sin(theta)
-
-    inner_spiral.append((x_inner, y_inner))
-    outer_spiral.append((x_outer, y_outer))
-
-    # Calculate beam length (distance between inner and outer endpoints)
-    beam_length = math.sqrt((x_outer - x_inner)**2 + (y_outer - y_inner)**2)
-
-    # Enforce spacing based on the inner spiral points
-    if last_beam_inner:
-      distance_to_last_inner = math.sqrt((x_inner - last_beam_inner[0])**2 + (y_inner - last_beam_inner[1])**2)
-      if distance_to_last_inner < beam_length:
-        continue  # Skip adding this beam if spacing is insufficient
-
-    beam_curve = []
-    for t in range(beam_segments + 1):  # Generate beam_segments points along the curve
-      t /= beam_segments  # Normalize t to [0, 1]
-      # Quadratic Bézier formula:
-      # B(t) = (1-t)^2 * P0 + 2*(1-t)*t * P1 + t^2 * P2
-      bx = (1 - t)**2 * x_inner + 2 * (1 - t) * t * (x_inner + beam_curvature * (y_outer - y_inner)) + t**2 * x_outer
-      by = (1 - t)**2 * y_inner + 2 * (1 - t) * t * (y_inner - beam_curvature * (x_outer - x_inner)) + t**2 * y_outer
-      beam_curve.append((bx, by))
-
-    crossbeams.append(beam_curve)  # Add the full curve to the crossbeams list
-    last_beam_inner = (x_inner, y_inner)
-
-  return {
-    'inner_spiral': inner_spiral,
-    'outer_spiral': outer_spiral,
-    'crossbeams': crossbeams
-  }
-
 def paint_nautilus_shell(ad, center_x, center_y, a=10, b=0.12, taper=0.95, num_points=500, max_theta=6*math.pi, beam_curvature=0.2):
   """
   Paint a nautilus shell based on the golden ratio using logarithmic spirals.
@@ -352,14 +223,9 @@ def paint_nautilus_shell(ad, center_x, center_y, a=10, b=0.12, taper=0.95, num_p
     center_x, center_y, MAX_X, MAX_Y, a, b, taper, num_points, max_theta
   )
 
-  # Draw the shell
-  # Draw inner and outer spirals
-  ad.draw_path(nautilus['inner_spiral'])
-  ad.draw_path(nautilus['outer_spiral'])
-
-  # # Draw crossbeams
-  for beam in nautilus['crossbeams']:
-    ad.draw_path(beam)  # Each beam is a small path
+  # Draw the shell: inner and outer spirals, then crossbeams, clipped to the canvas
+  shell = [nautilus['inner_spiral'], nautilus['outer_spiral']] + nautilus['crossbeams']
+  ad.draw_paths(clip.clip_polylines(shell, (MARGIN, MARGIN, MAX_X, MAX_Y)))
 
 def paint_archimedean_spiral(ad, center_x, center_y, total_radius, line_spacing):
   """
@@ -372,28 +238,32 @@ def paint_archimedean_spiral(ad, center_x, center_y, total_radius, line_spacing)
   - line_spacing: The distance between spiral lines.
   """
   print('paint_archimedean_spiral', center_x, center_y, total_radius, line_spacing)
-  spiral_points = generate_archimedean_spiral(center_x, center_y, total_radius, line_spacing)
+  spiral_strokes = generate_archimedean_spiral(center_x, center_y, total_radius, line_spacing)
   try:
     print("Press Ctrl+C to pause drawing.")
-    ad.draw_path(spiral_points)
+    ad.draw_paths(spiral_strokes)
   except KeyboardInterrupt:
     input("Paused drawing. Press Ctrl+C again to stop, or Enter to continue.")
-    ad.draw_path(spiral_points)
+    ad.resume() # Continue from where the drawing stopped
+
+def dip_brush(ad, centroid, prompt=True):
+  if ad.recovering: # Still skipping what was drawn before the crash
+    ad.draw_paths(generate_circle(centroid[0], centroid[1], 2))
+    return
 
-def dip_brush(ad, centroid):
   ad.penup()
   ad.goto(centroid[0], centroid[1])
 
-  input("PREP BRUSH WITH PAINT. PRESS ENTER TO CONTINUE")
+  if prompt:
+    input("PREP BRUSH WITH PAINT. PRESS ENTER TO CONTINUE")
 
   ad.pendown()
   ad.penup()
   ad.pendown()
-  circle_points = generate_circle(centroid[0], centroid[1], 2, 360)
-  ad.draw_path(circle_points)
+  ad.draw_paths(generate_circle(centroid[0], centroid[1], 2))
   ad.penup()
 
-def paint_random_polygon(ad, brush_diameter):
+def paint_random_polygon(ad, brush_diameter, fill_mode='scanline'):
   center_x = round(random.uniform(MARGIN,MAX_X), 2)
   center_y = round(random.uniform(MARGIN,MAX_Y), 2)
   num_sides = random.randint(6, 36)
@@ -403,7 +273,8 @@ def paint_random_polygon(ad, brush_diameter):
 
   # Generate polygon and fill paths
   polygon_vertices, fill_paths, centroid = generate_random_polygon(
-      center_x, center_y, num_sides, bounding_circle_diameter, box_width, box_height, brush_diameter
+      center_x, center_y, num_sides, bounding_circle_diameter, box_width, box_height, brush_diameter,
+      fill_mode
   )
 
   print("Will print polygon with properties:")
@@ -413,21 +284,26 @@ def paint_random_polygon(ad, brush_diameter):
   print(f"  Bounding box width:         {box_width}")
   print(f"  Bounding box height:        {box_height}")
   print(f"  Brush diameter:             {brush_diameter}")
+  print(f"  Fill mode:                  {fill_mode} ({len(fill_paths)} strokes)")
+
+  # Plan paint reloads over the outline and fill, by pen-down distance
+  paint_load = brush.PaintLoad(DISTANCE_PER_LOAD, PAINT_WELLS or [centroid])
+  strokes = [polygon_vertices + [polygon_vertices[0]]] + fill_paths
+  start = ad.turtle_pos()
+  reload_plan = paint_load.simulate(strokes, start)
+  print(f"  Paint reloads:              {reload_plan['reloads']}")
+  print(f"  Reload time (estimated):    {reload_plan['reload_time']:.1f} s")
+
+  if not ad.recovering:
+    input("DRAWING POLYGON. PRESS ENTER TO CONTINUE")
+
+  for step, item in paint_load.schedule(strokes, start):
+    if step == 'reload':
+      dip_brush(ad, item, prompt=not PAINT_WELLS)
+    else:
+      ad.draw_path(item)
 
-  dip_brush(ad, centroid)
-
-
-  # Example of drawing polygon and fill paths
-  ad.draw_path(polygon_vertices + [polygon_vertices[0]])  # Draw the polygon
-
-  input("DRAWING POLYGON. PRESS ENTER TO CONTINUE")
-
-  for index, fill_path in enumerate(fill_paths):
-    if index % 10 == 0:
-      dip_brush(ad, centroid)
-    ad.draw_path(fill_path)  # Draw each fill path
-
-def paint_circle(ad, center_x, center_y, total_radius, num_points=360):
+def paint_circle(ad, center_x, center_y, total_radius, num_points=None):
   """
   Paint a circle centered at (center_x, center_y).
 
@@ -435,16 +311,17 @@ def paint_circle(ad, center_x, center_y, total_radius, num_points=360):
   - ad: The AxiDraw object.
   - center_x, center_y: The center of the circle.
   - total_radius: The radius of the circle.
-  - num_points: The number of points to generate for the circle (higher = smoother).
+  - num_points: A fixed number of points for the circle. By default, the number
+    of points follows the radius.
   """
   print('paint_circle', center_x, center_y, total_radius, num_points)
-  circle_points = generate_circle(center_x, center_y, total_radius, num_points)
+  circle_strokes = generate_circle(center_x, center_y, total_radius, num_points)
   try:
     print("Press Ctrl+C to pause drawing.")
-    ad.draw_path(circle_points)
+    ad.draw_paths(circle_strokes)
   except KeyboardInterrupt:
     input("Paused drawing. Press Ctrl+C again to stop, or Enter to continue.")
-    ad.draw_path(circle_points)
+    ad.resume() # Continue from where the drawing stopped
 
 def paint_spread(ad, origin_x, origin_y, angle, num_rays, spread, max_bounces=10):
   """
@@ -460,13 +337,12 @@ def paint_spread(ad, origin_x, origin_y, angle, num_rays, spread, max_bounces=10
   """
   print('paint_spread', origin_x, origin_y, angle, num_rays, spread, max_bounces)
   ray_paths = generate_rays(origin_x, origin_y, angle, num_rays, spread, max_bounces)
-  for ray in ray_paths:
-    try:
-      print("Press Ctrl+C to pause drawing.")
-      ad.draw_path(ray)
-    except KeyboardInterrupt:
-      input("Paused drawing. Press Ctrl+C again to stop, or Enter to continue.")
-      ad.draw_path(ray)
+  try:
+    print("Press Ctrl+C to pause drawing.")
+    ad.draw_paths(ray_paths)
+  except KeyboardInterrupt:
+    input("Paused drawing. Press Ctrl+C again to stop, or Enter to continue.")
+    ad.resume() # Continue from where the drawing stopped
 
 def generate_painting(ad):
   """
@@ -503,7 +379,7 @@ def generate_painting(ad):
   # paint_spread(ad, 70, 40, 40, 5, 3, 1)
 
   # for i in range(30):
-  #   paint_random_polygon(ad, 1)
+  #   paint_random_polygon(ad, 1, 'contour')
 
 try:
   generate_painting(ad)
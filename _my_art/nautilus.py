@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+"""
+Vectorized nautilus shell generator: inner and outer logarithmic spirals joined
+by curved crossbeams.
+
+generate_nautilus_with_crossbeams gives the same points as the original
+point-by-point implementation (kept in bench_nautilus.py as the reference),
+but computes both spirals and all beams as NumPy arrays. Arithmetic is kept in
+the same order as the scalar version, and powers use np.float_power (libm pow),
+so that results match to the last bit.
+"""
+import math
+
+import numpy as np
+
+
+def select_beams(inner, beam_lengths, window=64):
+  """
+  Greedy beam spacing in one forward pass.
+
+  Starting from the first spiral point, the next beam is the first later point
+  whose distance from the last beam's inner end is at least its own beam
+  length. Candidates are tested a window at a time, and the window grows
+  whenever no candidate in it qualifies, so every point is tested only once.
+
+  Parameters:
+  - inner: (n, 2) array of inner spiral points.
+  - beam_lengths: (n,) array of beam lengths at each point.
+
+  Returns:
+  - Array of the indices of points that carry a beam.
+  """
+  count = len(inner)
+  if count == 0:
+    return np.zeros(0, dtype=int)
+  selected = [0]
+  last = 0
+  start = 1
+  while start < count:
+    stop = min(start + window, count)
+    delta = inner[start:stop] - inner[last]
+    distances = np.sqrt(delta[:, 0]**2 + delta[:, 1]**2)
+    found = np.nonzero(~(distances < beam_lengths[start:stop]))[0]
+    if len(found) == 0:
+      start = stop
+      window *= 2
+      continue
+    last = start + int(found[0])
+    selected.append(last)
+    window = max(64, 2 * (last - selected[-2])) # Expect similar spacing for the next beam
+    start = last + 1
+  return np.asarray(selected, dtype=int)
+
+
+def bezier_beams(x_inner, y_inner, x_outer, y_outer, beam_curvature, beam_segments):
+  """
+  Evaluate all quadratic Bézier crossbeams at once.
+
+  B(t) = (1-t)^2 * P0 + 2*(1-t)*t * P1 + t^2 * P2, where P0 and P2 are the inner
+  and outer beam ends, and the control point P1 is offset perpendicular to the
+  beam by beam_curvature times its length.
+
+  Returns:
+  - (beams, beam_segments + 1, 2) array of beam points.
+  """
+  t = np.arange(beam_segments + 1) / beam_segments
+  w_inner = ((1 - t)**2)[None, :]
+  w_control = (2 * (1 - t) * t)[None, :]
+  w_outer = (t**2)[None, :]
+  x_control = x_inner + beam_curvature * (y_outer - y_inner)
+  y_control = y_inner - beam_curvature * (x_outer - x_inner)
+  bx = w_inner * x_inner[:, None] + w_control * x_control[:, None] + w_outer * x_outer[:, None]
+  by = w_inner * y_inner[:, None] + w_control * y_control[:, None] + w_outer * y_outer[:, None]
+  return np.stack((bx, by), axis=2)
+
+
+def generate_nautilus_with_crossbeams(center_x, center_y, canvas_width, canvas_height, a=1, b=0.15, taper=0.9, num_points=1000, max_theta=4*math.pi, beam_curvature=0.3, beam_segments=19):
+  """
+  Generate a nautilus shell with an inner spiral, outer spiral, and connecting crossbeams.
+
+  Parameters:
+  - center_x, center_y: Center of the shell.
+  - canvas_width, canvas_height: Dimensions of the drawing canvas.
+  - a: Initial scaling factor for the spirals.
+  - b: Growth rate of the spirals (controls how fast they expand).
+  - taper: Tapering factor to decrease size outward (0 < taper <= 1).
+  - num_points: Number of points to generate for the spirals.
+  - max_theta: Maximum angle for the spirals in radians.
+  - beam_curvature: Curvature factor for the crossbeams.
+  - beam_segments: Number of line segments in each crossbeam.
+
+  Returns:
+  - A dictionary with:
+    - 'inner_spiral': List of (x, y) points for the inner spiral.
+    - 'outer_spiral': List of (x, y) points for the outer spiral.
+    - 'crossbeams': List of beam paths, where each beam is a list of (x, y) points.
+  """
+  golden_ratio = (1 + math.sqrt(5)) / 2  # Golden ratio
+
+  theta = np.arange(num_points) * max_theta / num_points
+  r_inner = a * np.float_power(golden_ratio, b * theta) *\
+    np.float_power(taper, theta / max_theta)  # Inner spiral
+  r_outer = r_inner * 1.5  # Slightly larger radius for outer spiral
+
+  cos_theta = np.cos(theta)
+  sin_theta = np.sin(theta)
+  x_inner = center_x + r_inner * cos_theta
+  y_inner = center_y + r_inner * sin_theta
+  x_outer = center_x + r_outer * cos_theta
+  y_outer = center_y + r_outer * sin_theta
+
+  # Beam length: distance between inner and outer endpoints
+  beam_lengths = np.sqrt((x_outer - x_inner)**2 + (y_outer - y_inner)**2)
+  beams = select_beams(np.column_stack((x_inner, y_inner)), beam_lengths)
+
+  crossbeams = bezier_beams(x_inner[beams], y_inner[beams], x_outer[beams], y_outer[beams],
+    beam_curvature, beam_segments)
+
+  return {
+    'inner_spiral': list(zip(x_inner.tolist(), y_inner.tolist())),
+    'outer_spiral': list(zip(x_outer.tolist(), y_outer.tolist())),
+    'crossbeams': [list(map(tuple, beam)) for beam in crossbeams.tolist()]
+  }
@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+"""
+Vectorized bouncing-ray generator.
+
+A ray bouncing inside a rectangle is a straight line in the "unfolded" plane,
+where the rectangle is mirrored across each wall it hits. Wall hits are where
+that line crosses the grid lines x = x_min + k * width and y = y_min + k * height,
+so the first few hit times of every ray can be listed in closed form. Folding
+the unfolded points back into the rectangle (a triangle wave in x and in y)
+gives the bounce points. All rays and bounces are computed in one pass.
+
+All coordinates are in the same units as the rectangle (typically mm).
+"""
+import math
+
+import numpy as np
+
+CORNER_TOLERANCE = 1e-9 # Hits closer than this (times the box size) are one corner hit
+
+
+def ray_angles(angle, num_rays, spread):
+  """
+  Return the directions (radians) of num_rays rays, evenly spread over spread
+  degrees around angle (degrees).
+  """
+  if num_rays == 1:
+    return np.array([math.radians(angle)])
+  offsets = np.arange(num_rays) - (num_rays - 1) / 2
+  return math.radians(angle) + offsets * (math.radians(spread) / (num_rays - 1))
+
+
+def _hit_times(position, direction, low, high, count):
+  """
+  Times at which rays starting at position, moving along direction (one axis),
+  cross the first count grid lines of the unfolded plane. Rays that do not
+  move along this axis never hit.
+  """
+  size = high - low
+  k = np.arange(count)
+  with np.errstate(divide='ignore', invalid='ignore'):
+    forward = (high + k[None, :] * size - position[:, None]) / direction[:, None]
+    backward = (low - k[None, :] * size - position[:, None]) / direction[:, None]
+  times = np.where(direction[:, None] > 0, forward, backward)
+  return np.where(direction[:, None] == 0, np.inf, times)
+
+
+def _fold(unfolded, low, high):
+  """ Map unfolded coordinates back into [low, high], mirroring at each wall """
+  size = high - low
+  phase = np.mod(unfolded - low, 2 * size)
+  return np.clip(low + np.where(phase <= size, phase, 2 * size - phase), low, high)
+
+
+def bounce_rays(origin_x, origin_y, angles, box, max_bounces=10, max_length=None):
+  """
+  Trace rays from one origin, bouncing off the walls of a rectangle.
+
+  Parameters:
+  - origin_x, origin_y: Starting point of the rays, inside the rectangle.
+  - angles: Ray directions, in radians.
+  - box: The rectangle (min_x, min_y, max_x, max_y) that the rays bounce in.
+  - max_bounces: Number of wall bounces per ray.
+  - max_length: Optional cap on the total length of each ray.
+
+  Returns:
+  - A list of rays, each an (n, 2) array of points: the origin, the bounce
+    points, and, if max_length cuts a ray short, its end point.
+  """
+  min_x, min_y, max_x, max_y = box
+  angles = np.atleast_1d(np.asarray(angles, dtype=float))
+  count = len(angles)
+  d_x = np.cos(angles)
+  d_y = np.sin(angles)
+  start_x = np.full(count, float(origin_x))
+  start_y = np.full(count, float(origin_y))
+
+  # Earliest max_bounces hits, from max_bounces candidate hits on each axis.
+  # A corner hit crosses both grid lines at once: count it as one bounce.
+  times = np.concatenate((_hit_times(start_x, d_x, min_x, max_x, max_bounces),
+    _hit_times(start_y, d_y, min_y, max_y, max_bounces)), axis=1)
+  times = np.sort(times, axis=1)
+  tolerance = CORNER_TOLERANCE * max(max_x - min_x, max_y - min_y)
+  with np.errstate(invalid='ignore'): # inf - inf, for rays that stop hitting one axis
+    corner = np.diff(times, axis=1) <= tolerance
+  times[:, 1:][corner] = np.inf
+  times = np.sort(times, axis=1)[:, :max_bounces]
+  times = np.concatenate((np.zeros((count, 1)), times), axis=1)
+
+  if max_length is None:
+    lengths = np.full(count, max_bounces + 1)
+  else:
+    lengths = np.sum(times < max_length, axis=1) + 1 # Points before the cap, plus the end point
+    times = np.minimum(times, max_length)
+
+  x = _fold(start_x[:, None] + times * d_x[:, None], min_x, max_x)
+  y = _fold(start_y[:, None] + times * d_y[:, None], min_y, max_y)
+  points = np.stack((x, y), axis=2)
+  return [points[index, :lengths[index]] for index in range(count)]
@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+"""
+Tool-aware scheduling for compositions of several elements.
+
+Each element of a scene (a circle, a spiral, a spread of rays...) is a list of
+strokes, tagged with the tool (brush, pen or colour) that paints it. The
+scheduler groups the elements by tool, so that the operator only changes tools
+once per tool, and orders the elements in each group to keep pen-up travel
+short: greedy nearest neighbour, where an element may be painted backwards if
+that brings its start closer.
+
+Every tool group starts from the home position, where the tool is changed,
+and ends there. The order of the groups therefore changes neither the number
+of tool changes nor the travel, and tools are painted in the order in which
+they were first registered: that order is the artist's, e.g., light colours
+before dark ones, or paint before the pen lines drawn over it.
+
+All coordinates are in the same units as the strokes (typically mm).
+"""
+import collections
+
+import numpy as np
+
+
+class Element:
+  """
+  One element of a scene.
+
+  Parameters:
+  - tool: Tag of the tool (brush, pen, colour) that paints the element.
+  - strokes: A list of strokes, each a list of (x, y) points, in painting order.
+  - name: Optional label, for printing the schedule.
+  """
+
+  def __init__(self, tool, strokes, name=None):
+    self.tool = tool
+    self.strokes = [stroke for stroke in strokes if len(stroke) >= 2]
+    self.name = name
+
+  def start(self):
+    """ First point of the element """
+    return tuple(self.strokes[0][0])
+
+  def end(self):
+    """ Last point of the element """
+    return tuple(self.strokes[-1][-1])
+
+  def reversed(self):
+    """ The same element, painted backwards """
+    strokes = [list(stroke)[::-1] for stroke in self.strokes[::-1]]
+    return Element(self.tool, strokes, self.name)
+
+  def pendown_distance(self):
+    """ Total length of the strokes """
+    return float(sum(np.sum(np.hypot(*np.diff(np.asarray(stroke, dtype=float), axis=0).T))
+      for stroke in self.strokes))
+
+  def travel_distance(self):
+    """ Pen-up travel between the strokes of the element """
+    return float(sum(np.hypot(after[0][0] - before[-1][0], after[0][1] - before[-1][1])
+      for before, after in zip(self.strokes[:-1], self.strokes[1:])))
+
+
+class Scene:
+  """
+  A composition of elements, painted with one or more tools.
+
+  Parameters:
+  - home: The (x, y) position where tools are changed, and where the plot starts.
+  - pendown_speed, travel_speed: Average pen-down and pen-up speeds, in distance
+    units per second, for estimating the time of a schedule.
+  - tool_change_time: Time taken by the operator to change tools, in seconds.
+  """
+
+  def __init__(self, home=(0, 0), pendown_speed=20.0, travel_speed=100.0, tool_change_time=30.0):
+    self.home = tuple(home)
+    self.pendown_speed = pendown_speed
+    self.travel_speed = travel_speed
+    self.tool_change_time = tool_change_time
+    self.elements = []
+
+  def add(self, tool, strokes, name=None):
+    """ Register an element, made of a list of strokes, painted with the given tool """
+    element = Element(tool, strokes, name)
+    if element.strokes:
+      self.elements.append(element)
+    return element
+
+  def _order(self, elements):
+    """
+    Order elements by greedy nearest neighbour from home, reversing an element
+    when its end is closer than its start.
+    """
+    remaining = list(elements)
+    ordered = []
+    position = np.array(self.home, dtype=float)
+    while remaining:
+      starts = np.array([element.start() for element in remaining], dtype=float)
+      ends = np.array([element.end() for element in remaining], dtype=float)
+      to_start = np.hypot(*(starts - position).T)
+      to_end = np.hypot(*(ends - position).T)
+      index = int(np.argmin(np.minimum(to_start, to_end)))
+      element = remaining.pop(index)
+      if to_end[index] < to_start[index]:
+        element = element.reversed()
+      ordered.append(element)
+      position = np.array(element.end(), dtype=float)
+    return ordered
+
+  def schedule(self):
+    """
+    Plan the scene.
+
+    Returns:
+    - A list of (tool, elements) groups, in painting order. Tools are in the
+      order in which they were first registered, which sets the layering of
+      colours; since each group starts and ends at home, reordering the
+      groups would not save any time.
+    """
+    groups = collections.OrderedDict()
+    for element in self.elements:
+      groups.setdefault(element.tool, []).append(element)
+    return [(tool, self._order(elements)) for tool, elements in groups.items()]
+
+  def estimate(self, plan):
+    """
+    Estimate the cost of a plan from schedule(), or of the elements in the order
+    registered with a tool change after each one, if plan is None.
+
+    Returns:
+    - A dict with:
+      - 'tool_changes': Number of pauses to change tools.
+      - 'pendown_distance': Total pen-down distance.
+      - 'travel_distance': Total pen-up travel, including returns to home.
+      - 'time': Estimated time, in seconds, including tool changes.
+    """
+    if plan is None:
+      plan = [(element.tool, [element]) for element in self.elements]
+    pendown = 0.0
+    travel = 0.0
+    for _tool, elements in plan:
+      position = self.home
+      for element in elements:
+        travel += float(np.hypot(element.start()[0] - position[0], element.start()[1] - position[1]))
+        travel += element.travel_distance()
+        pendown += element.pendown_distance()
+        position = element.end()
+      travel += float(np.hypot(self.home[0] - position[0], self.home[1] - position[1]))
+    tool_changes = max(len(plan) - 1, 0)
+    return {
+      'tool_changes': tool_changes,
+      'pendown_distance': pendown,
+      'travel_distance': travel,
+      'time': pendown / self.pendown_speed + travel / self.travel_speed +
+        tool_changes * self.tool_change_time,
+    }
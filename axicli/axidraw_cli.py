@@ -61,9 +61,9 @@ SOFTWARE.
 
 import argparse
 import copy
+import json
 import sys
 from lxml import etree
-from pyaxidraw.axidraw_options import common_options
 
 from axicli import utils
 
@@ -178,10 +178,28 @@ def axidraw_CLI(dev = False):
             action="store_const",  const='True', \
             help="Preview mode; simulate plotting only.")
 
+    parser.add_argument("--estimate", \
+            action="store_const",  const='True', \
+            help="Estimate plot time in closed form, without a full preview.")
+
     parser.add_argument("-g","--rendering", \
             metavar='RENDERCODE', type=int, \
-            help="Preview mode rendering option (0-3). 0: None. " \
-            + "1: Pen-down movement. 2: Pen-up movement. 3: All movement.")
+            help="Preview mode rendering option (0-5). 0: None. " \
+            + "1: Pen-down movement. 2: Pen-up movement. 3: All movement. " \
+            + "4: All movement, streamed to an SVG preview file. " \
+            + "5: All movement, as a PNG preview file colored by speed.")
+
+    parser.add_argument("--preview_file", \
+            metavar='FILE', type=str, \
+            help="Preview output file, for rendering options 4 and 5.")
+
+    parser.add_argument("--profile", \
+            metavar='FILE', type=str, \
+            help="Save the time & peak memory of each processing phase, as JSON.")
+
+    parser.add_argument("--profile_dir", \
+            metavar='DIR', type=str, \
+            help="With --profile, also save cProfile statistics for each phase here.")
 
     parser.add_argument("-G","--reordering", \
             metavar='VALUE', type=int, \
@@ -333,11 +351,25 @@ def axidraw_CLI(dev = False):
     combined_config = utils.FakeConfigModule(config_dict)
 
     from pyaxidraw import axidraw_control
+    from pyaxidraw import lightburn
 
-    adc = axidraw_control.AxiDrawWrapperClass(params = combined_config)
+    # Estimates, preview files, profiling and LightBurn projects need the pyaxidraw
+    # AxiDraw class; other plots run exactly as before.
+    use_control = bool(args.estimate or args.preview_file or args.profile) or\
+        (not use_trivial_file and lightburn.is_project(svg_input))
+
+    if use_control:
+        from pyaxidraw import control
+        adc = control.AxiDrawControl(params = combined_config)
+    else:
+        adc = axidraw_control.AxiDrawWrapperClass(params = combined_config)
 
     adc.getoptions([])
 
+    if args.profile:
+        from pyaxidraw import profiling
+        adc.profile = profiling.Profiler(dump_dir=args.profile_dir)
+
     if use_trivial_file:
         trivial_svg = """<?xml version="1.0" encoding="UTF-8" standalone="no"?>
             <svg
@@ -366,10 +398,20 @@ def axidraw_CLI(dev = False):
 
     adc.cli_api = True # Set flag that this is being called from the CLI.
 
+    if use_control:
+        adc.estimating = bool(args.estimate)
+        if args.estimate:
+            adc.options.report_time = True # Print the estimate
+        adc.preview_file = args.preview_file # Streamed to, during the preview
+
     exit_status.run(adc.effect)    # Plot the document
     if utils.has_output(adc) and not use_trivial_file:
         utils.output_result(args.output_file, adc.outdoc)
 
+    if args.profile:
+        with open(args.profile, 'w', encoding='utf-8') as profile_file:
+            json.dump(adc.profile.report(), profile_file, indent=2)
+
     if adc.status_code >= 100: # Give non-zero exit code.
         sys.exit(1) # No need to be more verbose; we have already printed error messages.
 
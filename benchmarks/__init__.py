@@ -0,0 +1,16 @@
+"""
+Performance benchmarks for pyaxidraw and the _my_art generators.
+
+Measures wall time and peak memory of each stage of the plotting pipeline, over
+the SVG files in _my_art/assets and synthetic documents of a given number of
+paths, and of the art generators. Results are saved as JSON, and can be
+compared against a saved baseline to flag regressions.
+
+Usage, from the top-level package dir:
+
+    python -m benchmarks --output results.json
+    python -m benchmarks --sizes 10000,100000,1000000 --no-memory
+    python -m benchmarks --baseline results.json
+
+See python -m benchmarks --help for all options.
+"""
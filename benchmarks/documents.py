@@ -0,0 +1,61 @@
+"""
+Benchmark input documents: the SVG assets, and synthetic documents with a
+given number of paths.
+"""
+
+import glob
+import math
+import os
+import random
+
+ASSET_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),\
+    '_my_art', 'assets')
+
+PAGE_WIDTH = 280    # mm; fits within the travel of all AxiDraw models
+PAGE_HEIGHT = 200   # mm
+
+
+def assets(asset_dir=ASSET_DIR):
+    ''' List of (name, SVG string) for each SVG file in asset_dir '''
+    documents = []
+    for file_name in sorted(glob.glob(os.path.join(asset_dir, '*.svg'))):
+        with open(file_name, encoding='utf-8') as svg_file:
+            documents.append((os.path.basename(file_name), svg_file.read()))
+    return documents
+
+
+def synthetic_svg(path_count, seed=1):
+    '''
+    Reproducible SVG document with path_count short polylines, of 2 to 8
+    vertices each, scattered uniformly over the page. Some paths end near where
+    another begins, so that path joining has work to do.
+    '''
+    rand = random.Random(seed)
+    lines = ['<svg xmlns="http://www.w3.org/2000/svg" version="1.1"'\
+        f' width="{PAGE_WIDTH}mm" height="{PAGE_HEIGHT}mm"'\
+        f' viewBox="0 0 {PAGE_WIDTH} {PAGE_HEIGHT}">',\
+        '<g fill="none" stroke="black" stroke-width="0.3">']
+    last = None
+    for _index in range(path_count):
+        if last is not None and rand.random() < 0.2:
+            x, y = last # Start where the previous path ended
+        else:
+            x = rand.uniform(5, PAGE_WIDTH - 5)
+            y = rand.uniform(5, PAGE_HEIGHT - 5)
+        points = [(x, y)]
+        for _vertex in range(rand.randint(1, 7)):
+            angle = rand.uniform(0, 2 * math.pi)
+            x = min(max(x + 2 * math.cos(angle), 0), PAGE_WIDTH)
+            y = min(max(y + 2 * math.sin(angle), 0), PAGE_HEIGHT)
+            points.append((x, y))
+        last = points[-1]
+        lines.append('<polyline points="' +\
+            ' '.join(f'{x:.2f},{y:.2f}' for x, y in points) + '"/>')
+    lines.append('</g>')
+    lines.append('</svg>')
+    return '\n'.join(lines)
+
+
+def synthetic(sizes, seed=1):
+    ''' List of (name, SVG string) for synthetic documents of each size (number of paths) '''
+    return [(f'synthetic-{size}', synthetic_svg(size, seed)) for size in sizes]
@@ -0,0 +1,169 @@
+"""
+Run the benchmarks, save the results as JSON, and compare them against a baseline.
+
+Each stage is timed over a number of runs, and the fastest run is reported.
+Peak memory is measured in one further run, traced by tracemalloc, so that
+tracing does not slow down the timed runs.
+
+Results are keyed by "<document>/<stage>", or "generators/<stage>". Compared
+against a baseline, a result is flagged as a regression when its time or peak
+memory exceeds the baseline by more than the given tolerance. The exit status
+is 1 if there are regressions.
+"""
+
+import argparse
+import datetime
+import fnmatch
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+from benchmarks import documents
+from benchmarks import stages
+
+
+def measure(prepare, run, repeat=3, memory=True):
+    '''
+    Time run(prepare()) repeat times, and measure its peak memory in one more run.
+    Returns a dictionary of the fastest time (s) and peak memory (bytes, or None).
+    '''
+    times = []
+    for _index in range(repeat):
+        state = prepare()
+        start = time.perf_counter()
+        run(state)
+        times.append(time.perf_counter() - start)
+    peak = None
+    if memory:
+        state = prepare()
+        tracemalloc.start()
+        try:
+            run(state)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return {'time_s': round(min(times), 6), 'peak_memory': peak}
+
+
+def run_benchmarks(inputs, repeat=3, memory=True, selected=None, generators=True, log=None):
+    '''
+    Measure the document stages for each (name, SVG string) in inputs, and the
+    generator stages. selected: Optional list of glob patterns; only stages
+    whose "<document>/<stage>" key matches one of them are run.
+    Returns a dictionary of key: measurement.
+    '''
+    cases = []
+    for name, svg in inputs:
+        cases.extend((f'{name}/{stage}', functions)\
+            for stage, functions in stages.document_stages(svg).items())
+    if generators:
+        cases.extend((f'generators/{stage}', functions)\
+            for stage, functions in stages.generator_stages().items())
+
+    results = {}
+    for key, (prepare, run) in cases:
+        if selected and not any(fnmatch.fnmatch(key, pattern) for pattern in selected):
+            continue
+        results[key] = measure(prepare, run, repeat, memory)
+        if log is not None:
+            log(_format(key, results[key]))
+    return results
+
+
+def _format(key, result):
+    text = f'{key:<45} {1000 * result["time_s"]:12.2f} ms'
+    if result['peak_memory'] is not None:
+        text += f' {result["peak_memory"] / 2**20:10.2f} MiB'
+    return text
+
+
+def metadata():
+    ''' Description of the environment that the benchmarks ran in '''
+    try:
+        import numpy # pylint: disable=import-outside-toplevel
+        numpy_version = numpy.__version__
+    except ImportError:
+        numpy_version = None
+    return {'date': datetime.datetime.now().isoformat(timespec='seconds'),\
+        'python': platform.python_version(), 'implementation': platform.python_implementation(),\
+        'platform': platform.platform(), 'processor': platform.processor(),\
+        'numpy': numpy_version}
+
+
+def compare(results, baseline, time_tolerance=0.25, memory_tolerance=0.10):
+    '''
+    Compare results against baseline results (both dictionaries of key: measurement).
+    Returns a list of regressions: dictionaries with the key, the quantity
+    ("time_s" or "peak_memory"), the baseline and present values, and their ratio.
+    Keys that are missing from either set of results are not compared.
+    '''
+    regressions = []
+    for key in sorted(set(results) & set(baseline)):
+        for quantity, tolerance in (('time_s', time_tolerance), ('peak_memory', memory_tolerance)):
+            old = baseline[key].get(quantity)
+            new = results[key].get(quantity)
+            if not old or new is None:
+                continue
+            ratio = new / old
+            if ratio > 1 + tolerance:
+                regressions.append({'key': key, 'quantity': quantity,\
+                    'baseline': old, 'value': new, 'ratio': round(ratio, 3)})
+    return regressions
+
+
+def _sizes(text):
+    return [int(size) for size in text.split(',') if size.strip()]
+
+
+def main(argv=None):
+    ''' Command-line interface. Returns the exit status. '''
+    parser = argparse.ArgumentParser(prog='python -m benchmarks',\
+        description='Benchmark pyaxidraw pipeline stages and the _my_art generators.')
+    parser.add_argument('--sizes', type=_sizes, default=[10000],\
+        help='Comma-separated numbers of paths in synthetic documents (default: 10000).'\
+            ' For example: 10000,100000,1000000')
+    parser.add_argument('--no-assets', action='store_true',\
+        help='Skip the SVG files in _my_art/assets')
+    parser.add_argument('--no-generators', action='store_true',\
+        help='Skip the _my_art generators')
+    parser.add_argument('--stages', nargs='+', metavar='PATTERN',\
+        help='Only run stages whose "<document>/<stage>" key matches a glob pattern,'\
+            ' e.g. "*/reorder_*"')
+    parser.add_argument('--repeat', type=int, default=3,\
+        help='Timed runs of each stage; the fastest is reported (default: 3)')
+    parser.add_argument('--no-memory', action='store_true',\
+        help='Do not measure peak memory (faster)')
+    parser.add_argument('--seed', type=int, default=1,\
+        help='Random seed of the synthetic documents (default: 1)')
+    parser.add_argument('--output', metavar='FILE', help='Save results as JSON to FILE')
+    parser.add_argument('--baseline', metavar='FILE',\
+        help='Compare results against those saved in FILE, and report regressions')
+    parser.add_argument('--time-tolerance', type=float, default=0.25,\
+        help='Allowed fractional increase in time over the baseline (default: 0.25)')
+    parser.add_argument('--memory-tolerance', type=float, default=0.10,\
+        help='Allowed fractional increase in peak memory over the baseline (default: 0.10)')
+    args = parser.parse_args(argv)
+
+    inputs = [] if args.no_assets else documents.assets()
+    inputs += documents.synthetic(args.sizes, args.seed)
+    results = run_benchmarks(inputs, max(args.repeat, 1), not args.no_memory, args.stages,\
+        not args.no_generators, log=print)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output_file:
+            json.dump({'meta': metadata(), 'results': results}, output_file, indent=1)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as baseline_file:
+            baseline = json.load(baseline_file)['results']
+        regressions = compare(results, baseline, args.time_tolerance, args.memory_tolerance)
+        for regression in regressions:
+            print(f'Regression: {regression["key"]} {regression["quantity"]}'\
+                f' {regression["baseline"]} -> {regression["value"]}'\
+                f' (x{regression["ratio"]})', file=sys.stderr)
+        if regressions:
+            return 1
+        print(f'No regressions against {args.baseline}')
+    return 0
@@ -0,0 +1,160 @@
+"""
+Benchmark stages.
+
+Each stage is a pair of functions: prepare(), which sets up the input for one
+run and is not measured, and run(state), which is measured.
+
+Document stages, for each input document:
+
+    plot_setup      Parse the SVG input
+    digest          Digest the document, without path joining or reordering (digest=2)
+    reorder_<n>     Path joining and reordering of the digest, at reordering level n
+    preview         Preview plot, with no rendering
+    estimate        Closed-form time estimate (requires NumPy)
+    plob_roundtrip  Convert the digest to a plob and back
+    store_lists     Copy the digest, with paths as lists of vertices (PathItem)
+    store_compact   Copy the digest, with compact paths (CompactPathItem)
+    lengths_lists   Length of every path of the digest
+    lengths_compact Length of every path of the compact digest
+
+Generator stages, from _my_art (require NumPy):
+
+    spiral, circles, nautilus, rays, scanline_fill, contour_fill
+"""
+
+import math
+import os
+import random
+import sys
+
+from axidrawinternal import path_objects, plot_optimizations
+
+from pyaxidraw import axidraw
+from pyaxidraw import compact_paths
+from pyaxidraw import estimate
+
+MY_ART_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '_my_art')
+
+REORDER_LEVELS = (0, 1, 2)
+
+DOCUMENT_STAGES = ('plot_setup', 'digest') +\
+    tuple(f'reorder_{level}' for level in REORDER_LEVELS) +\
+    ('preview', 'estimate', 'plob_roundtrip', 'store_lists', 'store_compact',\
+    'lengths_lists', 'lengths_compact')
+
+GENERATOR_STAGES = ('spiral', 'circles', 'nautilus', 'rays', 'scanline_fill', 'contour_fill')
+
+
+def _quiet(_message):
+    pass
+
+
+def _setup(svg, **options):
+    ''' AxiDraw instance with svg parsed and options set '''
+    ad = axidraw.AxiDraw(user_message_fun=_quiet)
+    ad.plot_setup(svg)
+    for name, value in options.items():
+        setattr(ad.options, name, value)
+    return ad
+
+
+def _digest(svg):
+    ''' AxiDraw instance, after digesting svg without path joining or reordering '''
+    ad = _setup(svg, digest=2, reordering=4)
+    ad.plot_run()
+    return ad
+
+
+def _reorder(level):
+    ''' Path joining and reordering, as done by plot_run at the given reordering level '''
+    allow_reverse = level in [2, 3]
+    def run(ad):
+        if level < 3:
+            plot_optimizations.connect_nearby_ends(ad.digest, allow_reverse, ad.params.min_gap)
+        if level in [1, 2, 3]:
+            plot_optimizations.reorder(ad.digest, allow_reverse)
+    return run
+
+
+def _plob_roundtrip(ad):
+    digest = path_objects.DocDigest()
+    digest.from_plob(ad.digest.to_plob())
+    return digest
+
+
+def _lengths(ad):
+    return [path.length() for layer in ad.digest.layers for path in layer.paths]
+
+
+def _compact_digest(svg):
+    ''' AxiDraw instance, after digesting svg, with its digest made compact '''
+    ad = _digest(svg)
+    ad.digest = compact_paths.compact(ad.digest)
+    return ad
+
+
+def document_stages(svg):
+    ''' Dictionary of stage name: (prepare, run) for one SVG document '''
+    stages = {
+        'plot_setup': (lambda: axidraw.AxiDraw(user_message_fun=_quiet),\
+            lambda ad: ad.plot_setup(svg)),
+        'digest': (lambda: _setup(svg, digest=2, reordering=4), lambda ad: ad.plot_run()),
+        'preview': (lambda: _setup(svg, preview=True, rendering=0), lambda ad: ad.plot_run()),
+        'plob_roundtrip': (lambda: _digest(svg), _plob_roundtrip),
+        'store_lists': (lambda: _digest(svg), lambda ad: compact_paths.expand(ad.digest)),
+        'store_compact': (lambda: _digest(svg), lambda ad: compact_paths.compact(ad.digest)),
+        'lengths_lists': (lambda: _digest(svg), _lengths),
+        'lengths_compact': (lambda: _compact_digest(svg), _lengths),
+    }
+    for level in REORDER_LEVELS:
+        stages[f'reorder_{level}'] = (lambda: _digest(svg), _reorder(level))
+    if estimate.np is not None:
+        stages['estimate'] = (lambda: _setup(svg), lambda ad: ad.estimate())
+    return {name: stages[name] for name in DOCUMENT_STAGES if name in stages}
+
+
+def _random_polygon(rand, center_x, center_y, num_sides, radius):
+    ''' Random star-shaped polygon, as in make_sonar.generate_random_polygon '''
+    vertices = []
+    for index in range(num_sides):
+        angle = index * 2 * math.pi / num_sides
+        vertex_radius = rand.uniform(0.5 * radius, radius)
+        vertices.append((center_x + vertex_radius * math.cos(angle),\
+            center_y + vertex_radius * math.sin(angle)))
+    return vertices
+
+
+def _polygons():
+    rand = random.Random(1)
+    return [_random_polygon(rand, 150, 150, rand.randint(3, 12), 100) for _index in range(20)]
+
+
+def generator_stages():
+    ''' Dictionary of stage name: (prepare, run) for the _my_art generators, or {} without NumPy '''
+    if estimate.np is None:
+        return {}
+    if MY_ART_DIR not in sys.path:
+        sys.path.append(MY_ART_DIR)
+    import fill         # pylint: disable=import-outside-toplevel, import-error
+    import geometry     # pylint: disable=import-outside-toplevel, import-error
+    import nautilus     # pylint: disable=import-outside-toplevel, import-error
+    import rays         # pylint: disable=import-outside-toplevel, import-error
+
+    def circles(_state):
+        return [geometry.circle_points(150, 150, 0.5 * radius) for radius in range(1, 300)]
+
+    def fill_all(function):
+        return lambda vertices: [function(polygon, 1.0) for polygon in vertices]
+
+    stages = { # Parameters as used by make_sonar
+        'spiral': (lambda: None,\
+            lambda _state: geometry.archimedean_spiral_points(150, 150, 140, 0.5)),
+        'circles': (lambda: None, circles),
+        'nautilus': (lambda: None, lambda _state: nautilus.generate_nautilus_with_crossbeams(\
+            150, 100, 295, 295, 3, 0.19, 0.9, 15000, 15*math.pi, 0.2)),
+        'rays': (lambda: None, lambda _state: rays.bounce_rays(150, 150,\
+            rays.ray_angles(45, 2000, 90), (5, 5, 295, 295), max_bounces=20)),
+        'scanline_fill': (_polygons, fill_all(fill.scanline_fill)),
+        'contour_fill': (_polygons, fill_all(fill.contour_fill)),
+    }
+    return {name: stages[name] for name in GENERATOR_STAGES}
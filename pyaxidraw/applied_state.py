@@ -0,0 +1,175 @@
+# coding=utf-8
+#
+# Copyright 2023 Windell H. Oskay, Evil Mad Scientist Laboratories
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+
+"""
+pyaxidraw/applied_state.py
+
+Track the settings last sent to the EBB, so that update() can send only those
+that have changed.
+
+In the Python interactive API, update() used to reconfigure the servo and the
+motors in full, every time that it was called. Most option changes need few or
+no EBB commands: speeds and acceleration are only used when planning motion,
+and a new pen-down height or pen rate takes one command to set.
+"""
+
+from axidrawinternal.plot_utils_import import from_dependency_import # plotink
+from axidrawinternal import pen_handling
+ebb_motion = from_dependency_import('plotink.ebb_motion')
+
+# Servo values that update() can send on their own, with one command each.
+# A change in any other servo value requires a full servo_init().
+SINGLE_COMMANDS = ('pen_down_pos', 'pen_up_rate', 'pen_down_rate')
+
+
+def servo_values(ad_ref):
+    '''
+    Dictionary of the servo settings that servo_init() sends to the EBB, as
+    EBB values, with those settings that select the servo configuration.
+    '''
+    options = ad_ref.options
+    params = ad_ref.params
+    narrow_band = options.penlift == 3
+    if narrow_band:
+        servo_max, servo_min = params.nb_servo_max, params.nb_servo_min
+        servo_sweep_time = params.nb_servo_sweep_time
+        pwm_period = 0.03
+        servo_pin = params.nb_servo_pin
+    else:
+        servo_max, servo_min = params.servo_max, params.servo_min
+        servo_sweep_time = params.servo_sweep_time
+        pwm_period = 0.24
+        servo_pin = params.servo_pin
+    servo_range = servo_max - servo_min
+    servo_slope = float(servo_range) / 100.0
+    servo_rate_scale = float(servo_range) * pwm_period / servo_sweep_time
+    return {
+        'narrow_band': narrow_band,
+        'servo_pin': servo_pin,
+        'servo_timeout': params.servo_timeout,
+        'use_b3_out': params.use_b3_out,
+        'pen_pos_up': options.pen_pos_up,
+        'pen_up_pos': int(round(servo_min + servo_slope * options.pen_pos_up)),
+        'pen_down_pos': int(round(servo_min + servo_slope * ad_ref.pen.heights.pen_pos_down)),
+        'pen_up_rate': int(round(servo_rate_scale * options.pen_rate_raise)),
+        'pen_down_rate': int(round(servo_rate_scale * options.pen_rate_lower)),
+        }
+
+
+class UpdateStats: # pylint: disable=too-few-public-methods
+    '''
+    Counts of update() calls, and of EBB commands that a full reconfiguration
+    would have sent, but that were skipped because their values had not changed.
+    Changes of temporary pen height (from layer names or path attributes) are
+    applied in the same way, and counted as well.
+    '''
+
+    def __init__(self):
+        self.updates = 0
+        self.full_servo_inits = 0
+        self.commands_sent = 0
+        self.commands_skipped = 0
+
+    def reset(self):
+        ''' Clear all counts '''
+        self.__init__()
+
+
+class TrackingPenHandler(pen_handling.PenHandler):
+    ''' PenHandler that keeps the servo settings that it last sent to the EBB '''
+
+    def __init__(self):
+        super().__init__()
+        self.sent = None # servo_values() as last sent; None if unknown
+
+    def servo_init(self, ad_ref):
+        ''' Configure the servo, and keep the settings sent '''
+        super().servo_init(ad_ref)
+        if not ad_ref.options.preview and ad_ref.plot_status.port is not None:
+            self.sent = servo_values(ad_ref)
+
+    def set_temp_height(self, ad_ref, temp_height):
+        '''Begin using temporary pen height position, sending only the settings changed'''
+        if self.heights.set_temp_height(ad_ref, temp_height):
+            self.apply_changes(ad_ref, ad_ref.update_stats)
+
+    def end_temp_height(self, ad_ref):
+        '''End use of temporary pen height position, sending only the settings changed'''
+        if self.heights.end_temp_height(ad_ref):
+            self.apply_changes(ad_ref, ad_ref.update_stats)
+
+    def full_init_commands(self, ad_ref, values):
+        '''
+        Number of commands that servo_init() would send for values, given
+        the settings last sent: 4 or 5 to configure the servo, and, if the pen
+        heights have changed, the pen movement, EBBLV, and PWM configuration.
+        '''
+        count = 5 if values['use_b3_out'] else 4
+        if self.status.config == [ad_ref.options.pen_pos_up, self.heights.pen_pos_down,\
+                self.heights.narrow_band]:
+            return count
+        if self.phys.z_up is False: # Pen-down height applied at once
+            count += 2 if values['use_b3_out'] else 1
+        count += 1 if values['narrow_band'] else 2 # SC,8 and servo timeout
+        return count + 1 # EBBLV
+
+    def apply_changes(self, ad_ref, stats):
+        '''
+        Apply changed servo settings to the EBB, sending only the commands whose
+        values have changed, when possible. Otherwise, call servo_init().
+        '''
+        if ad_ref.options.preview or ad_ref.plot_status.port is None:
+            self.servo_init(ad_ref)
+            return
+        self.heights.narrow_band = ad_ref.options.penlift == 3
+        self.heights.update(ad_ref) # Pen-down height and transit times, computed locally
+        values = servo_values(ad_ref)
+        full_count = self.full_init_commands(ad_ref, values)
+        if self.sent is None or self.phys.z_up is None or\
+                any(values[key] != self.sent[key] for key in values\
+                    if key not in SINGLE_COMMANDS) or\
+                self.status.config[0] != ad_ref.options.pen_pos_up or\
+                self.status.config[2] != self.heights.narrow_band:
+            self.servo_init(ad_ref)
+            stats.full_servo_inits += 1
+            stats.commands_sent += full_count
+            return
+
+        port = ad_ref.plot_status.port
+        sent = 0
+        if values['pen_down_pos'] != self.sent['pen_down_pos']:
+            ebb_motion.setPenDownPos(port, values['pen_down_pos'], False)
+            sent += 1
+        if values['pen_up_rate'] != self.sent['pen_up_rate']:
+            ebb_motion.setPenUpRate(port, values['pen_up_rate'], False)
+            sent += 1
+        if values['pen_down_rate'] != self.sent['pen_down_rate']:
+            ebb_motion.setPenDownRate(port, values['pen_down_rate'], False)
+            sent += 1
+        if self.status.config[1] != self.heights.pen_pos_down:
+            if self.phys.z_up is False: # Pen is down; move it to the new height
+                ebb_motion.sendPenDown(port, self.heights.times.lower_time,\
+                    values['servo_pin'], False)
+                sent += 1
+                if values['use_b3_out']: # I/O Pin B3 output: high
+                    ebb_motion.PBOutValue(port, 3, 1, False)
+                    sent += 1
+            self.status.config[1] = self.heights.pen_pos_down
+        self.sent = values
+        stats.commands_sent += sent
+        stats.commands_skipped += max(full_count - sent, 0)
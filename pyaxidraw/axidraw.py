@@ -29,22 +29,40 @@ __version__ = '3.9.6'  # Dated 2023-12-12
 import math
 import gettext
 import copy
+import contextlib
 import logging
 import threading
 import signal
+import time
 
 from lxml import etree
 
 from axidrawinternal import axidraw
 
 from axidrawinternal.plot_utils_import import from_dependency_import # plotink
-from axidrawinternal import boundsclip, serial_utils
+from axidrawinternal import boundsclip, serial_utils, motion, dripfeed, plot_optimizations
+from axidrawinternal import digest_svg
 inkex = from_dependency_import('ink_extensions.inkex')
 ebb_motion = from_dependency_import('plotink.ebb_motion')
 ebb_serial = from_dependency_import('plotink.ebb_serial')
 plot_utils = from_dependency_import('plotink.plot_utils')
+simpletransform = from_dependency_import('ink_extensions.simpletransform')
 path_objects = from_dependency_import('axidrawinternal.path_objects')
 from axicli import utils as axicli_utils
+from pyaxidraw import simplify
+from pyaxidraw import length_index
+from pyaxidraw import journal
+from pyaxidraw import estimate
+from pyaxidraw import preview_stream
+from pyaxidraw import telemetry
+from pyaxidraw import profiling
+from pyaxidraw import replay
+from pyaxidraw import layer_session
+from pyaxidraw import applied_state
+from pyaxidraw import path_attributes
+from pyaxidraw import device_cache
+from pyaxidraw import lightburn
+from pyaxidraw import compact_paths
 
 logger = logging.getLogger(__name__)
 
@@ -73,10 +91,42 @@ class AxiDraw(axidraw.AxiDraw):
         self.distance_total = 0
         self.pen_lifts = 0
         self.software_initiated_pause_event = None
+        self._controller_pause_event = None # Set up by a controller, e.g., axidraw_control
         self.fw_version_string = None
         self.keyboard_pause = False
         self.errors = ErrConfig()
         self._interrupted = False # Duplicate flag for keyboard interrupt for special cases.
+        self.simplify_tolerance = 0 # Inches. 0: Disable simplification. None: One motor step.
+        self.simplify_stats = simplify.SimplifyStats()
+        self._interrupted_batch = None # Paths, digest, distance drawn, offset & journal batch
+        self.journal_file = None # Record interactive plotting progress in this file
+        self.journal_data = {} # Data saved at the start of the journal, e.g., a random seed
+        self._journal = None
+        self._recovery = None # Progress read from the journal, when recovering
+        self._batch_count = 0 # Number of draw_path or draw_paths calls in session
+        self._estimating = False # True while computing a closed-form time estimate
+        self._indexed = False # Save a length index of the digest, if the plot is paused
+        self.preview = preview_stream.StreamingPreview()
+        self.preview_file = None # Preview output file, for rendering options 4 and 5
+        self.telemetry_callback = None # Function to receive telemetry events (dicts)
+        self.telemetry_file = None # Append telemetry events to this file, as JSON lines
+        self._telemetry = None
+        self.profile = False # True, or a profiling.Profiler, to profile each pipeline phase
+        self.profile_report = None # Summary of the last profiled plot_run
+        self._profiler = None
+        self._profile_parsed = False # True if plot_setup was profiled, before plot_run
+        self.replay_copies = True # Plan the first copy only; replay its plans for the others
+        self._plan = None # replay.PlanCache, when plotting multiple copies
+        self._next_copy = None # Thread preparing the next copy, and its digest & random seed
+        self._layer_session = None # layer_session.LayerSession: Digest of all layers
+        self._building_session = False # True while plot_layer digests all layers
+        self.pen = applied_state.TrackingPenHandler()
+        self.update_stats = applied_state.UpdateStats() # Commands sent and skipped by update()
+        self._motor_resolution = None # Resolution that the motors were last enabled at
+        self.layer_speed_pendown = -1 # Pen-down speed of this layer, or path; see draw_paths
+        self.device_cache_file = device_cache.DEFAULT_CACHE_FILE # None: Do not cache ports
+        self.connect_source = None # "cache" or "discovery": How the last connection was found
+        self.imported_digest = None # Compact DocDigest read by plot_setup, e.g., from LightBurn
 
     def set_up_pause_transmitter(self):
         """ intercept ctrl-C (keyboard interrupt) and redefine as "pause" command """
@@ -96,8 +146,64 @@ class AxiDraw(axidraw.AxiDraw):
             self.software_initiated_pause_event.clear()
         self._interrupted = False
 
+    def set_up_pause_receiver(self, software_pause_event):
+        '''
+        Same as the base class. If called before plot_run(), e.g., by a controller
+        plotting on several AxiDraws, plot_run() also receives pause requests
+        from this event, rather than from its own.
+        '''
+        self._controller_pause_event = software_pause_event
+        super().set_up_pause_receiver(software_pause_event)
+
     def connect(self):
-        '''Python Interactive context: Open connection to AxiDraw'''
+        '''
+        Python Interactive context: Open connection to AxiDraw.
+        If journal_file is set, start a new journal of plotting progress.
+        '''
+        connected = self._connect()
+        if not connected:
+            return connected
+        self._recovery = None
+        self._batch_count = 0
+        self._start_journal(False)
+        return True
+
+    def recover(self, journal_file=None):
+        '''
+        Python Interactive context: Reconnect after a crash, and skip what was
+        already drawn. Reads the journal (journal_file, if given) written by a
+        previous session, and opens the connection to the AxiDraw, which should
+        be at its Home position. When the script then repeats the same
+        draw_path and draw_paths calls, those that were completed are skipped,
+        and the one that was interrupted continues from where it stopped.
+        journal_data is restored from the journal, e.g., to reuse a random seed.
+        Returns True if connected, and False if not, or if no journal was found.
+        '''
+        if not self._verify_interactive():
+            return None
+        if journal_file is not None:
+            self.journal_file = journal_file
+        try:
+            records = journal.Journal.read(self.journal_file)
+        except (OSError, TypeError):
+            logger.error("Unable to read journal file: %s", self.journal_file)
+            return False
+        if not self._connect():
+            return False
+        self._recovery = journal.JournalRecovery(records)
+        self.journal_data = self._recovery.data
+        self._batch_count = 0
+        self._start_journal(True)
+        return True
+
+    @property
+    def recovering(self):
+        '''True while recover() is skipping past paths that were already drawn'''
+        return self._recovery is not None and\
+            self._batch_count <= self._recovery.last_batch
+
+    def _connect(self):
+        '''Open connection to AxiDraw'''
         if not self._verify_interactive():
             return None
 
@@ -114,6 +220,9 @@ class AxiDraw(axidraw.AxiDraw):
 
         self.pen.turtle = copy.copy(self.pen.phys)
         self.pen.turtle.z_up = True # Theoretical pen starts UP.
+        self.simplify_stats.reset()
+        self.use_layer_speed = False # Set per path by path attributes; see draw_paths
+        self.layer_speed_pendown = -1
 
         # Query if button pressed, to clear the result:
         ebb_motion.QueryPRGButton(self.plot_status.port)
@@ -122,15 +231,128 @@ class AxiDraw(axidraw.AxiDraw):
         self.enable_motors()         # Set plot resolution & speed & enable motors
         return True
 
+    def serial_connect(self):
+        '''
+        Connect to AxiDraw over USB. Try the port that this AxiDraw (by name, or
+        the first available) was last found at, as recorded in device_cache_file,
+        then probe all candidate ports in parallel. With device_cache_file None,
+        or given an open serial port object as the port option, connect as before.
+        '''
+        if self.device_cache_file is None or (self.options.port and\
+                not isinstance(self.options.port, str)):
+            self.connect_source = None
+            super().serial_connect()
+            return
+        requested = None
+        if self.options.port_config != 1 and self.options.port:
+            requested = str(self.options.port).strip('\"')
+        self.options.port = None # Ensure that the port is closed later, as in serial_utils
+        found = device_cache.open_device(requested, self.device_cache_file)
+        if found is None:
+            self.plot_status.port = None
+            if requested:
+                self.user_message_fun('Failed to connect to AxiDraw ' + requested)
+            else:
+                self.user_message_fun("Failed to connect to AxiDraw.")
+            self.plot_status.stopped = 101 # Will become exit code 101; failed to connect
+            return
+        self.plot_status.port, version_string, self.connect_source = found
+        self.plot_status.fw_version = version_string.split("Firmware Version ", 1)[-1].strip()
+        self.connected = True  # Variable available in the Python interactive API.
+        logger.debug("Connected successfully (%s)", self.connect_source)
+
+    def _start_journal(self, recovering):
+        '''Open the journal file, if any, and record the start of the session'''
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        if self.journal_file is None:
+            return
+        self._journal = journal.Journal(self.journal_file)
+        self._journal.open(append=recovering)
+        if recovering:
+            self._journal.write({"event": "recover", "time": time.time()}, sync=True)
+        else:
+            self._journal.write({"event": "session", "time": time.time(),\
+                "data": self.journal_data}, sync=True)
+
+    def disconnect(self):
+        '''End serial session; write journal records, if any, to disk'''
+        super().disconnect()
+        self._forget_applied()
+        if self._journal is not None:
+            self._journal.sync()
+        self._telemetry_close()
+
+    def _forget_applied(self):
+        '''The EBB settings are no longer known; the next update() sends them all'''
+        self.pen.sent = None
+        self._motor_resolution = None
+
+    def _get_profiler(self):
+        '''Return the Profiler to use if profiling is enabled, else None'''
+        if not self.profile:
+            self._profiler = None
+        elif isinstance(self.profile, profiling.Profiler):
+            self._profiler = self.profile
+        elif self._profiler is None:
+            self._profiler = profiling.Profiler()
+        return self._profiler
+
+    def _phase(self, name):
+        '''Context measuring a phase of a profiled plot_run, if this one is being profiled'''
+        if self._profiler is None or self._profiler.instrumented is not self:
+            return contextlib.nullcontext()
+        return self._profiler.phase(name)
+
     def plot_setup(self, svg_input=None, argstrings=None):
         """Python module plot context: Begin plot context & parse SVG file"""
-        file_ok = False
+        profiler = self._get_profiler()
+        self._profile_parsed = profiler is not None
+        if profiler is None:
+            self._plot_setup(svg_input, argstrings)
+            return
+        profiler.reset()
+        with profiler.session(), profiler.phase("parse"):
+            self._plot_setup(svg_input, argstrings)
+
+    def setup_document(self, document, imported_digest=None):
+        """
+        Python module plot context: Begin plot context with an SVG document
+        parsed elsewhere, e.g., by pyaxidraw.control; as plot_setup, but the
+        document (an lxml ElementTree) is used as is, without a copy.
+        imported_digest, if given, is a compact digest to plot in place of the
+        document contents, as read by plot_setup from a LightBurn project.
+        """
+        self._profile_parsed = self._get_profiler() is not None # Parsed, if at all, by caller
+        self._begin_setup(None)
+        self.document = document
+        self.original_document = document
+        self.imported_digest = imported_digest
+        self.getdocids()
+
+    def _begin_setup(self, argstrings):
+        """Begin plot context: Set options, and forget the previous document"""
         inkex.localize()
         self.getoptions([] if argstrings is None else argstrings)
+        self._layer_session = None
 
         self.original_dist = self.options.dist # Remove in v 4.0
         self.old_walk_dist = None # Remove in v 4.0
 
+        self.imported_digest = None
+
+    def _plot_setup(self, svg_input, argstrings):
+        """Begin plot context & parse SVG file"""
+        file_ok = False
+        self._begin_setup(argstrings)
+        if lightburn.is_project(svg_input): # Read straight into a digest; no SVG to parse
+            self.imported_digest, self.document = lightburn.import_project(svg_input,\
+                self.params.curve_tolerance)
+            self.original_document = copy.deepcopy(self.document)
+            self.getdocids()
+            return
+
         if svg_input is None:
             svg_input = plot_utils.trivial_svg
         try: # Parse input file or SVG string
@@ -157,7 +379,24 @@ class AxiDraw(axidraw.AxiDraw):
         # self.suppress_standard_output_stream()
 
     def plot_run(self, output=False):
-        '''Python module plot context: Plot document'''
+        '''
+        Python module plot context: Plot document.
+        If profile is set, profile_report gives the time and peak memory of each
+        phase of plot_setup and plot_run.
+        '''
+        profiler = self._get_profiler()
+        if profiler is None:
+            return self._plot_run(output)
+        if not self._profile_parsed:
+            profiler.reset()
+        self._profile_parsed = False
+        with profiler.instrument(self):
+            result = self._plot_run(output)
+        self.profile_report = profiler.report()
+        return result
+
+    def _plot_run(self, output):
+        '''Plot document'''
 
         self.set_up_pause_transmitter()
 
@@ -200,9 +439,19 @@ class AxiDraw(axidraw.AxiDraw):
         ### END SECTION FOR REMOVAL IN 4.0 ###
 
         self.set_defaults() # Re-initialize some items normally set at __init__
-        self.set_up_pause_receiver(self.software_initiated_pause_event)
-        self.effect()
+        self.simplify_stats.reset()
+        self._indexed = False
+        self._plan = None
+        if self._controller_pause_event is None:
+            super().set_up_pause_receiver(self.software_initiated_pause_event)
+        try:
+            self.effect()
+        finally:
+            self._telemetry_close()
+            self._join_next_copy()
+            self._plan = None
         self.clear_pause_request()
+        self.save_length_index()
         #self.fw_version_string is a public string made available to Python API:
         self.fw_version_string = self.plot_status.fw_version
 
@@ -225,6 +474,527 @@ class AxiDraw(axidraw.AxiDraw):
             return self.get_output()
         return None
 
+    def estimate(self):
+        '''
+        Python module plot context: Estimate the time to plot the document, in
+        seconds, without plotting. Gives nearly the same result as plot_run()
+        with preview enabled, but computes the time of each path in closed form
+        instead of simulating each motion command, which is much faster.
+        Also sets time_estimate, distance_pendown, distance_total & pen_lifts.
+        Without NumPy, this runs a standard preview.
+        '''
+        old_preview = self.options.preview
+        old_rendering = self.options.rendering
+        self.options.preview = True
+        self.options.rendering = 0
+        self._estimating = estimate.np is not None
+        try:
+            self.plot_run()
+        finally:
+            self._estimating = False
+            self.options.preview = old_preview
+            self.options.rendering = old_rendering
+        return self.time_estimate
+
+    def get_simplify_tolerance(self):
+        '''
+        Return the path simplification tolerance, in inches: simplify_tolerance,
+        0 (off) by default. If simplify_tolerance is None, this is the distance
+        of one motor step at the current resolution; finer detail cannot be plotted.
+        '''
+        if self.simplify_tolerance is not None:
+            return self.simplify_tolerance
+        if self.options.resolution == 2:  # Low-resolution mode
+            return self.params.max_step_dist_lr
+        return self.params.max_step_dist_hr
+
+    def prepare_document(self):
+        '''
+        Prepare document digest, then simplify paths after clipping & optimization.
+        When plotting a layer of a layer session, take its digest from the session.
+        '''
+        layer = self.plot_status.resume.new.layer
+        if layer >= 0 and self.options.mode in ("layers", "res_plot") and\
+                self.plot_status.resume.old.plob_version in (None, "n/a"): # Not a plob
+            session_key = layer_session.session_key(self)
+            if self._layer_session is not None and self._layer_session.key == session_key:
+                return self._prepare_session_layer(layer)
+            if self._building_session:
+                self.plot_status.resume.new.layer = -1 # Digest all layers
+                try:
+                    if not self._prepare_digest():
+                        return False
+                finally:
+                    self.plot_status.resume.new.layer = layer
+                self._layer_session = layer_session.LayerSession(self.digest, session_key,\
+                    self.plot_status.resume.new.rand_seed)
+                return self._prepare_session_layer(layer)
+        if not self._prepare_digest():
+            return False
+        self.index_digest()
+        return True
+
+    def _prepare_digest(self):
+        '''Prepare document digest, and simplify its paths'''
+        if self.imported_digest is not None:
+            if not self._prepare_imported():
+                return False
+        elif not self._prepare_svg():
+            return False
+        with self._phase("simplify"):
+            self.simplify_stats.add_counts(*simplify.simplify_digest(self.digest,\
+                self.get_simplify_tolerance()))
+        return True
+
+    def _prepare_session_layer(self, layer):
+        '''
+        Same as prepare_document, for one layer of the layer session: Read the
+        document properties, but take the prepared digest from the session.
+        '''
+        if not self.get_doc_props():
+            logger.error(gettext.gettext('This document does not have valid dimensions.'))
+            logger.error(gettext.gettext(
+                'The page size should be in either millimeters (mm) or inches (in).\r\r'))
+            return False
+
+        if not hasattr(self, 'backup_original'):
+            self.backup_original = copy.deepcopy(self.document)
+
+        self._set_viewbox_transform()
+
+        if self._layer_session.rand_seed is not None and self.options.mode != "res_plot":
+            self.plot_status.resume.new.rand_seed = self._layer_session.rand_seed
+        self.digest = self._layer_session.digest(layer)
+        self.index_digest()
+        return True
+
+    def _set_viewbox_transform(self):
+        '''Set vb_stash and svg_transform from the document viewBox, as prepare_document'''
+        v_b = self.svg.get('viewBox')
+        if v_b:
+            p_a_r = self.svg.get('preserveAspectRatio')
+            s_x, s_y, o_x, o_y = plot_utils.vb_scale(v_b, p_a_r, self.svg_width, self.svg_height)
+        else:
+            s_x = 1.0 / float(plot_utils.PX_PER_INCH) # Handle case of no viewbox
+            s_y = s_x
+            o_x = 0.0
+            o_y = 0.0
+        self.vb_stash = s_x, s_y, o_x, o_y
+        self.svg_transform = simpletransform.parseTransform(\
+                f'scale({s_x:.6E},{s_y:.6E}) translate({o_x:.6E},{o_y:.6E})')
+
+    def _prepare_svg(self):
+        '''
+        Same as the base class prepare_document: digest the SVG document, then
+        clip and optimize the digest. If profiled, each stage is a phase.
+        '''
+        if not self.get_doc_props():
+            logger.error(gettext.gettext('This document does not have valid dimensions.'))
+            logger.error(gettext.gettext(
+                'The page size should be in either millimeters (mm) or inches (in).\r\r'))
+            logger.error(gettext.gettext(
+                'Consider starting with the Letter landscape or '))
+            logger.error(gettext.gettext('the A4 landscape template.\r\r'))
+            logger.error(gettext.gettext('The page size may also be set in Inkscape,\r'))
+            logger.error(gettext.gettext('using File > Document Properties.'))
+            return False
+
+        if not hasattr(self, 'backup_original'):
+            self.backup_original = copy.deepcopy(self.document)
+        self._set_viewbox_transform()
+        s_x, s_y = self.vb_stash[0], self.vb_stash[1]
+
+        valid_plob = False
+        if self.plot_status.resume.old.plob_version:
+            logger.debug('Checking Plob')
+            valid_plob = digest_svg.verify_plob(self.svg, self.options.model)
+        if valid_plob:
+            logger.debug('Valid plob found; skipping standard pre-processing.')
+            self.digest = path_objects.DocDigest()
+            self.digest.from_plob(self.svg)
+            self.plot_status.resume.new.plob_version = str(path_objects.PLOB_VERSION)
+            return True
+
+        with self._phase("digest"): # Process the SVG into a restricted-format DocDigest
+            digester = digest_svg.DigestSVG()
+            if self.options.hiding: # Process all visible layers
+                digest_params = [self.svg_width, self.svg_height, s_x, s_y,\
+                    -2, self.params.curve_tolerance]
+            else: # Process only selected layer, if in layers mode
+                digest_params = [self.svg_width, self.svg_height, s_x, s_y,\
+                    self.plot_status.resume.new.layer, self.params.curve_tolerance]
+            self.digest = digester.process_svg(self.svg, self.warnings,
+                digest_params, self.svg_transform,)
+            if self.rotate_page: # Rotate digest
+                self.digest.rotate(self.params.auto_rotate_ccw)
+
+        if self.options.hiding: # Hidden-line clipping, from fills, clipping masks & bounds
+            with self._phase("hidden_lines"):
+                # Non-pure Python dependency (pyclipper); only import when necessary
+                from axidrawinternal.clipping import ClipPathsProcess
+                bounds = ClipPathsProcess.calculate_bounds(self.bounds, self.svg_height,\
+                    self.svg_width, self.params.clip_to_page, self.rotate_page)
+                assert not self.digest.flat # Flattening removes information needed here
+                self.digest.layers = ClipPathsProcess().run(self.digest.layers,\
+                    bounds, clip_on=True)
+                self.digest.layer_filter(self.plot_status.resume.new.layer) # For Layers mode
+                self.digest.remove_unstroked() # Only stroked objects can plot
+                self.digest.flatten() # Flatten digest before optimizations and plotting
+        else:
+            self._clip_digest()
+        self._optimize_digest()
+        return True
+
+    def _prepare_imported(self):
+        '''
+        Same as prepare_document, for a digest imported by plot_setup: rotate,
+        clip, and optimize a copy of it, in place of digesting the SVG document.
+        Hidden-line removal does not apply; imported paths have no fills.
+        '''
+        if not self.get_doc_props():
+            logger.error(gettext.gettext('This document does not have valid dimensions.'))
+            return False
+
+        if not hasattr(self, 'backup_original'):
+            self.backup_original = copy.deepcopy(self.document)
+        self._set_viewbox_transform()
+
+        with self._phase("digest"):
+            self.digest = compact_paths.expand(self.imported_digest)
+            self.digest.layer_filter(self.plot_status.resume.new.layer) # For Layers mode
+            if self.rotate_page:
+                self.digest.rotate(self.params.auto_rotate_ccw)
+            self.digest.flatten()
+        self._clip_digest()
+        self._optimize_digest()
+        return True
+
+    def _clip_digest(self):
+        '''Clip the flat digest at the plot bounds'''
+        with self._phase("clip"):
+            if self.rotate_page:
+                doc_bounds = [self.svg_height + 1e-9, self.svg_width + 1e-9]
+            else:
+                doc_bounds = [self.svg_width + 1e-9, self.svg_height + 1e-9]
+            if boundsclip.clip_at_bounds(self.digest, self.bounds, doc_bounds,\
+                    self.params.bounds_tolerance, self.params.clip_to_page):
+                self.warnings.add_new('bounds')
+
+    def _optimize_digest(self):
+        '''Join nearby path ends & supersample; then randomize start points & reorder'''
+        with self._phase("optimize"):
+            allow_reverse = self.options.reordering in [2, 3]
+            if self.options.reordering < 3: # Set reordering to 4 to disable path joining
+                plot_optimizations.connect_nearby_ends(self.digest, allow_reverse,\
+                    self.params.min_gap)
+            plot_optimizations.supersample(self.digest,\
+                self.params.segment_supersample_tolerance)
+        self.randomize_optimize(True) # Do plot randomization & optimizations
+
+    def plot_layer(self, layer_number, output=False):
+        '''
+        Python module plot context: Plot one layer, as in layers mode.
+        The first call parses and digests all layers of the document; later
+        calls plot their layer straight from that digest, as long as settings
+        that change the digest (such as model, hiding, and reordering) are the
+        same. Returns the output SVG if output is True.
+        '''
+        self.options.mode = "layers"
+        self.options.layer = layer_number
+        self._building_session = True
+        try:
+            return self.plot_run(output)
+        finally:
+            self._building_session = False
+
+    def plot_layers(self, layer_numbers=None, tool_change=None):
+        '''
+        Python module plot context: Plot layers one after another, with
+        plot_layer(). layer_numbers: Layers to plot, in order; default: all
+        numbered layers, in increasing order. Before each layer after the
+        first, with the AxiDraw at Home, call tool_change(layer_number), e.g.,
+        to wait for a change of pen or ink. Stop if it returns False, or if a
+        plot is paused or has an error. Returns the list of layers plotted.
+        '''
+        if layer_numbers is None:
+            layer_numbers = self.layer_numbers()
+        plotted = []
+        for layer_number in layer_numbers:
+            if plotted and tool_change is not None and tool_change(layer_number) is False:
+                break
+            self.plot_layer(layer_number)
+            plotted.append(layer_number)
+            if self.plot_status.stopped or self.errors.code:
+                break
+        return plotted
+
+    def layer_numbers(self):
+        '''
+        Python module plot context: Numbers of the visible, numbered layers of
+        the document, in increasing order.
+        '''
+        if self._layer_session is not None and\
+                self._layer_session.key == layer_session.session_key(self):
+            return self._layer_session.numbers()
+        return sorted(layer_session.svg_layer_numbers(self.document.getroot()))
+
+    def index_digest(self):
+        '''
+        Let the digest use a cumulative path-length index, so that resuming a
+        paused plot can seek directly to the resume point. When resuming, reuse
+        the index saved with the plot progress data, if it matches the digest.
+        The index is only built when needed: to crop the digest, or to save it.
+        '''
+        self._indexed = False
+        if self.options.mode not in ("plot", "layers", "res_plot") or self.options.digest > 1:
+            return
+        saved_index = None
+        if self.options.mode == "res_plot":
+            for node in self.svg.xpath("//*[self::svg:plotdata|self::plotdata]",\
+                    namespaces=inkex.NSS):
+                saved_index = length_index.LengthIndex.from_string(\
+                    node.get(length_index.INDEX_ATTRIBUTE))
+                break
+        self.digest = length_index.IndexedDocDigest(self.digest, saved_index)
+        self._indexed = True
+
+    def save_length_index(self):
+        '''If the plot was paused, save the length index with the plot progress data'''
+        if not self._indexed or self.plot_status.resume.new.pause_dist <= 0:
+            return
+        index = getattr(self.digest, "length_index", None) # Built if the digest was cropped
+        if index is None:
+            index = length_index.LengthIndex.from_digest(self.digest)
+        for node in self.svg.xpath("//*[self::svg:plotdata|self::plotdata]",\
+                namespaces=inkex.NSS):
+            node.set(length_index.INDEX_ATTRIBUTE, index.to_string())
+
+    def plot_doc_digest(self, digest):
+        '''
+        Step through the document digest and plot each of the vertex lists.
+        Same as the base class, but when estimating, add up the closed-form
+        time estimate for each layer instead of plotting it.
+        '''
+        if not self._estimating:
+            self._begin_copy(digest)
+            super().plot_doc_digest(digest)
+            return
+        if not digest:
+            return
+
+        for layer in digest.layers:
+
+            self.pen.end_temp_height(self)
+            old_use_layer_speed = self.use_layer_speed  # A Boolean
+            old_layer_speed_pendown = self.layer_speed_pendown  # Numeric value
+            self.pen.pen_raise(self) # Raise pen prior to computing layer properties
+
+            if self.options.mode == "layers": # Special case: The plob contains all layers
+                if layer.props.number != self.options.layer: # and is plotted in layers mode.
+                    continue # Here, ensure that only certain layers should be printed.
+
+            self.eval_layer_props(layer.props)
+            if self.plot_status.stopped:
+                return
+
+            layer_estimate = estimate.PlotEstimate()
+            with self._phase("planning"):
+                self.pen.phys.xpos, self.pen.phys.ypos = layer_estimate.add_paths(self,\
+                    [path_item.subpaths[0] for path_item in layer.paths],\
+                    (self.pen.phys.xpos, self.pen.phys.ypos))
+            self.plot_status.stats.pt_estimate += layer_estimate.time_ms
+            self.plot_status.stats.add_dist(False, layer_estimate.down_dist)
+            self.plot_status.stats.add_dist(True, layer_estimate.up_dist)
+            self.pen.status.lifts += layer_estimate.lifts
+
+            self.use_layer_speed = old_use_layer_speed # Restore old layer status variables
+
+            if self.layer_speed_pendown != old_layer_speed_pendown:
+                self.layer_speed_pendown = old_layer_speed_pendown
+                self.enable_motors() # Set speed value variables for this layer.
+            self.pen.end_temp_height(self)
+
+    def plot_document(self):
+        '''
+        Plot the prepared document, reporting telemetry if enabled. When more
+        copies follow, keep the motion plans for replay, and prepare the next
+        copy during the page delay.
+        '''
+        self._telemetry_begin(self.digest, "plot")
+        try:
+            super().plot_document()
+        finally:
+            self._telemetry_end()
+            if self._plan is not None:
+                self._plan.end(self.plot_status.stopped == 0)
+        self._prepare_next_copy()
+
+    def _begin_copy(self, digest):
+        '''
+        Start recording motion plans when plotting multiple copies, or replay
+        them if the first copy was planned with the same digest, options, and
+        starting position. Random start points differ between copies, so they
+        are planned each time.
+        '''
+        if not self.replay_copies or self.options.copies == 1 or self.options.random_start or\
+                self.plot_status.progress.dry_run or self.options.mode == "res_plot" or\
+                self.pen.phys.xpos is None:
+            self._plan = None
+            return
+        if self._plan is None:
+            self._plan = replay.PlanCache()
+        position = (round(self.pen.phys.xpos, 6), round(self.pen.phys.ypos, 6)) # Far below a step
+        self._plan.begin((id(digest), dict(vars(self.options)), position))
+
+    def _replaying(self):
+        return self._plan is not None and self._plan.replaying
+
+    def _planned(self, plan_function, *args):
+        '''
+        Move list from plan_function(self, *args), e.g., motion.trajectory,
+        or the same one replayed from the first copy.
+        '''
+        if self._replaying():
+            move_list = self._plan.next()
+            if move_list is not False:
+                return move_list
+        with self._phase("planning"):
+            move_list = plan_function(self, *args)[0]
+        if self._plan is not None:
+            self._plan.record(move_list)
+        return move_list
+
+    def _prepare_next_copy(self):
+        '''
+        With random start points, the next copy needs new start points and
+        reordering. Do that in the background during the page delay.
+        '''
+        if not self.options.random_start or self.options.preview or\
+                self.options.page_delay <= 0 or self.plot_status.stopped or\
+                self.plot_status.copies_to_plot == 0 or\
+                self.plot_status.resume.new.plob_version != "n/a":
+            return
+        if self.options.mode != "res_plot": # Use old rand seed when resuming a plot.
+            seed = int(time.time()*100)
+        else:
+            seed = self.plot_status.resume.new.rand_seed
+        result = {"seed": seed}
+        def optimize():
+            digest = copy.deepcopy(self.digest)
+            plot_optimizations.randomize_start(digest, seed)
+            if self.options.reordering in [1, 2, 3]:
+                plot_optimizations.reorder(digest, self.options.reordering in [2, 3])
+            result["digest"] = digest
+        thread = threading.Thread(target=optimize, daemon=True)
+        self._next_copy = (thread, result)
+        thread.start()
+
+    def _join_next_copy(self):
+        '''Wait for the next copy to be prepared; return its digest & seed, or None'''
+        if self._next_copy is None:
+            return None
+        thread, result = self._next_copy
+        self._next_copy = None
+        thread.join()
+        if "digest" not in result:
+            return None
+        return result
+
+    def randomize_optimize(self, first_copy=False):
+        '''
+        Randomize start points & perform reordering. Same as the base class, but
+        use the next copy prepared during the page delay, if any.
+        '''
+        prepared = self._join_next_copy()
+        if prepared is None or first_copy:
+            super().randomize_optimize(first_copy)
+            return
+        self.plot_status.resume.new.rand_seed = prepared["seed"]
+        self.digest = prepared["digest"]
+
+    def _telemetry_begin(self, digest, context):
+        '''Start telemetry for a plot or interactive batch, if enabled'''
+        if self.telemetry_callback is None and self.telemetry_file is None:
+            return
+        if self._estimating or self.plot_status.progress.dry_run:
+            return
+        if self._telemetry is None: # Closed after each plot_run, and on disconnect
+            self._telemetry = telemetry.Telemetry(self.telemetry_callback, self.telemetry_file)
+        self._telemetry.begin(self, digest, context)
+
+    def _telemetry_end(self):
+        '''Finish telemetry for a plot or interactive batch'''
+        if self._telemetry is not None and self._telemetry.context is not None:
+            self._telemetry.end(self)
+
+    def _telemetry_close(self):
+        '''Close the telemetry file, if any'''
+        if self._telemetry is not None:
+            self._telemetry.close()
+            self._telemetry = None
+
+    def _feed(self, move_list):
+        '''
+        Feed motion commands to the AxiDraw, with dripfeed.feed. Measured as
+        the "dripfeed" phase, if profiling.
+        '''
+        dripfeed.feed(self, move_list)
+
+    def go_to_position(self, x_dest, y_dest, ignore_limits=False, xyz_pos=None):
+        '''
+        Immediate XY move to destination, using normal motion planning.
+        Same as the base class, but measured if telemetry is enabled.
+        '''
+        target_data = (x_dest, y_dest, 0, 0, ignore_limits)
+        self._feed(self._planned(motion.compute_segment, target_data, xyz_pos))
+
+    def plot_polyline(self, vertex_list):
+        '''
+        Plot a polyline object; a single pen-down XY movement.
+        Same as the base class, but measures time spent in motion planning,
+        reports telemetry for the path if enabled, and replays the plans of
+        the first copy when plotting multiple copies.
+        '''
+        if self.plot_status.stopped:
+            logger.debug('Polyline: self.plot_status.stopped.')
+            return
+        if not vertex_list or len(vertex_list) < 2:
+            logger.debug('No full segments in vertex list. Returning.')
+            return
+
+        self.pen.pen_raise(self) # Raise, if necessary, prior to pen-up travel to first vertex
+
+        replaying = self._replaying() # Vertices were already limited when recording
+        for vertex in () if replaying else vertex_list:
+            vertex[0], _t_x = plot_utils.checkLimitsTol(vertex[0], 0, self.bounds[1][0], 2e-9)
+            vertex[1], _t_y = plot_utils.checkLimitsTol(vertex[1], 0, self.bounds[1][1], 2e-9)
+
+        measured = self._telemetry is not None and self._telemetry.context is not None
+        if measured:
+            self._telemetry.start_path(self)
+
+        # Pen up straight move, zero velocity at endpoints, to first vertex location
+        self.go_to_position(vertex_list[0][0], vertex_list[0][1])
+
+        # Plan and feed trajectory, including lowering and raising pen before and after:
+        plan_start = time.perf_counter()
+        move_list = self._planned(motion.trajectory, vertex_list)
+        planning_time = time.perf_counter() - plan_start
+        if not replaying:
+            self.simplify_stats.planning_time += planning_time
+            self.simplify_stats.planned_vertices += len(vertex_list)
+        self._feed(move_list)
+        if measured:
+            self._telemetry.end_path(self, planning_time)
+
+    def plot_cleanup(self):
+        '''Revert document & print reports, including path simplification statistics'''
+        self._join_next_copy()
+        super().plot_cleanup()
+        if self.options.report_time and not self.called_externally and\
+                self.options.digest < 2:
+            self.simplify_stats.report(self.user_message_fun)
+
     def load_config(self, config_ref):
         '''
         Plot or Interactive context: Load settings from a configuration file.
@@ -274,13 +1044,41 @@ class AxiDraw(axidraw.AxiDraw):
         return True
 
     def update(self):
-        '''Python Interactive context: Apply optional parameters'''
+        '''
+        Python Interactive context: Apply optional parameters.
+        Only the EBB commands for settings that have changed since they were
+        last sent are sent. Speed and acceleration changes are only used in
+        planning motion, and send no commands. See update_stats for counts.
+        '''
         if not self._verify_interactive(True):
             return
+        self.update_stats.updates += 1
         self.update_options()
-        self.pen.servo_init(self)
-        if self.plot_status.port:
+        if not self.plot_status.port:
+            self.pen.servo_init(self)
+            return
+        self.pen.apply_changes(self, self.update_stats)
+        if self.options.resolution != self._motor_resolution:
             self.enable_motors()  # Set plotting resolution & speed
+            self.update_stats.commands_sent += 2
+        else:
+            self._set_speeds()
+            self.update_stats.commands_skipped += 1 # Motor enable query
+
+    def enable_motors(self):
+        '''Enable motors and set speed scales; keep the resolution that they are set to'''
+        super().enable_motors()
+        if not self.options.preview and self.plot_status.port:
+            self._motor_resolution = self.options.resolution
+
+    def _set_speeds(self):
+        '''Set speed scales for the present options, without sending any commands'''
+        preview = self.options.preview
+        self.options.preview = True # enable_motors() skips the EBB when previewing
+        try:
+            super().enable_motors()
+        finally:
+            self.options.preview = preview
 
     def delay(self, time_ms):
         '''Interactive context: Execute timed delay'''
@@ -351,7 +1149,7 @@ class AxiDraw(axidraw.AxiDraw):
 
         self.handle_errors()
 
-    def draw_path(self, vertex_list):
+    def draw_path(self, vertex_list, resume=False, **attributes):
         '''
         Interactive context function to plot path data.
         Given a list of coordinates, pathdata, plot that path:
@@ -363,30 +1161,68 @@ class AxiDraw(axidraw.AxiDraw):
         Motion is clipped at hardware travel bounds; no document bounds are
             defined in interactive context. The auto_clip_lift parameter is
             ignored; draw_path always raises the pen at the edges of travel.
+        After clipping, vertices within simplify_tolerance of the path are removed.
+        If resume is True and plotting this same path was interrupted, continue
+            from the point where it stopped instead of from the first vertex.
+        Optional keyword attributes speed_pendown, accel, and pen_pos_down
+            apply to this path only; see draw_paths.
         '''
         if not self._verify_interactive(True):
             return
         if len(vertex_list) < 2:
             return # At least two vertices are required.
+        if attributes:
+            self.draw_paths([dict(attributes, vertices=vertex_list)], resume)
+        else:
+            self.draw_paths([vertex_list], resume)
+
+    def draw_paths(self, path_list, resume=False):
+        '''
+        Interactive context function to plot several paths in one batch.
+        Each path is plotted as with draw_path, in the order given, raising the
+        pen between paths. All paths are clipped and simplified together, so
+        that portions outside of the travel bounds are dropped before any
+        motion planning. Paths with fewer than two vertices are skipped.
+        A path may also be a dictionary, with its vertex list as "vertices", and
+            optional attributes speed_pendown, accel, and pen_pos_down, that
+            apply to that path only; see path_attributes.
+        If resume is True and plotting this same batch was interrupted, continue
+            from the point where it stopped; see resume().
+        '''
+        if not self._verify_interactive(True):
+            return
+        if resume and self._interrupted_batch is not None and\
+                self._interrupted_batch[0] == path_list:
+            self.resume()
+            return
+        batch = None
+        if self._journal is not None or self._recovery is not None:
+            batch = [self._batch_count, journal.fingerprint(path_list)]
+            self._batch_count += 1
+        if resume and abs(self.plot_status.stopped) in (102, 103):
+            self.plot_status.stopped = 0 # Nothing to resume; plot the batch from the start
+            self.clear_pause_request()
         if self.plot_status.stopped: # If this plot is already stopped
             return
-        if self.options.units == 1 : # Centimeter units
-            scaled_vertices = [[vertex[0] / 2.54, vertex[1] / 2.54] for vertex in vertex_list]
-        elif self.options.units == 2: # Millimeter units
-            scaled_vertices = [[vertex[0] / 25.4, vertex[1] / 25.4] for vertex in vertex_list]
-        else: # Assume self.options.units == 0; use default inch units
-            scaled_vertices = vertex_list
-        new_path = path_objects.PathItem()
-        new_path.item_id = "draw_path_item"
-        new_path.stroke = 'Black'
-        new_path.subpaths = [scaled_vertices]
-
-        # Final turtle position, if allowed to finish:
-        self.pen.turtle.xpos, self.pen.turtle.ypos = new_path.last_point()
-        self.pen.turtle.z_up = True
-
         new_layer = path_objects.LayerItem()
-        new_layer.paths.append(new_path)
+        for index, path in enumerate(path_list):
+            vertex_list, _attributes = path_attributes.split_path(path)
+            if len(vertex_list) < 2:
+                continue # At least two vertices are required.
+            if self.options.units == 1 : # Centimeter units
+                scaled_vertices = [[vertex[0] / 2.54, vertex[1] / 2.54] for vertex in vertex_list]
+            elif self.options.units == 2: # Millimeter units
+                scaled_vertices = [[vertex[0] / 25.4, vertex[1] / 25.4] for vertex in vertex_list]
+            else: # Assume self.options.units == 0; use default inch units
+                scaled_vertices = vertex_list
+            new_path = path_objects.PathItem()
+            new_path.item_id = path_attributes.item_id(index)
+            new_path.stroke = 'Black'
+            new_path.subpaths = [scaled_vertices]
+            new_layer.paths.append(new_path)
+        if not new_layer.paths:
+            return
+
         digest = path_objects.DocDigest()
         digest.layers.append(new_layer)
         digest.flat = True
@@ -394,17 +1230,142 @@ class AxiDraw(axidraw.AxiDraw):
         # Clip at physical travel. Interactive mode does not define a document size.
         boundsclip.clip_at_bounds(digest, self.bounds, self.bounds,\
             self.params.bounds_tolerance, doc_clip=False)
+        self.simplify_stats.add_counts(*simplify.simplify_digest(digest,\
+            self.get_simplify_tolerance()))
+
+        offset = 0
+        if self._recovery is not None: # Skip what was drawn before the crash
+            progress = self._recovery.progress(*batch)
+            if progress is None:
+                if batch[0] <= self._recovery.last_batch:
+                    self.user_message_fun("Paths differ from journal; recovery ended.")
+                self._recovery = None
+            elif progress[0]: # Batch was completed
+                paths = [path_item for path_item in digest.layers[0].paths\
+                    if len(path_item.subpaths[0]) > 1]
+                if paths:
+                    self.pen.turtle.xpos, self.pen.turtle.ypos = paths[-1].last_point()
+                    self.pen.turtle.z_up = True
+                return
+            else:
+                offset = progress[1]
+                digest.crop(offset)
 
-        for path_item in digest.layers[0].paths:
-            if self.plot_status.stopped:
-                break
-            self.plot_polyline(path_item.subpaths[0])
-            self.handle_errors()
-            self.penup()
+        self._plot_interactive_digest(path_list, digest, offset, batch)
 
+    def resume(self):
+        '''
+        Interactive context: Continue the last draw_path or draw_paths call that
+        was interrupted, by a pause or by an exception such as KeyboardInterrupt,
+        from the point where it stopped. Paths already drawn are skipped, and the
+        path that was in progress is cropped at the pen-down distance reached,
+        as when resuming a document plot.
+        Returns True if there was an interrupted plot to resume.
+        '''
+        if not self._verify_interactive(True):
+            return False
+        if self._interrupted_batch is None:
+            return False
+        if abs(self.plot_status.stopped) in (102, 103): # Paused by button or keyboard
+            self.plot_status.stopped = 0
+            self.clear_pause_request()
         if self.plot_status.stopped:
-            self.pen.turtle = copy.copy(self.pen.phys)
-            self.pen.turtle.z_up = True
+            return False
+        path_list, digest, distance, offset, batch = self._interrupted_batch
+        digest.crop(distance)
+        self._plot_interactive_digest(path_list, digest, offset + distance, batch)
+        return True
+
+    def _plot_interactive_digest(self, path_list, digest, offset=0, batch=None):
+        '''
+        Plot a prepared single-layer digest in interactive context. Until the
+        digest is plotted to the end, keep it with the pen-down distance drawn,
+        so that plotting can resume where it was interrupted.
+        offset is the pen-down distance into the batch at which the digest
+        starts, when resuming. batch is the batch number and fingerprint for
+        the journal, if any.
+        '''
+        paths = [path_item for path_item in digest.layers[0].paths\
+            if len(path_item.subpaths[0]) > 1]
+        if not paths:
+            self._interrupted_batch = None
+            self._journal_write(batch, "done")
+            return
+
+        # Final turtle position, if allowed to finish:
+        self.pen.turtle.xpos, self.pen.turtle.ypos = paths[-1].last_point()
+        self.pen.turtle.z_up = True
+
+        attributes = [path_attributes.split_path(path)[1] for path in path_list]
+        saved = None # Option values to restore, when plotting paths with attributes
+        if any(attributes):
+            saved = (self.options.accel, self.use_layer_speed, self.layer_speed_pendown)
+        else:
+            attributes = None
+
+        start_dist = self.plot_status.stats.down_travel_inch - offset
+        self._interrupted_batch = [path_list, digest, 0, offset, batch]
+        self._journal_write(batch, "start", key=batch[1] if batch else None)
+        self._telemetry_begin(digest, "interactive")
+        completed = False
+        try:
+            for path_item in paths:
+                if self.plot_status.stopped:
+                    break
+                if attributes is not None:
+                    self._apply_path_attributes(\
+                        attributes[path_attributes.path_index(path_item)], saved)
+                self.plot_polyline(path_item.subpaths[0])
+                self.handle_errors()
+                self.penup()
+                self._journal_write(batch, "path",\
+                    dist=self.plot_status.stats.down_travel_inch - start_dist,\
+                    pos=[self.pen.phys.xpos, self.pen.phys.ypos])
+            completed = not self.plot_status.stopped
+        finally: # Record progress also if an exception, e.g., KeyboardInterrupt, occurs
+            if attributes is not None:
+                self._restore_path_attributes(saved)
+            distance = self.plot_status.stats.down_travel_inch - start_dist
+            if completed:
+                self._interrupted_batch = None
+                self._journal_write(batch, "done")
+            else:
+                self._interrupted_batch[2] = distance - offset
+                self.pen.turtle = copy.copy(self.pen.phys)
+                self.pen.turtle.z_up = True
+                self._journal_write(batch, "stop", sync=True, dist=distance,\
+                    pos=[self.pen.phys.xpos, self.pen.phys.ypos], code=self.plot_status.stopped)
+            self._telemetry_end()
+
+    def _apply_path_attributes(self, attributes, saved):
+        '''
+        Apply the motion attributes of one path, before plotting it. Paths
+        without an attribute use the saved accel, layer speed & pen-down height.
+        '''
+        self.options.accel = attributes.get('accel', saved[0])
+        if 'speed_pendown' in attributes:
+            use_speed, speed = True, attributes['speed_pendown']
+        else:
+            use_speed, speed = saved[1], saved[2]
+        if (use_speed, speed) != (self.use_layer_speed, self.layer_speed_pendown):
+            self.use_layer_speed, self.layer_speed_pendown = use_speed, speed
+            self._set_speeds()
+        if 'pen_pos_down' in attributes: # Sent to the EBB before the pen is lowered
+            self.pen.set_temp_height(self, attributes['pen_pos_down'])
+        else:
+            self.pen.end_temp_height(self)
+
+    def _restore_path_attributes(self, saved):
+        '''Restore accel, layer speed and pen-down height after plotting paths with attributes'''
+        self._apply_path_attributes({}, saved)
+
+    def _journal_write(self, batch, event, sync=False, **data):
+        '''Append a record of plotting progress for a batch to the journal, if any'''
+        if self._journal is None or batch is None:
+            return
+        record = {"event": event, "batch": batch[0]}
+        record.update(data)
+        self._journal.write(record, sync)
 
     def handle_errors(self):
         '''Raise keyboard interrupts and runtime errors if thus configured'''
@@ -491,6 +1452,7 @@ class AxiDraw(axidraw.AxiDraw):
         '''Interactive context: Low-level USB command; use with great care '''
         if not self._verify_interactive(True):
             return
+        self._forget_applied() # The command may change EBB settings
         ebb_serial.command(self.plot_status.port, command)
 
     def block(self):
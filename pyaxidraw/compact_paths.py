@@ -0,0 +1,304 @@
+# coding=utf-8
+#
+# Copyright 2023 Windell H. Oskay, Evil Mad Scientist Laboratories
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+
+"""
+pyaxidraw/compact_paths.py
+
+Compact storage for the paths of a document digest.
+
+path_objects.PathItem holds each subpath as a list of 2-element lists: every
+vertex costs two list objects and two float objects, around 150 bytes, where
+its coordinates need 16. CompactPathItem has the same methods, but holds each
+subpath as one array('d') of interleaved X and Y values, and has __slots__.
+Its length(), reverse(), and crop_by_distance() work on the array, with NumPy
+on longer paths when it is available.
+
+The stages that prepare a digest for plotting (clipping, joining, reordering,
+supersampling, simplifying) change vertex lists in place, which an array
+cannot support behind the same API: the subpaths of a CompactPathItem are new
+lists on each access. Compact paths are therefore for digests that are held
+between plots, such as the digest of all layers in a layer session or a
+digest imported by plot_setup. expand() gives a digest of ordinary PathItem
+objects, copied, for plotting.
+"""
+
+import copy
+from array import array
+from math import hypot
+
+from axidrawinternal.plot_utils_import import from_dependency_import # plotink
+path_objects = from_dependency_import('axidrawinternal.path_objects')
+plot_utils = from_dependency_import('plotink.plot_utils')
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+VECTOR_MIN = 32 # Vertex count from which NumPy is used, when available
+
+
+def _pack(vertex_list):
+    ''' array('d') of interleaved X and Y values of a vertex list '''
+    coords = array('d')
+    for vertex in vertex_list:
+        coords.append(vertex[0])
+        coords.append(vertex[1])
+    return coords
+
+
+def _unpack(coords):
+    ''' Vertex list of an array of interleaved X and Y values '''
+    return [[coords[index], coords[index + 1]] for index in range(0, len(coords), 2)]
+
+
+def _segment_lengths(coords):
+    ''' Lengths of the segments of an array of interleaved X and Y values '''
+    if np is not None and len(coords) >= 2 * VECTOR_MIN:
+        points = np.frombuffer(coords, dtype=float).reshape(-1, 2)
+        deltas = np.diff(points, axis=0)
+        return np.hypot(deltas[:, 0], deltas[:, 1])
+    return [hypot(coords[index] - coords[index - 2], coords[index + 1] - coords[index - 1])\
+        for index in range(2, len(coords), 2)]
+
+
+def _length(coords):
+    ''' Sum of the segment lengths of an array of interleaved X and Y values '''
+    if np is not None and len(coords) >= 2 * VECTOR_MIN:
+        return float(np.sum(_segment_lengths(coords)))
+    if len(coords) < 4:
+        return 0.0
+    total = 0.0
+    x_last, y_last = coords[0], coords[1]
+    for index in range(2, len(coords), 2):
+        x_next, y_next = coords[index], coords[index + 1]
+        total += hypot(x_next - x_last, y_next - y_last)
+        x_last, y_last = x_next, y_next
+    return total
+
+
+class CompactPathItem:
+    '''
+    Path of a document digest, as path_objects.PathItem, with each subpath
+    stored as an array('d') of interleaved X and Y values.
+    '''
+
+    __slots__ = ('_coords', 'stroke', 'fill', 'fill_rule', 'item_id')
+
+    def __init__(self):
+        self._coords = None     # list of array('d'), one per subpath, or None
+        self.stroke = None      # stroke color or None
+        self.fill = None        # fill color or None
+        self.fill_rule = None   # May be None, "nonzero", or "evenodd"
+        self.item_id = None     # string
+
+    @property
+    def subpaths(self):
+        ''' Subpaths, as a new list of vertex lists; changing it does not change the path '''
+        if self._coords is None:
+            return None
+        return [_unpack(coords) for coords in self._coords]
+
+    @subpaths.setter
+    def subpaths(self, subpaths):
+        self._coords = None if subpaths is None else [_pack(subpath) for subpath in subpaths]
+
+    @classmethod
+    def from_attrs(cls, **kwargs):
+        ''' Populate class from attribute keywords '''
+        path_item = cls()
+        path_item.subpaths = kwargs.pop("subpaths", None)
+        path_item.stroke = kwargs.pop("stroke", None)
+        path_item.fill = kwargs.pop("fill", None)
+        path_item.fill_rule = kwargs.pop("fill_rule", None)
+        path_item.item_id = kwargs.pop("item_id", None)
+        return path_item
+
+    @classmethod
+    def from_path(cls, path_item):
+        ''' CompactPathItem with the subpaths and attributes of a PathItem '''
+        return cls.from_attrs(subpaths=path_item.subpaths, stroke=path_item.stroke,\
+            fill=path_item.fill, fill_rule=path_item.fill_rule, item_id=path_item.item_id)
+
+    def to_path(self):
+        ''' path_objects.PathItem with copies of the subpaths and attributes '''
+        return path_objects.PathItem.from_attrs(subpaths=self.subpaths, stroke=self.stroke,\
+            fill=self.fill, fill_rule=self.fill_rule, item_id=self.item_id)
+
+    def vertex_count(self):
+        ''' Number of vertices in all subpaths '''
+        return sum(len(coords) for coords in self._coords or []) // 2
+
+    def nbytes(self):
+        ''' Size of the stored coordinates, in bytes '''
+        return sum(coords.itemsize * len(coords) for coords in self._coords or [])
+
+    def to_string(self):
+        """
+        Convert the list of vertices from the first subpath to an SVG polyline
+        "points" attribute string and return that string.
+        """
+        return path_objects.vertex_list_to_string(_unpack(self._coords[0]))
+
+    def from_string(self, polyline_string):
+        """
+        Fill the list of vertices, given a svg polyline "points"
+        attribute string
+        """
+        self.subpaths = [path_objects.polyline_string_to_list(polyline_string)]
+
+    def first_point(self):
+        """
+        Return first vertex of first subpath. Intended for use on "flat"
+        PathItem objects that only contain a single subpath.
+        """
+        if self._coords is not None:
+            coords = self._coords[0]
+            return [coords[0], coords[1]]
+        return None
+
+    def last_point(self):
+        """
+        Return last vertex of first subpath. Intended for use on "flat"
+        PathItem objects that only contain a single subpath.
+        """
+        if self._coords:
+            coords = self._coords[0]
+            return [coords[-2], coords[-1]]
+        return None
+
+    def length(self):
+        """
+        Return total path length; the sum of segment lengths for the path object.
+        Intended for use on "flat" PathItem objects that only contain a single subpath.
+        """
+        if self._coords is None:
+            return 0
+        return _length(self._coords[0])
+
+    def crop_by_distance(self, target):
+        """
+        Remove the part of the path before the target distance along it, as
+        PathItem.crop_by_distance(): the new first vertex is at the target
+        distance along the original path. If the target is past the end,
+        the subpath is left empty.
+
+        Intended for use on "flat" PathItem objects that only contain a single subpath.
+        """
+        if self._coords is None or target < 0:
+            return
+        coords = self._coords[0]
+        lengths = _segment_lengths(coords)
+        if np is not None and isinstance(lengths, np.ndarray):
+            ends = np.cumsum(lengths)
+            index = int(np.searchsorted(ends, target, side='right'))
+            if index == len(lengths):
+                self._coords[0] = array('d')
+                return
+            start_distance = float(ends[index - 1]) if index > 0 else 0.0
+        else:
+            start_distance = 0.0
+            index = 0
+            while index < len(lengths) and start_distance + lengths[index] <= target:
+                start_distance += lengths[index]
+                index += 1
+            if index == len(lengths):
+                self._coords[0] = array('d')
+                return
+        fraction = (target - start_distance) / lengths[index]
+        position = 2 * index
+        new_coords = coords[position:]
+        new_coords[0] += (coords[position + 2] - coords[position]) * fraction
+        new_coords[1] += (coords[position + 3] - coords[position + 1]) * fraction
+        self._coords[0] = new_coords
+
+    def closed(self):
+        """
+        If PathItem contains only a single closed subpath, return True
+        Tolerance is of 0.0001 inch
+        """
+        if self._coords and len(self._coords) == 1:
+            return plot_utils.points_near(self.first_point(), self.last_point(), .00000001)
+        return False
+
+    def has_stroke(self):
+        """
+        return False if self.stroke is None, "none", "None", etc., else True
+        """
+        return str(self.stroke).lower() != "none"
+
+    def reverse(self):
+        """
+        If PathItem contains only a single subpath, reverse it.
+        In practice, this reverses the direction that the path will be drawn.
+        """
+        if not self._coords or len(self._coords) != 1:
+            return
+        coords = self._coords[0]
+        if np is not None and len(coords) >= 2 * VECTOR_MIN:
+            points = np.frombuffer(coords, dtype=float).reshape(-1, 2)
+            self._coords[0] = array('d', points[::-1].tobytes())
+            return
+        reversed_coords = array('d', coords)
+        reversed_coords[0::2] = coords[-2::-2]
+        reversed_coords[1::2] = coords[::-2]
+        self._coords[0] = reversed_coords
+
+    def __str__(self):
+        ''' For builtin `str(path_item)` and `print(path_item)` to work nicely '''
+
+        return f"{type(self).__name__}(\n  subpaths={self.subpaths},\n" +\
+            f"  fill={self.fill},\n  fill_rule={self.fill_rule},\n" +\
+            f"  stroke={self.stroke},\n  item_id={self.item_id})"
+
+
+def compact_layer(layer):
+    ''' Copy of a LayerItem, with its properties copied and its paths made compact '''
+    new_layer = copy.copy(layer)
+    new_layer.props = copy.copy(layer.props)
+    new_layer.paths = [CompactPathItem.from_path(path) for path in layer.paths]
+    return new_layer
+
+
+def expand_layer(layer):
+    ''' Copy of a LayerItem, with copies of its properties and of its paths, as PathItems '''
+    new_layer = copy.copy(layer)
+    new_layer.props = copy.copy(layer.props)
+    new_layer.paths = [path.to_path() if isinstance(path, CompactPathItem) else\
+        path_objects.PathItem.from_attrs(subpaths=[[vertex[:] for vertex in subpath]\
+        for subpath in path.subpaths], stroke=path.stroke, fill=path.fill,\
+        fill_rule=path.fill_rule, item_id=path.item_id) for path in layer.paths]
+    return new_layer
+
+
+def _copy_digest(digest, copy_layer):
+    new_digest = copy.copy(digest)
+    new_digest.plotdata = dict(digest.plotdata)
+    new_digest.metadata = dict(digest.metadata)
+    new_digest.layers = [copy_layer(layer) for layer in digest.layers]
+    return new_digest
+
+
+def compact(digest):
+    ''' Copy of a DocDigest, with compact paths '''
+    return _copy_digest(digest, compact_layer)
+
+
+def expand(digest):
+    ''' Copy of a DocDigest, compact or not, with ordinary PathItems, ready to plot '''
+    return _copy_digest(digest, expand_layer)
@@ -0,0 +1,148 @@
+# coding=utf-8
+#
+# Copyright 2023 Windell H. Oskay, Evil Mad Scientist Laboratories
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+
+"""
+pyaxidraw/control.py
+
+AxiDraw control for the command line, with the features of the Python API.
+
+axidraw_control.AxiDrawWrapperClass parses the input once, and plots it on
+one AxiDraw, or on each attached AxiDraw (port_config 3), with the CLI's
+progress bar, messages and status code. AxiDrawControl does the same, but
+plots on each unit with the pyaxidraw AxiDraw class, through plot_run(). It
+reads LightBurn projects (.lbrn2) into a digest, as plot_setup does, which
+each unit plots. It also has these options, for the primary unit:
+
+    estimating      Give the closed-form time estimate (AxiDraw.estimate)
+                    instead of plotting
+    preview_file    Stream the preview to this file, for rendering options 4 and 5
+    profile         profiling.Profiler to measure each phase, including parsing
+
+After effect(), axidraw is the AxiDraw of the primary unit, with its results,
+such as time_estimate and distance_pendown.
+"""
+
+import copy
+import logging
+import sys
+
+from axidrawinternal import axidraw_control
+
+from pyaxidraw import axidraw
+from pyaxidraw import lightburn
+
+logger = logging.getLogger(__name__)
+
+# Options passed through to the AxiDraw of each unit, as by AxiDrawWrapperClass
+PLOT_OPTIONS = ['mode', 'speed_pendown', 'speed_penup', 'accel', 'pen_pos_up',\
+    'pen_pos_down', 'pen_rate_raise', 'pen_rate_lower', 'pen_delay_up', 'pen_delay_down',\
+    'no_rotate', 'const_speed', 'report_time', 'manual_cmd', 'dist', 'layer', 'copies',\
+    'page_delay', 'preview', 'rendering', 'model', 'penlift', 'setup_type', 'resume_type',\
+    'auto_rotate', 'resolution', 'hiding', 'reordering', 'random_start', 'webhook',\
+    'webhook_url', 'digest', 'progress']
+
+
+class AxiDrawControl(axidraw_control.AxiDrawWrapperClass):
+    ''' AxiDrawWrapperClass, plotting with the pyaxidraw AxiDraw class '''
+
+    def __init__(self, default_logging=True, params=None):
+        super().__init__(default_logging=default_logging, params=params)
+        self.imported_digest = None # Compact DocDigest, read from a LightBurn project
+        self.estimating = False # Estimate the plot time, in closed form; do not plot
+        self.preview_file = None # Preview output file, for rendering options 4 and 5
+        self.profile = None # profiling.Profiler, to profile parsing & the primary unit
+        self.axidraw = None # AxiDraw of the primary unit, after effect()
+
+    def parse(self, filename=None):
+        '''
+        Parse the SVG document, or read a LightBurn project into imported_digest,
+        with a page-sized SVG document. Measured as the "parse" phase, if profiling.
+        '''
+        if self.profile is None:
+            self._parse(filename)
+            return
+        self.profile.reset()
+        with self.profile.session(), self.profile.phase("parse"):
+            self._parse(filename)
+
+    def _parse(self, filename):
+        self.imported_digest = None
+        if not lightburn.is_project(filename):
+            super().parse(filename)
+            return
+        try:
+            self.imported_digest, self.document = lightburn.import_project(filename,\
+                self.params.curve_tolerance)
+        except RuntimeError:
+            sys.exit(1) # Error already logged
+        self.original_document = copy.deepcopy(self.document)
+
+    def effect(self):
+        '''Main entry point. An estimate, like a preview, uses one unit only.'''
+        if self.estimating:
+            self.options.port_config = 1 # Offline; ignore port & multi-machine options
+        super().effect()
+
+    def plot_to_axidraw(self, port, primary):
+        '''
+        Delegate the plot to a particular AxiDraw. Same as the base class, but
+        with the pyaxidraw AxiDraw class, plotting through plot_run(), or
+        estimate() if estimating.
+        '''
+        ad = axidraw.AxiDraw(params=self.params, default_logging=self.default_logging)
+        if primary:
+            ad.profile = self.profile or False
+            ad.preview_file = self.preview_file
+        ad.setup_document(self.document, self.imported_digest)
+        ad.set_up_pause_receiver(self.software_initiated_pause_event)
+
+        prim = "primary" if primary else "secondary"
+        logger.info("plot_to_axidraw started, at port %s (%s)", port, prim)
+
+        if not hasattr(self.options, 'progress'): # CLI only option; not part of regular options.
+            self.options.progress = False
+        ad.options.__dict__.update({item: self.options.__dict__[item] for item in PLOT_OPTIONS})
+
+        ad.options.port = port
+        if port is None:
+            ad.options.port_config = 1 # Use first available AxiDraw
+        else:
+            ad.options.port_config = 2 # Use AxiDraw specified by port
+
+        if hasattr(self, 'cli_api'):
+            ad.plot_status.cli_api = True # Set flag that software called by API
+
+        if not primary:
+            ad.set_secondary() # Suppress general message reporting; suppress time reporting
+
+        if primary and self.estimating:
+            ad.estimate()
+            output = ad.get_output()
+        else:
+            output = ad.plot_run(True)
+
+        if primary:
+            self.axidraw = ad
+            self.document = ad.document
+            self.outdoc = output
+            self.status_code = ad.plot_status.stopped
+        elif ad.error_out:
+            if port is not None:
+                logger.error('Error on AxiDraw at port "' + port + '":' + ad.error_out)
+            else:
+                logger.error('Error on secondary AxiDraw: ' + ad.error_out)
@@ -0,0 +1,240 @@
+# coding=utf-8
+#
+# Copyright 2023 Windell H. Oskay, Evil Mad Scientist Laboratories
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+
+"""
+pyaxidraw/device_cache.py
+
+Fast reconnection to an AxiDraw, with a cache of the serial port that each
+AxiDraw was last found at.
+
+Connecting normally lists the USB serial ports and opens and queries them
+until an EBB is found. The cache maps the AxiDraw requested, by name (the EBB
+nickname, as with read_name and list_names) or as the first available unit,
+to its last-known port and USB serial number. That port is tried first, and
+is accepted when a version query shows that it is an EBB, and, when a name
+was requested, a nickname query shows that it is the right one.
+
+If the cached port fails, all candidate ports are probed in parallel, so that
+the time taken is that of the slowest probe rather than their sum. The first
+candidate that answers, in the order that the ports are listed, is used.
+
+The cache is a small JSON file; see AxiDraw.device_cache_file.
+"""
+
+import concurrent.futures
+import json
+import logging
+import os
+import threading
+import time
+
+from axidrawinternal.plot_utils_import import from_dependency_import # plotink
+ebb_serial = from_dependency_import('plotink.ebb_serial')
+serial = from_dependency_import('serial')
+from serial.tools import list_ports # pylint: disable=wrong-import-position, wrong-import-order
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_FILE = os.path.join(os.environ.get('XDG_CACHE_HOME') or\
+    os.path.join(os.path.expanduser('~'), '.cache'), 'axidraw', 'devices.json')
+
+FIRST_AVAILABLE = "" # Cache key for the first available AxiDraw
+NICKNAME_VERSION = (2, 5, 5) # Earliest firmware version with nicknames
+
+
+def firmware_version(version_string):
+    ''' Firmware version tuple from an EBB version string, or None '''
+    parts = version_string.split("Firmware Version ", 1)
+    if len(parts) < 2:
+        return None
+    try:
+        return tuple(int(number) for number in parts[1].strip().split('.'))
+    except ValueError:
+        return None
+
+
+def query_nickname(serial_port, version_string):
+    ''' Nickname of the EBB at an open port, or None if not set or not supported '''
+    version = firmware_version(version_string)
+    if version is None or version < NICKNAME_VERSION:
+        return None
+    response = ebb_serial.query(serial_port, 'QT\r', False)
+    if not response or 'Err' in response:
+        return None
+    return response.strip() or None
+
+
+def probe(port_name, nickname=None, read_name=False, timeout=1.0):
+    '''
+    Open serial port port_name, and check that an EBB answers there, with the
+    given nickname if not None. Returns (serial port, version string, nickname),
+    with the port open, or None. The nickname is only queried if nickname is
+    given or read_name is True; otherwise it is returned as None.
+    '''
+    try:
+        serial_port = serial.Serial(port_name, timeout=timeout)
+    except (serial.SerialException, OSError, ValueError):
+        return None
+    try:
+        serial_port.reset_input_buffer()
+        version_string = ''
+        for _attempt in range(2): # As ebb_serial.testPort(): Try twice
+            serial_port.write(b'v\r')
+            response = serial_port.readline()
+            if response and response.startswith(b'EBB'):
+                version_string = response.decode('ascii', 'replace').strip()
+                break
+        if version_string and nickname is None and not read_name:
+            return serial_port, version_string, None
+        if version_string:
+            found_name = query_nickname(serial_port, version_string)
+            if nickname is None or (found_name or "").lower() == nickname.lower():
+                return serial_port, version_string, found_name
+    except (serial.SerialException, OSError) as err:
+        logger.info("Error probing serial port %s", port_name, exc_info=err)
+    serial_port.close()
+    return None
+
+
+def ebb_ports(requested=None):
+    '''
+    Listed serial ports that may have an EBB: by description or VID:PID, in
+    the order of ebb_serial.findPort(). If requested (a name or port) matches
+    the description, serial number, or name of some of them, only those.
+    '''
+    try:
+        ports = list(list_ports.comports())
+    except TypeError:
+        return []
+    by_name = [port for port in ports if port.description.startswith("EiBotBoard")]
+    by_id = [port for port in ports if port not in by_name and\
+        port.hwid.startswith("USB VID:PID=04D8:FD92")]
+    candidates = by_name + by_id
+    if requested:
+        needle = requested.lower()
+        matched = [port for port in ports if port.device.lower() == needle or\
+            (port.serial_number or "").lower() == needle or\
+            port.description.lower()[11:].startswith(needle)]
+        if matched:
+            return matched
+    return candidates
+
+
+class DeviceCache:
+    '''
+    Last-known serial port of each AxiDraw, by requested name, in a JSON file.
+    Each entry holds the port, the USB serial number, the nickname, and the time.
+    '''
+
+    def __init__(self, file_name=DEFAULT_CACHE_FILE):
+        self.file_name = file_name
+        self.entries = {}
+        try:
+            with open(file_name, encoding='utf-8') as cache_file:
+                self.entries = json.load(cache_file)
+        except (OSError, ValueError):
+            self.entries = {}
+        if not isinstance(self.entries, dict):
+            self.entries = {}
+
+    def lookup(self, requested):
+        ''' Cached entry for an AxiDraw requested by name or port (or None: first available) '''
+        if not requested:
+            return self.entries.get(FIRST_AVAILABLE)
+        if requested in self.entries:
+            return self.entries[requested]
+        needle = requested.lower()
+        for entry in self.entries.values():
+            if needle in (str(entry.get('port', '')).lower(),\
+                    str(entry.get('nickname') or '').lower(),\
+                    str(entry.get('serial_number') or '').lower()):
+                return entry
+        return None
+
+    def store(self, requested, port_name, nickname=None, serial_number=None):
+        ''' Record the port that an AxiDraw was found at, and save the cache '''
+        entry = {'port': port_name, 'nickname': nickname, 'serial_number': serial_number,\
+            'time': round(time.time(), 3)}
+        self.entries[requested or FIRST_AVAILABLE] = entry
+        if nickname:
+            self.entries[nickname] = entry
+        self.save()
+
+    def save(self):
+        ''' Write the cache file; errors are logged, not raised '''
+        try:
+            directory = os.path.dirname(self.file_name)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            temp_name = f"{self.file_name}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_name, 'w', encoding='utf-8') as cache_file:
+                json.dump(self.entries, cache_file, indent=1)
+            os.replace(temp_name, self.file_name)
+        except OSError as err:
+            logger.info("Unable to save device cache %s", self.file_name, exc_info=err)
+
+
+def discover(requested=None, probe_function=probe):
+    '''
+    Probe candidate ports in parallel for an EBB, with nickname requested
+    unless the requested name matched the port or its listing. Returns
+    (serial port, version string, nickname, port info) for the first candidate
+    in order that answers, with the port open, or None.
+    '''
+    candidates = ebb_ports(requested)
+    if not candidates:
+        return None
+    needle = (requested or "").lower()
+    def check(port):
+        listed = port.device.lower() == needle or (port.serial_number or "").lower() == needle
+        return probe_function(port.device, None if listed or not requested else requested,\
+            read_name=True)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(candidates)) as pool:
+        results = list(pool.map(check, candidates))
+    found = None
+    for port, result in zip(candidates, results):
+        if result is None:
+            continue
+        if found is None:
+            found = result + (port,)
+        else:
+            ebb_serial.closePort(result[0]) # Only the first is used
+    return found
+
+
+def open_device(requested, cache_file=DEFAULT_CACHE_FILE):
+    '''
+    Open the AxiDraw requested by name or port (None: first available), trying
+    its cached port first. Returns (serial port, version string, source), with
+    source "cache" or "discovery", or None if no AxiDraw was found.
+    '''
+    cache = DeviceCache(cache_file)
+    entry = cache.lookup(requested)
+    if entry and entry.get('port'):
+        nickname = None # Any EBB at the port, if requested by port or as first available
+        if requested and requested.lower() != entry['port'].lower():
+            nickname = requested
+        result = probe(entry['port'], nickname)
+        if result is not None:
+            return result[0], result[1], "cache"
+    result = discover(requested)
+    if result is None:
+        return None
+    serial_port, version_string, nickname, port_info = result
+    cache.store(requested, port_info.device, nickname, port_info.serial_number)
+    return serial_port, version_string, "discovery"
@@ -0,0 +1,212 @@
+# coding=utf-8
+#
+# Copyright 2023 Windell H. Oskay, Evil Mad Scientist Laboratories
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+
+"""
+pyaxidraw/estimate.py
+
+Closed-form plot time estimate, without simulating each motion command.
+
+A preview plans every path with motion.trajectory() and adds up the duration of
+each resulting "SM" command. Here, the same plan is computed in vectorized form
+over all paths of a layer at once:
+
+* Vertex speeds: As in motion.plan_trajectory(), the speed at each vertex is
+    limited by the speed limit, by the cornering speed at the junction, and by
+    the speed reachable by accelerating forward from the previous vertex and
+    backward from the next one. With squared speeds u, the forward limit
+    u[i] = min(u[i-1] + 2*a*d[i], J[i]) unrolls into a running minimum, and
+    likewise for the backward limit. Zero speed at the ends of each path resets
+    both running minimums, so that all paths are computed together.
+* Segment times: The trapezoid, triangle, linear ramp, and constant velocity
+    cases of motion.compute_segment(), in closed form.
+* Pen-up moves between paths, and pen lift timing from PenLiftTiming.
+
+Requires NumPy.
+"""
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def segment_times(lengths, v_initial, v_final, speed_limit, accel_rate, time_slice,\
+        const_speed=None, slow_speed=None):
+    '''
+    Time (s) to move along straight segments, following motion.compute_segment().
+
+    lengths, v_initial, v_final: Arrays of segment lengths (inches) and entry and
+        exit speeds (in/s).
+    const_speed: Pen-down speed (in/s) when using constant velocity mode, else None.
+    slow_speed: Speed for segments that start and end at rest but are too short
+        for any acceleration (compute_segment uses one tenth of pen-down speed).
+    '''
+    lengths = np.asarray(lengths, dtype=float)
+    if const_speed is not None:
+        return lengths / const_speed
+    if slow_speed is None:
+        slow_speed = speed_limit / 10
+    safe_lengths = np.maximum(lengths, 1e-12)
+    v_i = np.minimum(v_initial, speed_limit)
+    v_f = np.minimum(v_final, speed_limit)
+
+    # Case 1: Trapezoid. Acceleration or deceleration shorter than one time slice is skipped.
+    t_accel = (speed_limit - v_i) / accel_rate
+    t_decel = (speed_limit - v_f) / accel_rate
+    accel_dist = v_i * t_accel + 0.5 * accel_rate * t_accel * t_accel
+    decel_dist = v_f * t_decel + 0.5 * accel_rate * t_decel * t_decel
+    ramp_dist = accel_dist + decel_dist
+    trapezoid = (lengths > ramp_dist + time_slice * speed_limit) &\
+        (lengths / speed_limit > 4 * time_slice)
+    coasting = lengths - ramp_dist
+    t_trapezoid = np.where(t_accel >= time_slice, t_accel, 0) +\
+        np.where(t_decel >= time_slice, t_decel, 0) +\
+        np.where(coasting > time_slice * speed_limit, coasting / speed_limit, 0)
+
+    # Case 2: Triangle, with the acceleration rate reduced for near-trapezoid segments
+    accel_local = np.where((lengths >= 0.9 * ramp_dist) & (ramp_dist > 0),\
+        0.9 * ramp_dist / safe_lengths * accel_rate, accel_rate)
+    t_a = (np.sqrt(2 * v_i * v_i + 2 * v_f * v_f + 4 * accel_local * lengths) - 2 * v_i) /\
+        (2 * accel_local)
+    v_peak = v_i + accel_local * t_a
+    a_intervals = np.floor(t_a / time_slice)
+    t_a = np.where(a_intervals == 0, 0, t_a)
+    t_d = t_a - (v_f - v_i) / accel_local
+    d_intervals = np.floor(t_d / time_slice)
+    triangle = a_intervals + d_intervals > 4
+    t_triangle = np.where(a_intervals > 0, t_a, 0) + np.where(d_intervals > 0, t_d, 0)
+
+    # Case 3: Linear velocity ramp, from a boosted initial speed
+    v_boost = (v_peak + v_i) / 2
+    local_accel = np.clip((v_f * v_f - v_boost * v_boost) / (2 * safe_lengths),\
+        -accel_rate, accel_rate)
+    ramp = local_accel != 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t_ramp = np.where(ramp, (v_f - v_boost) / np.where(ramp, local_accel, 1), 0)
+    ramp &= np.floor(t_ramp / time_slice) > 1
+
+    # Case 4: Constant velocity; the initial speed is boosted to the peak if no ramp
+    v_start = np.where(local_accel == 0, v_boost, v_peak)
+    velocity = np.where(v_f > v_start, v_f, np.where(v_start > 0, v_start, slow_speed))
+    t_constant = lengths / np.maximum(velocity, 1e-12)
+
+    times = np.where(trapezoid, t_trapezoid, np.where(triangle, t_triangle,\
+        np.where(ramp, t_ramp, t_constant)))
+    return np.where(lengths > 0, times, 0)
+
+
+def vertex_speeds(lengths, cosines, ends, speed_limit, accel_rate, delta):
+    '''
+    Speed (in/s) at each vertex of a sequence of paths, following
+    motion.plan_trajectory(), computed for all paths at once.
+
+    lengths: Length of the segment arriving at each vertex (0 at the first vertex).
+    cosines: Cosine of the deflection angle at each vertex, where defined.
+    ends: Boolean array, True at the first and last vertex of each path.
+    delta: Corner rounding factor (cornering / 5000).
+    '''
+    root_factor = np.sqrt(np.clip((1 + cosines) / 2, 0, 1)) # cosines: dot(in, out)
+    denominator = 1 - root_factor
+    rfactor = np.where(denominator > 0.0001,\
+        delta * root_factor / np.maximum(denominator, 0.0001), 100000)
+    limits = np.minimum(accel_rate * rfactor, speed_limit * speed_limit) # Squared speeds
+    limits = np.where(ends, 0, limits)
+
+    distance = 2 * accel_rate * np.cumsum(lengths)
+    forward = distance + np.minimum.accumulate(limits - distance)
+    backward = np.minimum.accumulate((forward + distance)[::-1])[::-1] - distance
+    return np.sqrt(np.maximum(np.minimum(forward, backward), 0))
+
+
+class PlotEstimate:
+    '''
+    Estimate for plotting a list of paths, one layer at a time:
+    time (ms), pen-down and pen-up distances (inches), and pen lifts.
+    '''
+
+    def __init__(self):
+        self.time_ms = 0.0
+        self.down_dist = 0.0
+        self.up_dist = 0.0
+        self.lifts = 0
+
+    def add_paths(self, ad_ref, vertex_lists, start):
+        '''
+        Add the estimate for plotting vertex_lists (inches), in order, from
+        the XY position start. Returns the final XY position.
+        '''
+        arrays = [np.asarray(vertex_list, dtype=float)[:, :2] for vertex_list in vertex_lists\
+            if len(vertex_list) > 1]
+        if not arrays:
+            return start
+        points = np.concatenate(arrays)
+        points[:, 0] = np.clip(points[:, 0], 0, ad_ref.bounds[1][0])
+        points[:, 1] = np.clip(points[:, 1], 0, ad_ref.bounds[1][1])
+        counts = np.array([len(array) for array in arrays])
+        path_index = np.repeat(np.arange(len(arrays)), counts)
+
+        # Skip segments shorter than a motor step, as plan_trajectory does
+        if ad_ref.options.resolution == 1:
+            min_dist = ad_ref.params.max_step_dist_hr
+        else:
+            min_dist = ad_ref.params.max_step_dist_lr
+        deltas = np.diff(points, axis=0)
+        same_path = path_index[1:] == path_index[:-1]
+        keep = np.ones(len(points), dtype=bool)
+        keep[1:] = ~same_path | (np.hypot(deltas[:, 0], deltas[:, 1]) >= min_dist)
+        points = points[keep]
+        path_index = path_index[keep]
+
+        deltas = np.diff(points, axis=0)
+        same_path = path_index[1:] == path_index[:-1]
+        seg_lengths = np.where(same_path, np.hypot(deltas[:, 0], deltas[:, 1]), 0)
+        units = deltas / np.maximum(seg_lengths, 1e-12)[:, None]
+
+        first = np.ones(len(points), dtype=bool)
+        first[1:] = ~same_path
+        last = np.ones(len(points), dtype=bool)
+        last[:-1] = ~same_path
+        cosines = np.zeros(len(points))
+        cosines[1:-1] = np.sum(units[:-1] * units[1:], axis=1)
+
+        speed_down = ad_ref.speed_pendown
+        accel_down = ad_ref.params.accel_rate * ad_ref.options.accel / 100.0
+        speeds = vertex_speeds(np.concatenate(([0], seg_lengths)), cosines, first | last,\
+            speed_down, accel_down, ad_ref.params.cornering / 5000)
+        const_speed = speed_down if ad_ref.options.const_speed else None
+        down_times = segment_times(seg_lengths[same_path], speeds[:-1][same_path],\
+            speeds[1:][same_path], speed_down, accel_down, ad_ref.params.time_slice,\
+            const_speed, speed_down / 10)
+
+        # Pen-up moves to the start of each path, from the end of the previous one
+        starts = points[first]
+        previous = np.vstack((np.asarray(start, dtype=float)[None, :], points[last][:-1]))
+        up_lengths = np.hypot(*(starts - previous).T)
+        up_lengths = np.where(up_lengths >= min_dist, up_lengths, 0)
+        accel_up = ad_ref.params.accel_rate_pu * ad_ref.options.accel / 100.0
+        zeros = np.zeros(len(up_lengths))
+        up_times = segment_times(up_lengths, zeros, zeros, ad_ref.speed_penup, accel_up,\
+            ad_ref.params.time_slice, None, speed_down / 10)
+
+        times = ad_ref.pen.heights.times
+        self.time_ms += 1000 * (float(np.sum(down_times)) + float(np.sum(up_times))) +\
+            len(arrays) * (times.lower_time + times.raise_time)
+        self.down_dist += float(np.sum(seg_lengths))
+        self.up_dist += float(np.sum(up_lengths))
+        self.lifts += len(arrays)
+        return tuple(points[-1])
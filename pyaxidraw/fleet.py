@@ -0,0 +1,333 @@
+# coding=utf-8
+#
+# Copyright 2023 Windell H. Oskay, Evil Mad Scientist Laboratories
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+
+"""
+pyaxidraw/fleet.py
+
+Schedule a queue of plot jobs over several named AxiDraw units.
+
+Each job is an SVG document (or a plob), with optional copies, a layer to
+plot (as in layers mode), and options. Each unit is an AxiDraw, given by name
+or port as for the port option, with its model and options.
+
+The duration of each job is estimated with AxiDraw.estimate(), for each model
+in the fleet, and each job may only go to units whose travel fits its page.
+Jobs are planned longest-processing-time first: in order of decreasing
+estimate, each job goes to the unit that would finish it earliest.
+
+While running, each unit plots the jobs in its own queue, one after another,
+in its own thread, as axidraw_control does when plotting to all units. A unit
+whose queue runs out takes the last job of the unit with the most estimated
+work left. If a unit fails to connect, or raises an error, it is taken out of
+service, and its job and queue are planned again over the remaining units.
+
+Example:
+
+    from pyaxidraw import fleet
+    scheduler = fleet.FleetScheduler([fleet.Unit("left", model=2), fleet.Unit("right")])
+    scheduler.add(fleet.Job("drawing.svg", copies=2))
+    scheduler.add(fleet.Job("layers.svg", layer=3))
+    scheduler.run()
+    print(scheduler.report())
+"""
+
+import os
+import threading
+import time
+
+from pyaxidraw import axidraw
+
+CONNECT_FAILED = 101 # plot_status.stopped value when the unit cannot be reached
+
+
+class Job: # pylint: disable=too-few-public-methods
+    '''
+    One plot job: SVG input (file name or string), number of copies, layer
+    number to plot (None: all layers), and other options, as a dictionary.
+    '''
+
+    def __init__(self, source, name=None, copies=1, layer=None, options=None):
+        self.source = source
+        if name is None and len(source) < 1000 and os.path.isfile(source):
+            name = os.path.basename(source)
+        self.name = name
+        self.copies = max(int(copies), 1)
+        self.layer = layer
+        self.options = dict(options or {})
+        self.estimates = {} # Model: estimated duration (s), or None if the page does not fit
+        self.status = "queued" # queued, plotting, done, stopped, or failed
+        self.unit = None # Name of the unit that plotted the job
+        self.attempts = 0
+
+    def __repr__(self):
+        return f"Job({self.name!r})"
+
+    def apply_options(self, ad_ref):
+        ''' Set the job's options, copies, and layer on an AxiDraw instance '''
+        for name, value in self.options.items():
+            setattr(ad_ref.options, name, value)
+        ad_ref.options.copies = self.copies
+        if self.layer is not None:
+            ad_ref.options.mode = "layers"
+            ad_ref.options.layer = self.layer
+
+
+class UnitStats: # pylint: disable=too-few-public-methods
+    ''' Work done by one unit '''
+
+    def __init__(self):
+        self.jobs_done = 0
+        self.jobs_stopped = 0
+        self.faults = 0
+        self.busy_time = 0.0        # s spent plotting
+        self.estimated_time = 0.0   # s, estimated, of the jobs done
+
+    def as_dict(self, elapsed):
+        ''' Dictionary of the counts, with utilisation and throughput over elapsed (s) '''
+        return {'jobs_done': self.jobs_done, 'jobs_stopped': self.jobs_stopped,\
+            'faults': self.faults, 'busy_time': round(self.busy_time, 3),\
+            'estimated_time': round(self.estimated_time, 3),\
+            'utilisation': round(self.busy_time / elapsed, 4) if elapsed > 0 else 0.0,\
+            'jobs_per_hour': round(3600 * self.jobs_done / elapsed, 3) if elapsed > 0 else 0.0}
+
+
+class Unit: # pylint: disable=too-few-public-methods
+    '''
+    One AxiDraw in the fleet: name (EBB nickname) or port, AxiDraw model
+    number (as the model option), and other options, as a dictionary.
+    '''
+
+    def __init__(self, name, model=1, options=None):
+        self.name = name
+        self.model = model
+        self.options = dict(options or {})
+        self.queue = [] # Jobs planned for this unit, in order
+        self.in_service = True
+        self.finish_time = 0.0 # Estimated time at which the planned jobs are done (s)
+        self.stats = UnitStats()
+
+    def __repr__(self):
+        return f"Unit({self.name!r})"
+
+    def remaining(self):
+        ''' Estimated duration of the jobs still queued (s) '''
+        return sum(job.estimates[self.model] for job in self.queue)
+
+
+def estimate_job(job, model, params=None):
+    '''
+    Estimated duration (s) of a job on an AxiDraw model, including copies and
+    the delay between them, or None if the document page does not fit its travel.
+    '''
+    ad = axidraw.AxiDraw(params=params, user_message_fun=lambda _message: None)
+    ad.plot_setup(job.source)
+    job.apply_options(ad)
+    ad.options.model = model
+    seconds = ad.estimate() # Includes all copies, and the delays between them
+    if not _fits(ad):
+        return None
+    return seconds
+
+
+def _fits(ad_ref):
+    ''' True if the document page fits the travel of the model, in some allowed orientation '''
+    width, height = ad_ref.svg_width, ad_ref.svg_height
+    x_travel, y_travel = ad_ref.bounds[1]
+    if width is None or height is None:
+        return False
+    if width <= x_travel and height <= y_travel:
+        return True
+    return bool(ad_ref.options.auto_rotate) and height <= x_travel and width <= y_travel
+
+
+def plot_job(unit, job, params=None):
+    ''' Plot a job on a unit. Returns plot_status.stopped: 0 if completed. '''
+    ad = axidraw.AxiDraw(params=params)
+    ad.plot_setup(job.source)
+    for name, value in unit.options.items():
+        setattr(ad.options, name, value)
+    job.apply_options(ad)
+    ad.options.model = unit.model
+    ad.options.port = unit.name
+    ad.options.port_config = 2 # Use only the AxiDraw specified by port
+    ad.plot_run()
+    return ad.plot_status.stopped
+
+
+class FleetScheduler:
+    '''
+    Estimate, plan, and run a queue of jobs over a fleet of units. plot_function
+    and estimate_function may be replaced, e.g., for simulation; their arguments
+    are those of plot_job and estimate_job.
+    '''
+
+    def __init__(self, units, plot_function=plot_job, estimate_function=estimate_job,\
+            params=None):
+        self.units = list(units)
+        self.jobs = []
+        self.unplaced = [] # Jobs that no unit in service can plot
+        self.plot_function = plot_function
+        self.estimate_function = estimate_function
+        self.params = params
+        self.elapsed = 0.0
+        self.planned = 0.0 # Estimated time to plot all jobs, as planned (s)
+        self._condition = threading.Condition()
+        self._plotting = 0 # Number of jobs being plotted
+
+    def add(self, job):
+        ''' Add a job to the queue, and estimate its duration on each model in the fleet '''
+        if job.name is None:
+            job.name = f"job-{len(self.jobs) + 1}"
+        for model in {unit.model for unit in self.units}:
+            if model not in job.estimates:
+                job.estimates[model] = self.estimate_function(job, model, self.params)
+        self.jobs.append(job)
+        return job
+
+    def plan(self):
+        '''
+        Assign the queued jobs to units, longest estimated job first, each to the
+        unit in service that would finish it earliest. Returns a dictionary of
+        unit name: list of jobs.
+        '''
+        for unit in self.units:
+            unit.queue = []
+            unit.finish_time = 0.0
+        self.unplaced = []
+        self._place([job for job in self.jobs if job.status == "queued"])
+        self.planned = self.planned_makespan()
+        return {unit.name: list(unit.queue) for unit in self.units}
+
+    def _place(self, jobs):
+        ''' Place jobs over the units in service, longest first '''
+        def longest(job):
+            known = [seconds for seconds in job.estimates.values() if seconds is not None]
+            return max(known) if known else 0
+        for job in sorted(jobs, key=longest, reverse=True):
+            units = [unit for unit in self.units\
+                if unit.in_service and job.estimates.get(unit.model) is not None]
+            if not units:
+                job.status = "failed"
+                self.unplaced.append(job)
+                continue
+            unit = min(units, key=lambda unit: unit.finish_time + job.estimates[unit.model])
+            unit.queue.append(job)
+            unit.finish_time += job.estimates[unit.model]
+
+    def planned_makespan(self):
+        ''' Estimated time until all planned jobs are done (s) '''
+        return max((unit.finish_time for unit in self.units), default=0.0)
+
+    def run(self):
+        ''' Plan the jobs and plot them, one thread per unit. Returns report(). '''
+        if not any(unit.queue for unit in self.units):
+            self.plan()
+        start = time.monotonic()
+        threads = [threading.Thread(target=self._run_unit, args=(unit,),\
+            name=f"fleet-{unit.name}") for unit in self.units]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.elapsed = time.monotonic() - start
+        return self.report()
+
+    def _next_job(self, unit):
+        '''
+        Next job for a unit: from its queue, or else taken from the busiest other
+        unit. While other units are plotting, wait: if one fails, its jobs are
+        placed again. Returns None when there is nothing left for this unit.
+        '''
+        with self._condition:
+            while unit.in_service:
+                job = unit.queue.pop(0) if unit.queue else self._steal(unit)
+                if job is not None:
+                    job.status = "plotting"
+                    self._plotting += 1
+                    return job
+                if self._plotting == 0:
+                    return None
+                self._condition.wait()
+            return None
+
+    def _steal(self, unit):
+        ''' Take the last compatible job of the unit with the most estimated work left '''
+        for other in sorted(self.units, key=lambda other: other.remaining(), reverse=True):
+            if other is unit:
+                continue
+            for index in range(len(other.queue) - 1, -1, -1):
+                job = other.queue[index]
+                if job.estimates.get(unit.model) is not None:
+                    return other.queue.pop(index)
+        return None
+
+    def _run_unit(self, unit):
+        ''' Plot jobs on one unit until there are none left, or the unit fails '''
+        while True:
+            job = self._next_job(unit)
+            if job is None:
+                return
+            job.attempts += 1
+            job.unit = unit.name
+            start = time.monotonic()
+            try:
+                status = self.plot_function(unit, job, self.params)
+            except Exception: # pylint: disable=broad-except
+                status = None # Fault; e.g., USB connection lost
+            busy = time.monotonic() - start
+            with self._condition:
+                self._plotting -= 1
+                self._condition.notify_all()
+                unit.stats.busy_time += busy
+                if status == 0:
+                    job.status = "done"
+                    unit.stats.jobs_done += 1
+                    unit.stats.estimated_time += job.estimates[unit.model]
+                elif status is None or status == CONNECT_FAILED:
+                    self._fault(unit, job)
+                    return
+                else: # Stopped, e.g., paused by button; leave the job for the operator
+                    job.status = "stopped"
+                    unit.stats.jobs_stopped += 1
+
+    def _fault(self, unit, job):
+        ''' Take a unit out of service, and place its job and queue on the other units '''
+        unit.in_service = False
+        unit.stats.faults += 1
+        jobs = [job] + unit.queue
+        unit.queue = []
+        for other in self.units:
+            other.finish_time = other.remaining() if other.in_service else 0.0
+        for pending in jobs:
+            pending.status = "queued"
+        self._place(jobs)
+
+    def report(self):
+        '''
+        Dictionary of statistics: per unit (jobs done, busy time, utilisation,
+        throughput), and for the fleet (elapsed time, estimated time as first
+        planned, and number of jobs by status).
+        '''
+        units = {unit.name: dict(unit.stats.as_dict(self.elapsed), model=unit.model,\
+            in_service=unit.in_service) for unit in self.units}
+        counts = {}
+        for job in self.jobs:
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return {'elapsed': round(self.elapsed, 3),\
+            'planned': round(self.planned, 3),\
+            'jobs': counts, 'units': units}
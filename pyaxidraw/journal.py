@@ -0,0 +1,155 @@
+# coding=utf-8
+#
+# Copyright 2023 Windell H. Oskay, Evil Mad Scientist Laboratories
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+
+"""
+pyaxidraw/journal.py
+
+Crash-safe journal of interactive plotting progress.
+
+Each draw_path or draw_paths call in an interactive session is a numbered
+"batch". The journal is an append-only file of JSON lines, recording for each
+batch a fingerprint of its input paths ("start"), the pen-down distance drawn
+and turtle position after each completed path ("path"), and when the batch was
+stopped ("stop") or finished ("done").
+
+Every record is flushed to the operating system as it is written, so that it
+survives an exception or a lost USB connection. Records are also written to
+disk (fsync) in batches: every sync_count records, after sync_interval seconds,
+and at once when a plot stops. After a power loss, at most the paths drawn since
+the last sync are redrawn.
+
+After a crash, running the same script again with the same inputs (e.g., the same
+random seed) reproduces the same batches. JournalRecovery then tells which
+batches were already drawn, and how far into the batch that was interrupted.
+"""
+
+import json
+import os
+import time
+import zlib
+from array import array
+
+from pyaxidraw import path_attributes
+
+
+def fingerprint(path_list):
+    ''' Checksum of the vertices of a list of paths, to check that a batch is unchanged '''
+    checksum = zlib.crc32(str(len(path_list)).encode())
+    for path in path_list:
+        vertex_list, attributes = path_attributes.split_path(path)
+        values = array('d', [round(float(value), 6) for vertex in vertex_list\
+            for value in vertex[:2]])
+        checksum = zlib.crc32(values.tobytes(), checksum)
+        if attributes:
+            checksum = zlib.crc32(repr(sorted(attributes.items())).encode(), checksum)
+    return f"{checksum:08x}"
+
+
+class Journal:
+    ''' Append-only journal file of JSON lines, written to disk in batches '''
+
+    def __init__(self, file_name, sync_count=25, sync_interval=2.0):
+        self.file_name = file_name
+        self.sync_count = sync_count        # Records between writes to disk
+        self.sync_interval = sync_interval  # Seconds between writes to disk
+        self._file = None
+        self._unsynced = 0
+        self._last_sync = 0
+
+    def open(self, append=False):
+        ''' Open the journal file; start a new file unless append is True '''
+        self.close()
+        self._file = open(self.file_name, 'a' if append else 'w', encoding='utf-8')
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def write(self, record, sync=False):
+        ''' Append one record. Write to disk if sync is True, or if a sync is due. '''
+        if self._file is None:
+            return
+        self._file.write(json.dumps(record, separators=(',', ':')) + '\n')
+        self._file.flush()
+        self._unsynced += 1
+        if sync or self._unsynced >= self.sync_count or\
+                time.monotonic() - self._last_sync >= self.sync_interval:
+            self.sync()
+
+    def sync(self):
+        ''' Write all records to disk '''
+        if self._file is None or not self._unsynced:
+            return
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def close(self):
+        ''' Write all records to disk and close the file '''
+        if self._file is None:
+            return
+        self.sync()
+        self._file.close()
+        self._file = None
+
+    @staticmethod
+    def read(file_name):
+        '''
+        Return the list of records in a journal file. A partially written
+        final line, as may be left by a crash, is ignored.
+        '''
+        records = []
+        with open(file_name, encoding='utf-8') as journal_file:
+            for line in journal_file:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    break
+        return records
+
+
+class JournalRecovery:
+    '''
+    Progress recorded in a journal: For each batch, its fingerprint, whether it
+    was finished, and the pen-down distance (inches) drawn into it.
+    '''
+
+    def __init__(self, records):
+        self.data = {}      # Data recorded by the script at the start of the session
+        self.batches = {}   # batch number: [fingerprint, done, distance]
+        for record in records:
+            event = record.get("event")
+            if event == "session":
+                self.data = record.get("data", {})
+            elif event == "start":
+                self.batches.setdefault(record["batch"], [record.get("key"), False, 0.0])
+            elif event in ("path", "stop", "done") and record.get("batch") in self.batches:
+                batch = self.batches[record["batch"]]
+                if event == "done":
+                    batch[1] = True
+                else:
+                    batch[2] = max(batch[2], record.get("dist", 0.0))
+        self.last_batch = max(self.batches, default=-1)
+
+    def progress(self, batch_number, key):
+        '''
+        Return (done, distance) for a batch, or None if the journal has no
+        progress beyond this point, or if the batch does not match the journal.
+        '''
+        batch = self.batches.get(batch_number)
+        if batch is None or batch[0] != key:
+            return None
+        return batch[1], batch[2]
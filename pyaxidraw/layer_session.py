@@ -0,0 +1,109 @@
+# coding=utf-8
+#
+# Copyright 2023 Windell H. Oskay, Evil Mad Scientist Laboratories
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+
+"""
+pyaxidraw/layer_session.py
+
+Parse once, plot layer by layer.
+
+Plotting one layer at a time (layers mode) normally parses and digests the whole
+document for each layer, only to discard all other layers. A LayerSession holds
+the digest of all layers, prepared once (clipped, optimized, and simplified),
+indexed by layer number, so that each layer can be plotted straight from it.
+The layers are held with compact paths (see compact_paths), and expanded into
+ordinary paths for each plot.
+
+Every step of preparing a digest for plotting acts on each layer separately,
+except hidden-line removal, which is done over all visible layers in layers mode
+as well. The digest of one layer taken from the session is therefore the same
+as the digest of that layer prepared on its own.
+"""
+
+import copy
+
+from axidrawinternal.plot_utils_import import from_dependency_import # plotink
+path_objects = from_dependency_import('axidrawinternal.path_objects')
+inkex = from_dependency_import('ink_extensions.inkex')
+
+from pyaxidraw import compact_paths # pylint: disable=wrong-import-position
+
+# Options that change how the document is digested, clipped, optimized, or simplified
+DIGEST_OPTIONS = ('model', 'hiding', 'reordering', 'random_start', 'auto_rotate', 'no_rotate',\
+    'resolution')
+
+
+def session_key(ad_ref):
+    ''' Settings that a LayerSession is valid for '''
+    return (id(ad_ref.params), ad_ref.simplify_tolerance,\
+        tuple(getattr(ad_ref.options, name, None) for name in DIGEST_OPTIONS))
+
+
+def svg_layer_numbers(svg):
+    '''
+    Layer numbers of the visible, numbered layers of an SVG root element, in
+    order, without parsing their contents.
+    '''
+    numbers = []
+    for node in svg.iterchildren():
+        if node.tag not in ('{http://www.w3.org/2000/svg}g', 'g') or\
+                node.get(inkex.addNS('groupmode', 'inkscape')) != 'layer':
+            continue
+        if node.get('display') == 'none' or\
+                'display:none' in node.get('style', '').replace(' ', ''):
+            continue
+        layer = path_objects.LayerItem()
+        layer.parse_name(node.get(inkex.addNS('label', 'inkscape')) or "")
+        if layer.props.skip or layer.props.number is None:
+            continue
+        if layer.props.number not in numbers:
+            numbers.append(layer.props.number)
+    return numbers
+
+
+class LayerSession:
+    ''' Digest of all layers of a document, prepared for plotting and indexed by layer number '''
+
+    def __init__(self, digest, key=None, rand_seed=None):
+        self.key = key
+        self.rand_seed = rand_seed # Seed used to randomize start points, if any
+        self._template = copy.copy(digest) # Document properties, without layers
+        self._template.layers = []
+        self._layers = {} # Layer number: list of LayerItem objects with that number
+        for layer in digest.layers: # Held with compact paths, between plots
+            if layer.props.number is not None:
+                self._layers.setdefault(layer.props.number, []).append(\
+                    compact_paths.compact_layer(layer))
+
+    def numbers(self):
+        ''' Layer numbers, in increasing order '''
+        return sorted(self._layers)
+
+    def digest(self, number):
+        '''
+        New flat DocDigest of only the layers with the given number. Layers are
+        copied, as ordinary PathItems, so that plotting (or cropping, to resume)
+        leaves the session intact.
+        '''
+        digest = copy.copy(self._template)
+        digest.plotdata = dict(self._template.plotdata)
+        digest.metadata = dict(self._template.metadata)
+        digest.layers = [compact_paths.expand_layer(layer)\
+            for layer in self._layers.get(number, [])]
+        digest.flat = True
+        return digest
+
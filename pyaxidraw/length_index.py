@@ -0,0 +1,166 @@
+# coding=utf-8
+#
+# Copyright 2023 Windell H. Oskay, Evil Mad Scientist Laboratories
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+
+"""
+pyaxidraw/length_index.py
+
+Cumulative path-length index, for seeking directly to the resume point of a plot.
+
+DocDigest.crop() walks every segment of every path before the resume point to
+find where to restart. The index holds the cumulative pen-down length at the end
+of each path of the flattened digest. It is saved with the resume data
+("plotdata") when a plot is paused, so that resuming only needs a binary search
+and a single call to PathItem.crop_by_distance().
+"""
+
+import bisect
+import hashlib
+
+from axidrawinternal.plot_utils_import import from_dependency_import # plotink
+path_objects = from_dependency_import('axidrawinternal.path_objects')
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+INDEX_ATTRIBUTE = 'length_index' # Attribute name within the plotdata element
+
+
+def path_length(path):
+    ''' Length of a flat PathItem; vectorized when NumPy is available '''
+    if np is None or len(path.subpaths[0]) < 2:
+        return path.length()
+    deltas = np.diff(np.asarray(path.subpaths[0], dtype=float)[:, :2], axis=0)
+    return float(np.sum(np.hypot(deltas[:, 0], deltas[:, 1])))
+
+
+def _signature(digest):
+    '''
+    Hash of the layer structure, and of the vertex count and end vertices of every
+    path of a flat digest, to check that an index belongs to it. Path lengths are
+    left out: measuring them is the work that a saved index avoids.
+    '''
+    signature = hashlib.sha1()
+    count = 0
+    for layer in digest.layers:
+        signature.update(f"L{len(layer.paths)}".encode())
+        for path in layer.paths:
+            vertices = path.subpaths[0]
+            first = vertices[0]
+            last = vertices[-1]
+            signature.update((f"P{len(vertices)}:{first[0]:.6f},{first[1]:.6f}:"\
+                f"{last[0]:.6f},{last[1]:.6f}").encode())
+        count += len(layer.paths)
+    return f"{count}:{signature.hexdigest()}"
+
+
+class LengthIndex:
+    ''' Cumulative pen-down length (inches) at the end of each path of a flat DocDigest '''
+
+    def __init__(self, ends=None, signature=""):
+        self.ends = [] if ends is None else ends
+        self.signature = signature
+
+    @classmethod
+    def from_digest(cls, digest):
+        ''' Build the index for a flat digest '''
+        ends = []
+        total = 0.0
+        for layer in digest.layers:
+            for path in layer.paths:
+                total += path_length(path)
+                ends.append(total)
+        return cls(ends, _signature(digest))
+
+    def to_string(self):
+        ''' Compact text form, for storage in the plotdata element '''
+        return self.signature + ";" + " ".join(f"{end:.6f}" for end in self.ends)
+
+    @classmethod
+    def from_string(cls, text):
+        ''' Parse the text form; return None if it is missing or invalid '''
+        if not text or ";" not in text:
+            return None
+        signature, _sep, ends = text.partition(";")
+        try:
+            return cls([float(end) for end in ends.split()], signature)
+        except ValueError:
+            return None
+
+    def matches(self, digest):
+        ''' True if this index was built for the given digest '''
+        return self.signature == _signature(digest)
+
+    def crop(self, digest, distance):
+        '''
+        Same as DocDigest.crop(): remove the initial portion of a flat digest, up to
+        the given pen-down distance. Paths that end before the distance are skipped
+        by binary search; only the path where plotting resumes is walked.
+        '''
+        if distance <= 0:
+            return
+        ends = self.ends
+        count = len(ends)
+        index = bisect.bisect_right(ends, distance)
+        while index < count: # Match DocDigest.crop tolerance for paths ending just past it
+            length = ends[index] - (ends[index - 1] if index else 0.0)
+            if ends[index] > distance + min(length / 100, 0.001):
+                break
+            index += 1
+        if index == count: # Resume point is past the end of the plot
+            digest.layers[:] = []
+            return
+
+        layer_starts = []
+        paths_so_far = 0
+        for layer in digest.layers:
+            layer_starts.append(paths_so_far)
+            paths_so_far += len(layer.paths)
+        layer_index = bisect.bisect_right(layer_starts, index) - 1
+        layer = digest.layers[layer_index]
+        path_index = index - layer_starts[layer_index]
+
+        start = ends[index - 1] if index else 0.0
+        if path_index > 0:
+            layer.props.delay = None # No delay, since not on first path of layer.
+        if distance > start:
+            layer.props.delay = None # No delay, splice is after beginning of path
+            layer.paths[path_index].crop_by_distance(distance - start)
+        layer.props.pause = False
+        layer.paths = layer.paths[path_index:]
+        digest.layers[:] = digest.layers[layer_index:]
+
+
+class IndexedDocDigest(path_objects.DocDigest):
+    '''
+    DocDigest whose crop() uses a LengthIndex: the given one (e.g., saved with the
+    plot progress data) if it matches its contents, or else one built on crop().
+    '''
+
+    def __init__(self, digest, length_index=None):
+        super().__init__()
+        self.__dict__.update(digest.__dict__)
+        self.length_index = length_index
+
+    def crop(self, distance):
+        if distance <= 0:
+            return
+        if self.length_index is None or not self.length_index.matches(self):
+            self.length_index = LengthIndex.from_digest(self)
+        self.length_index.crop(self, distance)
@@ -0,0 +1,374 @@
+# coding=utf-8
+#
+# Copyright 2023 Windell H. Oskay, Evil Mad Scientist Laboratories
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+
+"""
+pyaxidraw/lightburn.py
+
+Read LightBurn project files (.lbrn2) directly into a document digest.
+
+A LightBurn project is an XML file of shapes, each assigned to a cut layer
+(a CutSetting) by its CutIndex. Shapes are rectangles (Rect), ellipses
+(Ellipse), paths (Path: a list of vertices with optional Bezier control
+points, and a list of line and Bezier primitives between them), and groups
+(Group) of other shapes. Each shape, and each group, has an affine transform
+(XForm). A path may leave out its vertex or primitive list and refer to that
+of an earlier path, by VertID or PrimID.
+
+Each cut layer becomes a layer of the digest, numbered with its cut index, so
+that layers mode plots one cut layer, in the order of the cut priority. Layers
+that are hidden or have output disabled are left out, as are shapes that are
+not vector shapes, such as bitmaps and text without outlines.
+
+LightBurn coordinates are in millimeters, with Y pointing up. The page of the
+digest is the bounding box of all shapes, including those on layers that are
+left out, so that a page outline drawn on a non-output layer sets the page.
+"""
+
+import logging
+import math
+import os
+import re
+
+from lxml import etree
+
+from axidrawinternal.plot_utils_import import from_dependency_import # plotink
+plot_utils = from_dependency_import('plotink.plot_utils')
+path_objects = from_dependency_import('axidrawinternal.path_objects')
+inkex = from_dependency_import('ink_extensions.inkex')
+
+from pyaxidraw import compact_paths
+
+logger = logging.getLogger(__name__)
+
+EXTENSIONS = ('.lbrn2',)
+MM_PER_INCH = 25.4
+KAPPA = 0.5522847498 # Bezier control distance for a quarter circle of radius 1
+IDENTITY = (1.0, 0.0, 0.0, 1.0, 0.0, 0.0)
+
+_NUMBER = r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?'
+_VERTEX = re.compile(rf'\s*({_NUMBER})\s+({_NUMBER})')
+_CONTROL = re.compile(rf'(c[01][xy])({_NUMBER})')
+_PRIMITIVE = re.compile(r'([A-Za-z])\s*(\d+)\s+(\d+)')
+
+
+def is_project(svg_input):
+    ''' True if svg_input is the name of a LightBurn project file, by its extension '''
+    return isinstance(svg_input, str) and len(svg_input) < 1000 and\
+        os.path.splitext(svg_input)[1].lower() in EXTENSIONS
+
+
+def parse_matrix(text):
+    ''' Affine transform (a, b, c, d, e, f) from the text of an XForm element '''
+    if not text or not text.strip():
+        return IDENTITY
+    values = [float(value) for value in text.split()]
+    if len(values) != 6:
+        raise ValueError(f"Invalid XForm: {text}")
+    return tuple(values)
+
+
+def compose(outer, inner):
+    ''' Transform that applies inner, then outer '''
+    a_1, b_1, c_1, d_1, e_1, f_1 = outer
+    a_2, b_2, c_2, d_2, e_2, f_2 = inner
+    return (a_1 * a_2 + c_1 * b_2, b_1 * a_2 + d_1 * b_2,\
+        a_1 * c_2 + c_1 * d_2, b_1 * c_2 + d_1 * d_2,\
+        a_1 * e_2 + c_1 * f_2 + e_1, b_1 * e_2 + d_1 * f_2 + f_1)
+
+
+def parse_vertices(text):
+    '''
+    Vertices from the text of a VertList element: a list of (point, c0, c1),
+    where c0 is the control point leaving the vertex and c1 the control point
+    entering it, each None if absent. A control point is present only if both
+    of its coordinates are given; "c0x1" alone marks c0 as absent.
+    '''
+    vertices = []
+    for entry in (text or "").split('V')[1:]:
+        match = _VERTEX.match(entry)
+        if match is None:
+            raise ValueError(f"Invalid vertex: V{entry}")
+        point = [float(match.group(1)), float(match.group(2))]
+        controls = dict(_CONTROL.findall(entry[match.end():]))
+        c_0 = [float(controls['c0x']), float(controls['c0y'])]\
+            if 'c0x' in controls and 'c0y' in controls else None
+        c_1 = [float(controls['c1x']), float(controls['c1y'])]\
+            if 'c1x' in controls and 'c1y' in controls else None
+        vertices.append((point, c_0, c_1))
+    return vertices
+
+
+def parse_primitives(text, vertex_count):
+    '''
+    Primitives from the text of a PrimList element: a list of (kind, start
+    index, end index), where kind is "B" for a cubic Bezier and "L" for a line.
+    "LineClosed" (or "LineOpen") stands for lines between successive vertices.
+    With no primitive list, the vertices are joined by lines.
+    '''
+    text = (text or "").strip()
+    if not text or text.startswith("Line"):
+        primitives = [("L", index, index + 1) for index in range(vertex_count - 1)]
+        if text.endswith("Closed") and vertex_count > 2:
+            primitives.append(("L", vertex_count - 1, 0))
+        return primitives
+    return [(kind.upper(), int(start), int(end)) for kind, start, end in _PRIMITIVE.findall(text)]
+
+
+def path_csp(vertices, primitives):
+    '''
+    Cubic superpath (as in plot_utils: a list of subpaths, each a list of
+    [control in, point, control out]) of a path. A new subpath begins at
+    each primitive that does not start where the last one ended.
+    '''
+    csp = []
+    subpath = None
+    last_index = None
+    for kind, start, end in primitives:
+        if start >= len(vertices) or end >= len(vertices):
+            raise ValueError(f"Primitive {kind}{start} {end} refers to a missing vertex")
+        point, c_0, _c_1 = vertices[start]
+        if subpath is None or start != last_index:
+            subpath = [[point, point, point]]
+            csp.append(subpath)
+        end_point, _c_0, c_1 = vertices[end]
+        if kind == "B":
+            subpath[-1][2] = c_0 or point
+            subpath.append([c_1 or end_point, end_point, end_point])
+        else:
+            subpath.append([end_point, end_point, end_point])
+        last_index = end
+    return csp
+
+
+def _arc_nodes(x_center, y_center, x_radius, y_radius, start_quarter, quarters):
+    ''' Points and control points of quarter-ellipse Bezier arcs, counterclockwise '''
+    nodes = []
+    for quarter in range(start_quarter, start_quarter + quarters + 1):
+        angle = quarter * math.pi / 2
+        cos, sin = round(math.cos(angle)), round(math.sin(angle))
+        point = [x_center + x_radius * cos, y_center + y_radius * sin]
+        tangent = [-x_radius * KAPPA * sin, y_radius * KAPPA * cos]
+        nodes.append([[point[0] - tangent[0], point[1] - tangent[1]], point,\
+            [point[0] + tangent[0], point[1] + tangent[1]]])
+    nodes[0][0] = nodes[0][1]
+    nodes[-1][2] = nodes[-1][1]
+    return nodes
+
+
+def ellipse_csp(x_radius, y_radius):
+    ''' Cubic superpath of an ellipse centered on the origin '''
+    return [_arc_nodes(0, 0, x_radius, y_radius, 0, 4)]
+
+
+def rect_csp(width, height, corner_radius=0):
+    ''' Cubic superpath of a rectangle centered on the origin, with rounded corners '''
+    x_half, y_half = width / 2, height / 2
+    radius = max(0.0, min(corner_radius, x_half, y_half))
+    if radius <= 0:
+        corners = [[x_half, -y_half], [x_half, y_half], [-x_half, y_half],\
+            [-x_half, -y_half], [x_half, -y_half]]
+        return [[[corner, corner, corner] for corner in corners]]
+    nodes = []
+    for quarter, (x_center, y_center) in enumerate([(x_half - radius, y_half - radius),\
+            (-x_half + radius, y_half - radius), (-x_half + radius, -y_half + radius),\
+            (x_half - radius, -y_half + radius)]):
+        nodes.extend(_arc_nodes(x_center, y_center, radius, radius, quarter, 1))
+    start = nodes[-1][1]
+    nodes.insert(0, [start, start, start]) # Close with the straight right side
+    return [nodes]
+
+
+def transform_csp(csp, matrix):
+    ''' Apply an affine transform to every point of a cubic superpath '''
+    a_m, b_m, c_m, d_m, e_m, f_m = matrix
+    return [[[[a_m * p_x + c_m * p_y + e_m, b_m * p_x + d_m * p_y + f_m]\
+        for p_x, p_y in node] for node in subpath] for subpath in csp]
+
+
+def flatten_csp(csp, tolerance):
+    ''' Vertex lists of a cubic superpath, with curves subdivided within tolerance '''
+    vertex_lists = []
+    for subpath in csp:
+        if len(subpath) < 2:
+            continue
+        subpath = [[list(point) for point in node] for node in subpath]
+        plot_utils.subdivideCubicPath(subpath, tolerance)
+        vertex_lists.append([node[1] for node in subpath])
+    return vertex_lists
+
+
+class _CutLayer: # pylint: disable=too-few-public-methods
+    ''' Settings of one cut layer, and the vertex lists of each of its shapes '''
+
+    def __init__(self, index, name=None, priority=0, output=True):
+        self.index = index
+        self.name = name if name else f"C{index:02d}"
+        self.priority = priority
+        self.output = output
+        self.shapes = [] # Lists of vertex lists, one per shape
+
+    @classmethod
+    def from_element(cls, element):
+        ''' _CutLayer from a CutSetting element '''
+        def value(tag, default=None):
+            child = element.find(tag)
+            return default if child is None else child.get('Value', default)
+        return cls(int(value('index', 0)), value('name'), int(float(value('priority', 0))),\
+            value('doOutput', '1') != '0' and value('hide', '0') != '1' and\
+            element.get('type') != "Tool")
+
+
+class ProjectReader:
+    '''
+    Read a LightBurn project into a DocDigest. tolerance is the curve
+    tolerance, in inches, as the curve_tolerance parameter.
+    '''
+
+    def __init__(self, tolerance=0.002):
+        self.tolerance = tolerance * MM_PER_INCH
+        self.layers = {}
+        self.vert_lists = {} # Text of vertex lists by VertID, for paths that refer to them
+        self.prim_lists = {} # Text of primitive lists by PrimID
+        self.skipped = 0 # Number of shapes that are not vector shapes
+
+    def read(self, file_name):
+        ''' DocDigest of the LightBurn project file file_name '''
+        with open(file_name, 'rb') as project_file:
+            tree = etree.parse(project_file, parser=etree.XMLParser(huge_tree=True))
+        digest = self.digest(tree.getroot())
+        digest.name = os.path.basename(file_name)
+        return digest
+
+    def digest(self, root):
+        ''' DocDigest of a LightBurn project, from its root element '''
+        if root.tag != "LightBurnProject":
+            raise ValueError("Not a LightBurn project")
+        for element in root.iterchildren("CutSetting"):
+            layer = _CutLayer.from_element(element)
+            self.layers[layer.index] = layer
+        for shape in root.iter("Shape"): # Lists may be given by any shape that shares them
+            for tag, lists in (("VertList", self.vert_lists), ("PrimList", self.prim_lists)):
+                list_id = shape.get(tag[:4] + "ID")
+                text = shape.findtext(tag)
+                if list_id is not None and text is not None and list_id not in lists:
+                    lists[list_id] = text
+        for shape in root.iterchildren("Shape"):
+            self._add_shape(shape, IDENTITY)
+        if self.skipped:
+            logger.warning("%d LightBurn shapes that are not vector shapes were skipped.",\
+                self.skipped)
+        return self._to_digest()
+
+    def _add_shape(self, shape, matrix):
+        ''' Add the vertex lists of a shape, and of the shapes in it, to their layers '''
+        matrix = compose(matrix, parse_matrix(shape.findtext("XForm")))
+        shape_type = shape.get('Type')
+        if shape_type == "Group":
+            children = shape.find("Children")
+            for child in ([] if children is None else children.iterchildren("Shape")):
+                self._add_shape(child, matrix)
+            return
+        csp = self._shape_csp(shape, shape_type)
+        if csp is None:
+            self.skipped += 1
+            return
+        index = int(shape.get('CutIndex', 0))
+        if index not in self.layers:
+            self.layers[index] = _CutLayer(index)
+        vertex_lists = flatten_csp(transform_csp(csp, matrix), self.tolerance)
+        if vertex_lists:
+            self.layers[index].shapes.append(vertex_lists)
+
+    def _shape_csp(self, shape, shape_type):
+        ''' Cubic superpath of a shape, in its own coordinates, or None if not a vector shape '''
+        if shape_type == "Rect":
+            return rect_csp(float(shape.get('W', 0)), float(shape.get('H', 0)),\
+                float(shape.get('Cr', 0)))
+        if shape_type == "Ellipse":
+            return ellipse_csp(float(shape.get('Rx', 0)), float(shape.get('Ry', 0)))
+        backup = shape.find("BackupPath") # Text shapes may carry their outlines
+        source = shape if backup is None else backup
+        vert_text = source.findtext("VertList")
+        if vert_text is None:
+            vert_text = self.vert_lists.get(source.get('VertID'))
+        if vert_text is None:
+            return None
+        vertices = parse_vertices(vert_text)
+        prim_text = source.findtext("PrimList")
+        if prim_text is None:
+            prim_text = self.prim_lists.get(source.get('PrimID'))
+        return path_csp(vertices, parse_primitives(prim_text, len(vertices)))
+
+    def _to_digest(self):
+        ''' DocDigest of the layers read: in inches, Y down, on the page of all shapes '''
+        points = [vertex for layer in self.layers.values() for shape in layer.shapes\
+            for vertex_list in shape for vertex in vertex_list]
+        digest = path_objects.DocDigest()
+        if not points:
+            return digest
+        x_min = min(point[0] for point in points)
+        y_max = max(point[1] for point in points)
+        digest.width = (max(point[0] for point in points) - x_min) / MM_PER_INCH
+        digest.height = (y_max - min(point[1] for point in points)) / MM_PER_INCH
+        digest.viewbox = f"0 0 {digest.width:f} {digest.height:f}"
+        for cut_layer in sorted(self.layers.values(), key=lambda item: (item.priority, item.index)):
+            if not cut_layer.output or not cut_layer.shapes:
+                continue
+            layer = path_objects.LayerItem()
+            layer.item_id = f"lbrn_layer_{cut_layer.index}"
+            layer.parse_name(f"{cut_layer.index} {cut_layer.name}")
+            for number, shape in enumerate(cut_layer.shapes):
+                layer.paths.append(path_objects.PathItem.from_attrs(subpaths=[[\
+                    [(v_x - x_min) / MM_PER_INCH, (y_max - v_y) / MM_PER_INCH]\
+                    for v_x, v_y in vertex_list] for vertex_list in shape],\
+                    stroke="#000000", item_id=f"{layer.item_id}_{number}"))
+            digest.layers.append(layer)
+        return digest
+
+
+def read_project(file_name, tolerance=0.002):
+    ''' DocDigest of a LightBurn project file, with curves within tolerance (inches) '''
+    return ProjectReader(tolerance).read(file_name)
+
+
+def import_project(file_name, tolerance=0.002):
+    '''
+    Read a LightBurn project file for plotting: Return its digest, in compact
+    form, and an SVG document with its page size, to stand in for the project.
+    Log an error and raise RuntimeError if the file cannot be read.
+    '''
+    try:
+        digest = compact_paths.compact(read_project(file_name, tolerance))
+    except (OSError, ValueError, etree.XMLSyntaxError) as err:
+        logger.error("Unable to open LightBurn project file.")
+        raise RuntimeError("Unable to open LightBurn project file.") from err
+    return digest, etree.ElementTree(page_svg(digest))
+
+
+def page_svg(digest):
+    '''
+    Root element of an empty SVG document with the page size of a digest,
+    in inches, to stand in for the document of an imported digest.
+    '''
+    svg = etree.Element(inkex.addNS('svg', 'svg'), nsmap={None: inkex.NSS['svg'],\
+        'sodipodi': inkex.NSS['sodipodi'], 'inkscape': inkex.NSS['inkscape']})
+    svg.set('width', f"{digest.width:f}in")
+    svg.set('height', f"{digest.height:f}in")
+    svg.set('viewBox', f"0 0 {digest.width:f} {digest.height:f}")
+    svg.set(inkex.addNS('docname', 'sodipodi'), digest.name)
+    return svg
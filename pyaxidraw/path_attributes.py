@@ -0,0 +1,73 @@
+# coding=utf-8
+#
+# Copyright 2023 Windell H. Oskay, Evil Mad Scientist Laboratories
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+
+"""
+pyaxidraw/path_attributes.py
+
+Per-path motion attributes for the Python interactive API.
+
+A path given to draw_paths() may be a vertex list, or a dictionary with the
+vertex list under "vertices" and any of these optional attributes:
+
+    speed_pendown   Pen-down speed for this path, as the speed_pendown option
+    accel           Acceleration for this path, as the accel option
+    pen_pos_down    Pen-down height for this path, as the pen_pos_down option
+
+Attributes apply to one path only; other paths use the option values. They
+are applied while plotting the batch, as layer speed and height are applied
+when plotting a document: speed and acceleration are used in motion planning
+only, and a new pen-down height is sent to the EBB as a temporary height.
+"""
+
+from axidrawinternal.plot_utils_import import from_dependency_import # plotink
+plot_utils = from_dependency_import('plotink.plot_utils')
+
+# Attribute name: (minimum, maximum), as for the option of the same name
+LIMITS = {'speed_pendown': (1, 110), 'accel': (1, 110), 'pen_pos_down': (0, 100)}
+
+ITEM_PREFIX = "draw_path_" # item_id of each path: prefix and index in the batch
+
+
+def split_path(path):
+    '''
+    Vertex list and dictionary of attributes of one path given to draw_paths().
+    Attributes that are None are left out. Raises ValueError for unknown attributes.
+    '''
+    if not isinstance(path, dict):
+        return path, {}
+    unknown = set(path) - set(LIMITS) - {'vertices'}
+    if unknown:
+        raise ValueError(f"Unknown path attributes: {', '.join(sorted(unknown))}")
+    attributes = {}
+    for name, (minimum, maximum) in LIMITS.items():
+        if path.get(name) is not None:
+            attributes[name] = plot_utils.constrainLimits(path[name], minimum, maximum)
+    return path.get('vertices') or [], attributes
+
+
+def item_id(index):
+    ''' item_id for the path at index in the batch '''
+    return f"{ITEM_PREFIX}{index}"
+
+
+def path_index(path_item):
+    '''
+    Index in the batch of the path that a PathItem came from. Clipping may
+    split a path in several, with item_id values that begin with its own.
+    '''
+    return int(path_item.item_id[len(ITEM_PREFIX):].split('_')[0])
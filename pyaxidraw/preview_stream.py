@@ -0,0 +1,289 @@
+# coding=utf-8
+#
+# Copyright 2023 Windell H. Oskay, Evil Mad Scientist Laboratories
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+
+"""
+pyaxidraw/preview_stream.py
+
+Streaming preview rendering, with bounded memory.
+
+The standard preview keeps the path data of every simulated move, and builds the
+preview layers in the SVG document when the plot is over. Here, moves are
+written out to a separate preview file while the plot is simulated, a fixed
+number of vertices at a time:
+
+* rendering = 4: SVG file with all movement; pen-up and pen-down layers.
+* rendering = 5: PNG image with all movement, where pen-down movement is
+    colored by speed, from blue (slow) through green to red (at the pen-down
+    speed setting). Requires NumPy.
+
+The preview file is given by the preview_file attribute of AxiDraw. If it is not
+set, or for rendering = 5 without NumPy, these options render all movement into
+the document, like rendering = 3.
+"""
+
+import math
+import shutil
+import struct
+import tempfile
+import zlib
+from array import array
+
+from axidrawinternal import preview
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+STREAM_SVG = 4
+STREAM_PNG = 5
+
+
+class SvgPreviewWriter:
+    '''
+    Write pen-up and pen-down path data to an SVG file as it is generated.
+    Pen-up data is written to the file directly, and pen-down data to a temporary
+    file, which is appended when the file is closed, so that pen-down movement
+    is drawn on top. At most chunk_size vertices of each are kept in memory.
+    '''
+
+    def __init__(self, file_name, width, height, colors, chunk_size=5000):
+        self.colors = colors # (pen-up color, pen-down color)
+        self.chunk_size = chunk_size
+        self.width_string = _stroke_width(min(width, height) / 1000.0)
+        self._file = open(file_name, 'w', encoding='utf-8')
+        self._pd_file = tempfile.TemporaryFile('w+', encoding='utf-8')
+        self._buffers = ([], []) # Path data: pen-up, pen-down
+        self._file.write('<?xml version="1.0" encoding="UTF-8" standalone="no"?>\n'\
+            '<svg xmlns="http://www.w3.org/2000/svg"'\
+            ' xmlns:inkscape="http://www.inkscape.org/namespaces/inkscape"'\
+            f' width="{width:.4f}in" height="{height:.4f}in"'\
+            f' viewBox="0 0 {width:.4f} {height:.4f}">\n'\
+            '<g inkscape:groupmode="layer" inkscape:label="Pen-up movement">\n')
+
+    def move(self, pen_up, x_old, y_old, x_new, y_new, new_subpath, _speed):
+        ''' Add one move, in inches. Begin a new subpath if new_subpath is True. '''
+        buffer = self._buffers[0 if pen_up else 1]
+        if new_subpath:
+            buffer.append(f'M{x_old:0.3f} {y_old:0.3f}')
+        buffer.append(f' {x_new:0.3f} {y_new:0.3f}')
+        if len(buffer) >= self.chunk_size:
+            self._flush(pen_up, f'M{x_new:0.3f} {y_new:0.3f}')
+
+    def _flush(self, pen_up, restart=None):
+        ''' Write out buffered path data; optionally restart it at a given point '''
+        buffer = self._buffers[0 if pen_up else 1]
+        if len(buffer) > 1 or (buffer and restart is None):
+            out_file = self._file if pen_up else self._pd_file
+            out_file.write(f'<path style="fill:none;stroke:{self.colors[0 if pen_up else 1]};'\
+                f'stroke-width:{self.width_string};stroke-linejoin:round;stroke-linecap:round"'\
+                f' d="{"".join(buffer)}"/>\n')
+        buffer.clear()
+        if restart is not None:
+            buffer.append(restart)
+
+    def close(self):
+        ''' Write out remaining data and close the file '''
+        self._flush(True)
+        self._flush(False)
+        self._file.write('</g>\n<g inkscape:groupmode="layer"'\
+            ' inkscape:label="Pen-down movement">\n')
+        self._pd_file.seek(0)
+        shutil.copyfileobj(self._pd_file, self._file)
+        self._pd_file.close()
+        self._file.write('</g>\n</svg>\n')
+        self._file.close()
+
+
+class PngPreviewWriter:
+    '''
+    Draw moves into a fixed-size RGB raster, and save it as a PNG file when closed.
+    Moves are buffered, and drawn chunk_size moves at a time, in vectorized form.
+    '''
+
+    PEN_UP_COLOR = (210, 210, 210)
+    SPEED_COLORS = ((0, 0, 255), (0, 180, 0), (230, 0, 0)) # Slow to fast
+
+    def __init__(self, file_name, width, height, dpi=100, max_pixels=4000, chunk_size=5000):
+        self.file_name = file_name
+        self.chunk_size = chunk_size
+        self.scale = min(dpi, max_pixels / max(width, height, 1e-9)) # Pixels per inch
+        self.shape = (max(int(math.ceil(height * self.scale)), 1),\
+            max(int(math.ceil(width * self.scale)), 1))
+        self.image = np.full(self.shape + (3,), 255, dtype=np.uint8)
+        self.drawn = np.zeros(self.shape, dtype=bool) # Pixels with pen-down movement
+        self._moves = array('d') # x_old, y_old, x_new, y_new, pen_up, speed
+
+    def move(self, pen_up, x_old, y_old, x_new, y_new, _new_subpath, speed):
+        ''' Add one move, in inches, with speed as a fraction of the pen-down speed '''
+        self._moves.extend((x_old, y_old, x_new, y_new, 1.0 if pen_up else 0.0, speed))
+        if len(self._moves) >= 6 * self.chunk_size:
+            self._draw()
+
+    def _draw(self):
+        ''' Draw buffered moves: sample each move at one point per pixel of length '''
+        if not self._moves:
+            return
+        moves = np.frombuffer(self._moves, dtype=float).reshape(-1, 6).copy()
+        self._moves = array('d')
+        start = moves[:, 0:2] * self.scale
+        delta = moves[:, 2:4] * self.scale - start
+        counts = np.ceil(np.hypot(delta[:, 0], delta[:, 1])).astype(int) + 1
+        index = np.repeat(np.arange(len(moves)), counts)
+        offsets = np.cumsum(counts) - counts
+        fraction = (np.arange(len(index)) - offsets[index]) / np.maximum(counts - 1, 1)[index]
+        cols = np.clip(np.rint(start[index, 0] + fraction * delta[index, 0]).astype(int),\
+            0, self.shape[1] - 1)
+        rows = np.clip(np.rint(start[index, 1] + fraction * delta[index, 1]).astype(int),\
+            0, self.shape[0] - 1)
+
+        pen_up = moves[index, 4] > 0
+        up_pixels = pen_up & ~self.drawn[rows, cols]
+        self.image[rows[up_pixels], cols[up_pixels]] = self.PEN_UP_COLOR
+        down = ~pen_up
+        speed = np.clip(moves[index[down], 5], 0, 1)
+        stops = np.linspace(0, 1, len(self.SPEED_COLORS))
+        colors = np.column_stack([np.interp(speed, stops, channel)\
+            for channel in zip(*self.SPEED_COLORS)])
+        self.image[rows[down], cols[down]] = np.rint(colors).astype(np.uint8)
+        self.drawn[rows[down], cols[down]] = True
+
+    def close(self):
+        ''' Draw remaining moves and write the PNG file '''
+        self._draw()
+        write_png(self.file_name, self.image)
+
+
+def write_png(file_name, image):
+    ''' Write an RGB uint8 image array as a PNG file, without imaging libraries '''
+    height, width = image.shape[:2]
+    rows = np.zeros((height, 3 * width + 1), dtype=np.uint8) # Filter type 0 on each row
+    rows[:, 1:] = image.reshape(height, -1)
+
+    def chunk(tag, data):
+        return struct.pack('>I', len(data)) + tag + data +\
+            struct.pack('>I', zlib.crc32(tag + data))
+
+    with open(file_name, 'wb') as png_file:
+        png_file.write(b'\x89PNG\r\n\x1a\n')
+        png_file.write(chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)))
+        png_file.write(chunk(b'IDAT', zlib.compress(rows.tobytes(), 6)))
+        png_file.write(chunk(b'IEND', b''))
+
+
+def _stroke_width(width):
+    ''' Format a stroke width without scientific notation, as Preview.render() does '''
+    log_ten = math.log10(width)
+    if log_ten > 0:
+        return f'{width:.3f}'
+    return f'{width:.{int(math.ceil(-log_ten) + 3)}f}'
+
+
+class StreamingPreview(preview.Preview):
+    '''
+    Preview that streams moves to ad_ref.preview_file for rendering = 4 or 5, and
+    otherwise renders into the document, as Preview does.
+    '''
+
+    def __init__(self):
+        super().__init__()
+        self.writer = None
+
+    def reset(self):
+        ''' Clear all data; reset for a new plot. A new preview file is started. '''
+        super().reset()
+        self.close()
+
+    def close(self):
+        ''' Finish writing the preview file, if one is open '''
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+    @staticmethod
+    def streaming(ad_ref):
+        ''' True if moves are to be written to the preview file '''
+        if ad_ref.options.rendering == STREAM_PNG and np is None:
+            return False
+        return ad_ref.options.rendering in (STREAM_SVG, STREAM_PNG) and\
+            getattr(ad_ref, "preview_file", None) is not None
+
+    def _open(self, ad_ref):
+        ''' Start the preview file '''
+        if ad_ref.options.rendering == STREAM_SVG:
+            self.writer = SvgPreviewWriter(ad_ref.preview_file, ad_ref.svg_width,\
+                ad_ref.svg_height, (ad_ref.params.preview_color_up,\
+                ad_ref.params.preview_color_down))
+        else:
+            self.writer = PngPreviewWriter(ad_ref.preview_file, ad_ref.svg_width,\
+                ad_ref.svg_height)
+
+    def _standard(self, ad_ref, function, *args):
+        ''' Call a Preview function; rendering 4 or 5 without a preview file acts as 3 '''
+        rendering = ad_ref.options.rendering
+        if rendering in (STREAM_SVG, STREAM_PNG):
+            ad_ref.options.rendering = 3
+        try:
+            function(ad_ref, *args)
+        finally:
+            ad_ref.options.rendering = rendering
+
+    def log_sm_move(self, ad_ref, move):
+        ''' Log data from single "SM" move, writing it to the preview file if streaming '''
+        if not self.streaming(ad_ref):
+            self._standard(ad_ref, super().log_sm_move, move)
+            return
+        if self.writer is None:
+            self._open(ad_ref)
+
+        move_time = move[1][2]
+        x_old = ad_ref.pen.phys.xpos
+        y_old = ad_ref.pen.phys.ypos
+        x_new = move[2][0]
+        y_new = move[2][1]
+        speed = 0 # Fraction of pen-down speed
+        if move_time > 0 and ad_ref.speed_pendown > 0:
+            speed = math.hypot(x_new - x_old, y_new - y_old) * 1000.0 /\
+                (move_time * ad_ref.speed_pendown)
+        if ad_ref.rotate_page: # Same page orientation as Preview.log_sm_move()
+            if ad_ref.params.auto_rotate_ccw:
+                x_old, y_old = ad_ref.svg_width - y_old, x_old
+                x_new, y_new = ad_ref.svg_width - y_new, x_new
+            else:
+                x_old, y_old = y_old, ad_ref.svg_height - x_old
+                x_new, y_new = y_new, ad_ref.svg_height - x_new
+
+        pen_state = 1 if ad_ref.pen.phys.z_up else 0
+        new_subpath = ad_ref.pen.status.preview_pen_state != pen_state
+        ad_ref.pen.status.preview_pen_state = pen_state
+        self.writer.move(bool(pen_state), x_old, y_old, x_new, y_new, new_subpath, speed)
+
+    def render(self, ad_ref):
+        ''' Finish the preview file if streaming; otherwise render preview layers '''
+        if not (ad_ref.options.preview and self.streaming(ad_ref)):
+            self._standard(ad_ref, super().render)
+            return
+        rendering = ad_ref.options.rendering
+        ad_ref.options.rendering = 0 # Only remove old preview layers from the document
+        try:
+            super().render(ad_ref)
+        finally:
+            ad_ref.options.rendering = rendering
+        if self.writer is None:
+            self._open(ad_ref) # Nothing was plotted; write an empty preview
+        self.close()
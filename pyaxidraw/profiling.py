@@ -0,0 +1,212 @@
+# coding=utf-8
+#
+# Copyright 2023 Windell H. Oskay, Evil Mad Scientist Laboratories
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+
+"""
+pyaxidraw/profiling.py
+
+Per-phase profiling of plot_setup() and plot_run().
+
+While profiling, the methods of the AxiDraw instance that make up each phase
+of the pipeline are wrapped, and AxiDraw measures the remaining phases
+explicitly. For each phase the profiler records the number of calls, the time
+taken, and (optionally) the peak memory traced by tracemalloc. Phases:
+
+    parse           Parse the SVG input (plot_setup)
+    digest          Convert the SVG into a document digest
+    hidden_lines    Hidden-line removal, if hiding is enabled
+    clip            Clip the digest at the plot bounds
+    optimize        Join nearby path ends and supersample
+    reorder         Randomize start points and reorder paths (randomize_optimize)
+    simplify        Simplify paths (pyaxidraw.simplify)
+    planning        Motion planning, including the closed-form estimate
+    dripfeed        Send (or simulate) motion commands and pen lifts
+    render          Render the preview
+    output          Serialize the output SVG
+
+Only the instance being profiled is instrumented, so other AxiDraw instances,
+e.g., other units of a fleet plotting in other threads, are not measured.
+(Memory tracing is process-wide, though, so peak memory includes theirs.)
+When phases are nested, time spent in the inner phase counts toward the inner
+phase only. Time outside all phases is reported as "other". Optionally, each
+phase is also profiled with cProfile, and the statistics are saved to one file
+per phase (<phase>.prof) in a given directory.
+"""
+
+import contextlib
+import cProfile
+import os
+import time
+import tracemalloc
+
+PHASES = ("parse", "digest", "hidden_lines", "clip", "optimize", "reorder", "simplify",\
+    "planning", "dripfeed", "render", "output")
+
+
+def _reset_peak():
+    ''' Reset the traced peak to the current size; restart tracing on Python 3.8 '''
+    if hasattr(tracemalloc, "reset_peak"):
+        tracemalloc.reset_peak()
+    else: # Python < 3.9; restarting clears the traces, too
+        tracemalloc.stop()
+        tracemalloc.start()
+
+
+class Profiler:
+    '''
+    Per-phase timing and peak memory of the plotting pipeline.
+    memory: Trace peak memory use with tracemalloc. Tracing slows down the
+        program; set to False for more representative times.
+    dump_dir: If given, save cProfile statistics for each phase in this directory.
+    '''
+
+    def __init__(self, memory=True, dump_dir=None):
+        self.memory = memory
+        self.dump_dir = dump_dir
+        self.instrumented = None # AxiDraw instance being profiled, within instrument()
+        self.reset()
+
+    def reset(self):
+        ''' Clear all measurements '''
+        self.phases = {}        # name: [calls, seconds, peak memory (bytes)]
+        self.total = 0.0
+        self.peak_memory = 0
+        self._active = None     # Name of the phase being measured
+        self._start = 0.0       # Time at which the active phase started, or resumed
+        self._profiles = {}     # name: cProfile.Profile
+        self._started_tracing = False
+
+    def _begin_session(self):
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+    def _end_session(self):
+        if self.memory and tracemalloc.is_tracing():
+            self.peak_memory = max(self.peak_memory, tracemalloc.get_traced_memory()[1])
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    @contextlib.contextmanager
+    def session(self):
+        ''' Context for one profiled call, such as plot_setup or plot_run '''
+        self._begin_session()
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.total += time.perf_counter() - start
+            self._end_session()
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        ''' Context to measure one phase. A nested phase pauses the phase around it. '''
+        outer = self._active
+        if outer is not None:
+            self._stop_phase()
+        self._start_phase(name, True)
+        try:
+            yield
+        finally:
+            self._stop_phase()
+            if outer is not None:
+                self._start_phase(outer, False)
+
+    def _start_phase(self, name, call):
+        self._active = name
+        stats = self.phases.setdefault(name, [0, 0.0, 0])
+        if call:
+            stats[0] += 1
+        if self.memory and tracemalloc.is_tracing(): # Peak outside of this phase, so far
+            self.peak_memory = max(self.peak_memory, tracemalloc.get_traced_memory()[1])
+            _reset_peak()
+        if self.dump_dir is not None:
+            self._profiles.setdefault(name, cProfile.Profile()).enable()
+        self._start = time.perf_counter()
+
+    def _stop_phase(self):
+        name = self._active
+        stats = self.phases[name]
+        stats[1] += time.perf_counter() - self._start
+        if self.dump_dir is not None:
+            self._profiles[name].disable()
+        if self.memory and tracemalloc.is_tracing():
+            peak = tracemalloc.get_traced_memory()[1]
+            stats[2] = max(stats[2], peak)
+            self.peak_memory = max(self.peak_memory, peak)
+            _reset_peak()
+        self._active = None
+
+    def wrap(self, name, function):
+        ''' Return function, measured as part of the named phase '''
+        def measured(*args, **kwargs):
+            with self.phase(name):
+                return function(*args, **kwargs)
+        return measured
+
+    @contextlib.contextmanager
+    def instrument(self, ad_ref):
+        '''
+        Context in which the phases of ad_ref's pipeline are measured. Methods
+        of ad_ref (and of its preview) are wrapped on the instance only; ad_ref
+        measures its other phases while instrumented is ad_ref.
+        '''
+        targets = [(ad_ref, "randomize_optimize", "reorder"),\
+            (ad_ref, "_feed", "dripfeed"),\
+            (ad_ref.preview, "render", "render"),\
+            (ad_ref, "get_output", "output")]
+        for owner, attribute, name in targets:
+            setattr(owner, attribute, self.wrap(name, getattr(owner, attribute)))
+        self.instrumented = ad_ref
+        try:
+            with self.session():
+                yield self
+        finally:
+            self.instrumented = None
+            for owner, attribute, _name in targets:
+                delattr(owner, attribute) # Back to the method of the class
+
+    def report(self):
+        '''
+        Machine-readable summary: total time (s), and for each phase, the number
+        of calls, time (s), and fraction of the total time. With memory tracing,
+        also the peak memory (bytes) traced during each phase, and overall.
+        Saves cProfile statistics, if enabled.
+        '''
+        phases = {}
+        for name in PHASES + tuple(sorted(set(self.phases) - set(PHASES))):
+            if name not in self.phases:
+                continue
+            calls, seconds, peak = self.phases[name]
+            phases[name] = {"calls": calls, "time_s": round(seconds, 6),\
+                "fraction": round(seconds / self.total, 4) if self.total > 0 else 0.0}
+            if self.memory:
+                phases[name]["peak_memory"] = peak
+        other = max(self.total - sum(stats[1] for stats in self.phases.values()), 0.0)
+        summary = {"total_s": round(self.total, 6), "other_s": round(other, 6), "phases": phases}
+        if self.memory:
+            summary["peak_memory"] = self.peak_memory
+        if self.dump_dir is not None:
+            os.makedirs(self.dump_dir, exist_ok=True)
+            summary["profile_files"] = {}
+            for name, profile in self._profiles.items():
+                file_name = os.path.join(self.dump_dir, name + ".prof")
+                profile.dump_stats(file_name)
+                summary["profile_files"][name] = file_name
+        return summary
+
@@ -0,0 +1,156 @@
+# coding=utf-8
+#
+# Copyright 2023 Windell H. Oskay, Evil Mad Scientist Laboratories
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+
+"""
+pyaxidraw/replay.py
+
+Plan once, replay for each copy.
+
+When plotting multiple copies (or continuously), each copy of a document is
+planned exactly like the first one: same paths, same settings, and the same
+starting position. The motion plans made for the first copy are kept in
+compact form, as flat arrays of numbers rather than lists of lists, and the
+following copies replay them instead of planning again.
+
+A recording is only replayed when it is complete (the copy was not stopped),
+and when the digest, options, and starting position are the same as when it
+was recorded. Otherwise, the copy is planned and recorded again.
+"""
+
+from array import array
+
+SM, LOWER, RAISE = 0, 1, 2
+KIND_NAMES = {'SM': SM, 'lower': LOWER, 'raise': RAISE}
+
+
+class MoveStream:
+    '''
+    Append-only store of motion plans, each a move list as fed to
+    dripfeed.feed(), i.e., a list of moves ['SM', (steps2, steps1, time),
+    [x, y, pen_up, distance]], ['lower', None], and ['raise', None].
+    '''
+
+    def __init__(self):
+        self._kinds = array('b')    # Kind of each move
+        self._steps = array('l')    # steps2, steps1, time (ms) for each SM move
+        self._seg = array('d')      # Final x, y, and distance (inch) for each SM move
+        self._pen_up = array('b')   # Final pen-up state for each SM move
+        self._starts = array('q', [0]) # Index of first move of each move list, and the end
+        self._sm_starts = array('q', [0]) # Index of first SM move of each move list
+
+    def __len__(self):
+        return len(self._starts) - 1
+
+    def append(self, move_list):
+        ''' Add one move list (may be None) '''
+        for move in move_list or ():
+            kind = KIND_NAMES.get(move[0])
+            if kind is None:
+                continue
+            self._kinds.append(kind)
+            if kind == SM:
+                self._steps.extend(move[1][:3])
+                seg_data = move[2]
+                self._seg.extend((seg_data[0], seg_data[1], seg_data[3]))
+                self._pen_up.append(1 if seg_data[2] else 0)
+        self._starts.append(len(self._kinds))
+        self._sm_starts.append(len(self._pen_up))
+
+    def moves(self, index):
+        ''' Move list number index, rebuilt in the format of dripfeed.feed() '''
+        move_list = []
+        sm_index = self._sm_starts[index]
+        steps = self._steps
+        seg = self._seg
+        for kind in self._kinds[self._starts[index]:self._starts[index + 1]]:
+            if kind == LOWER:
+                move_list.append(['lower', None])
+            elif kind == RAISE:
+                move_list.append(['raise', None])
+            else:
+                i_3 = 3 * sm_index
+                move_list.append(['SM', (steps[i_3], steps[i_3 + 1], steps[i_3 + 2]),\
+                    [seg[i_3], seg[i_3 + 1], bool(self._pen_up[sm_index]), seg[i_3 + 2]]])
+                sm_index += 1
+        return move_list
+
+    def nbytes(self):
+        ''' Memory used by the stored moves (bytes) '''
+        return sum(data.itemsize * len(data) for data in (self._kinds, self._steps,\
+            self._seg, self._pen_up, self._starts, self._sm_starts))
+
+
+class PlanCache:
+    '''
+    Record the motion plans of one copy, in the order that they are made, and
+    replay them for the next copies.
+    '''
+
+    def __init__(self):
+        self.key = None
+        self.stream = None
+        self.complete = False   # True when stream holds every plan of one full copy
+        self.replaying = False
+        self.replayed = 0       # Number of copies replayed
+        self._cursor = 0
+
+    def begin(self, key):
+        ''' Start a copy. Replay if a complete recording matches key; otherwise record. '''
+        self._cursor = 0
+        if self.complete and key == self.key:
+            self.replaying = True
+            return
+        self.key = key
+        self.stream = MoveStream()
+        self.complete = False
+        self.replaying = False
+
+    def next(self):
+        '''
+        Next recorded move list, when replaying. If the recording has run
+        out, the copy differs from the recorded one: stop replaying and
+        return False, so that the caller plans the move instead.
+        '''
+        if self._cursor >= len(self.stream):
+            self.invalidate()
+            return False
+        self._cursor += 1
+        return self.stream.moves(self._cursor - 1)
+
+    def record(self, move_list):
+        ''' Record a move list, when recording '''
+        if self.stream is not None and not self.replaying:
+            self.stream.append(move_list)
+
+    def end(self, completed):
+        ''' Finish a copy. Keep the recording only if the copy ran to the end. '''
+        if self.replaying:
+            self.replaying = False
+            if completed and self._cursor == len(self.stream):
+                self.replayed += 1
+            elif completed: # Fewer plans than recorded; do not trust the recording
+                self.invalidate()
+            return
+        self.complete = bool(completed and self.stream is not None)
+
+    def invalidate(self):
+        ''' Discard the recording '''
+        self.key = None
+        self.stream = None
+        self.complete = False
+        self.replaying = False
@@ -0,0 +1,167 @@
+# coding=utf-8
+#
+# Copyright 2023 Windell H. Oskay, Evil Mad Scientist Laboratories
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+
+"""
+pyaxidraw/simplify.py
+
+Polyline simplification (Ramer-Douglas-Peucker) for plotting.
+
+Vertices that lie within a given distance of the simplified path are removed
+before motion planning. With a tolerance of one motor step, the removed
+vertices cannot change the motion that the AxiDraw is able to reproduce, but
+each one would otherwise cost trajectory planning and serial commands.
+
+Distances are measured to the segment, not to its infinite line, so that paths
+which double back on themselves keep their turning points. Endpoints, and thus
+closed paths, are always preserved.
+
+Uses NumPy when available; falls back to pure Python otherwise.
+"""
+
+import math
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def _segment_distances_py(points, first, last):
+    ''' Distances of points[first + 1:last] to the segment points[first]-points[last] '''
+    x_a, y_a = points[first][0], points[first][1]
+    d_x = points[last][0] - x_a
+    d_y = points[last][1] - y_a
+    len_sq = d_x * d_x + d_y * d_y
+    distances = []
+    for vertex in points[first + 1:last]:
+        p_x = vertex[0] - x_a
+        p_y = vertex[1] - y_a
+        if len_sq > 0:
+            t_param = min(max((p_x * d_x + p_y * d_y) / len_sq, 0.0), 1.0)
+            p_x -= t_param * d_x
+            p_y -= t_param * d_y
+        distances.append(math.hypot(p_x, p_y))
+    return distances
+
+
+def _segment_distances_np(points, first, last):
+    ''' Vectorized version of _segment_distances_py; points is an (n, 2) array '''
+    start = points[first]
+    delta = points[last] - start
+    rel = points[first + 1:last] - start
+    len_sq = delta @ delta
+    if len_sq > 0:
+        t_param = np.clip(rel @ delta / len_sq, 0.0, 1.0)
+        rel = rel - t_param[:, None] * delta
+    return np.hypot(rel[:, 0], rel[:, 1])
+
+
+def simplify_polyline(vertex_list, tolerance):
+    '''
+    Ramer-Douglas-Peucker simplification of a single polyline.
+    Returns a list of the vertices to keep (the same vertex objects as given),
+    such that no removed vertex is further than tolerance from the result.
+    '''
+    count = len(vertex_list)
+    if count < 3 or tolerance <= 0:
+        return vertex_list
+
+    if np is not None:
+        points = np.asarray(vertex_list, dtype=float)[:, :2]
+        distance_fun = _segment_distances_np
+    else:
+        points = vertex_list
+        distance_fun = _segment_distances_py
+
+    keep = [False] * count
+    keep[0] = keep[-1] = True
+    stack = [(0, count - 1)]
+    while stack: # Explicit stack; long paths would exceed the recursion limit
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        distances = distance_fun(points, first, last)
+        if np is not None:
+            index = int(np.argmax(distances))
+        else:
+            index = max(range(len(distances)), key=distances.__getitem__)
+        if distances[index] > tolerance:
+            index += first + 1
+            keep[index] = True
+            stack.append((first, index))
+            stack.append((index, last))
+    return [vertex for vertex, kept in zip(vertex_list, keep) if kept]
+
+
+def simplify_digest(digest, tolerance):
+    '''
+    Simplify each path in a flattened DocDigest, in place.
+    Returns vertex counts before and after simplification.
+    '''
+    before = 0
+    after = 0
+    for layer_item in digest.layers:
+        for path in layer_item.paths:
+            for index, subpath in enumerate(path.subpaths):
+                before += len(subpath)
+                path.subpaths[index] = simplify_polyline(subpath, tolerance)
+                after += len(path.subpaths[index])
+    return before, after
+
+
+class SimplifyStats:
+    ''' Vertex counts and motion planning time, for reporting the effect of simplification '''
+
+    def __init__(self):
+        self.vertices_in = 0        # Vertices before simplification
+        self.vertices_out = 0       # Vertices after simplification
+        self.planned_vertices = 0   # Vertices passed to motion planning
+        self.planning_time = 0.0    # Time spent in motion planning, s
+
+    def reset(self):
+        ''' Reset all counts '''
+        self.__init__()
+
+    def add_counts(self, before, after):
+        ''' Record vertex counts from one simplification pass '''
+        self.vertices_in += before
+        self.vertices_out += after
+
+    @property
+    def vertices_removed(self):
+        ''' Number of vertices removed by simplification '''
+        return self.vertices_in - self.vertices_out
+
+    @property
+    def time_saved(self):
+        '''
+        Estimated planning time saved, s: vertices removed, times the measured
+        planning time per vertex that was planned.
+        '''
+        if self.planned_vertices == 0:
+            return 0.0
+        return self.vertices_removed * self.planning_time / self.planned_vertices
+
+    def report(self, message_fun):
+        ''' Format and print simplification statistics '''
+        if self.vertices_in == 0:
+            return
+        percent = 100.0 * self.vertices_removed / self.vertices_in
+        message_fun(f"Path simplification removed {self.vertices_removed} of " +
+            f"{self.vertices_in} vertices ({percent:1.1f}%)")
+        message_fun(f"Estimated planning time saved: {self.time_saved:1.3f} s")
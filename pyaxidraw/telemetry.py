@@ -0,0 +1,250 @@
+# coding=utf-8
+#
+# Copyright 2023 Windell H. Oskay, Evil Mad Scientist Laboratories
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+
+"""
+pyaxidraw/telemetry.py
+
+Opt-in runtime telemetry for plots and interactive sessions.
+
+Events are dictionaries, passed to a callback function and/or appended to a file
+of JSON lines. Each plot (plot_run) or batch (draw_path, draw_paths) gives:
+
+* "start": Number of paths and planned time (s), from the closed-form estimate
+    when NumPy is available.
+* "path", after each path:
+    - planning_ms: Motion planning time for the path
+    - sm_moves: Number of "SM" motion commands, including the pen-up move to it
+    - write_ms: Time spent sending those commands over USB, not counting the
+        time spent waiting for long moves to finish
+    - stalls, stall_ms: Commands sent after the previous move should have
+        finished, and the estimated time that the motors were idle as a result
+    - pen_lifts, distance_pendown, distance_total: Running totals (inches)
+    - planned_s, elapsed_s: Planned and measured time so far. In preview mode,
+        measured time is the simulated time.
+    - eta_s: Time remaining, when the planned time is known: the remaining
+        planned time, scaled by the ratio of measured to planned time so far.
+* "end": Totals, and the stopped code (0 if finished).
+
+"SM" commands are measured by swapping feed_sm() in for dripfeed.feed_sm while
+any Telemetry session is active (from begin() to end() or close()); the
+original is restored when the last active session finishes.
+"""
+
+import threading
+import time
+
+from axidrawinternal import dripfeed
+
+from pyaxidraw import estimate
+from pyaxidraw import journal
+
+
+def planned_time(ad_ref, digest):
+    ''' Closed-form estimate (s) to plot a digest at present settings, or None '''
+    if estimate.np is None or not digest or ad_ref.pen.phys.xpos is None:
+        return None
+    plan = estimate.PlotEstimate()
+    position = (ad_ref.pen.phys.xpos, ad_ref.pen.phys.ypos)
+    for layer in digest.layers:
+        if ad_ref.options.mode == "layers" and layer.props.number != ad_ref.options.layer:
+            continue
+        position = plan.add_paths(ad_ref,\
+            [path_item.subpaths[0] for path_item in layer.paths], position)
+    return plan.time_ms / 1000.0
+
+
+class Telemetry:
+    ''' Measure each plotted path, and send events to a callback and/or file '''
+
+    def __init__(self, callback=None, file_name=None):
+        self.callback = callback
+        self.file = None
+        if file_name is not None:
+            self.file = journal.Journal(file_name, sync_count=100, sync_interval=5.0)
+            self.file.open(append=True)
+        self.context = None
+        self.planned_total = None
+        self._digest = None     # Digest of the plot or batch, until the start event
+        self._installed = False # True while feed_sm is installed for this session
+        self._reset()
+
+    def _reset(self):
+        self.paths = 0
+        self.planned = 0.0      # Planned time so far (s)
+        self.start_time = time.perf_counter()
+        self.start_estimate = 0.0
+        self._path = None       # Measurements for the path in progress
+        self._motion_end = None # Time at which the motors finish queued moves
+        self._pen_up = None     # Pen state at the last "SM" command
+
+    def begin(self, ad_ref, digest, context):
+        ''' Start measuring a plot or batch. The start event is sent with the first path. '''
+        self._reset()
+        self.context = context
+        if not self._installed:
+            _install()
+            self._installed = True
+        self.start_estimate = ad_ref.plot_status.stats.pt_estimate
+        self._digest = digest
+
+    def _start(self, ad_ref):
+        ''' Send the start event, once pen timing is set up for plotting '''
+        digest = self._digest
+        self._digest = None
+        self.planned_total = planned_time(ad_ref, digest)
+        self.emit(ad_ref, "start", context=self.context, preview=bool(ad_ref.options.preview),\
+            paths=sum(len(layer.paths) for layer in digest.layers) if digest else 0,\
+            planned_total_s=None if self.planned_total is None else\
+                round(self.planned_total, 3))
+
+    def end(self, ad_ref):
+        ''' Finish measuring a plot or batch '''
+        if self._digest is not None:
+            self._start(ad_ref)
+        self.emit(ad_ref, "end", paths=self.paths, code=ad_ref.plot_status.stopped,\
+            **self._totals(ad_ref))
+        self.context = None
+        self._uninstall()
+
+    def close(self):
+        ''' Stop measuring, and close the telemetry file, if any '''
+        self.context = None
+        self._uninstall()
+        if self.file is not None:
+            self.file.close()
+
+    def _uninstall(self):
+        if self._installed:
+            self._installed = False
+            _uninstall()
+
+    def start_path(self, ad_ref):
+        ''' Begin measuring one path '''
+        if self._digest is not None:
+            self._start(ad_ref)
+        self._path = {"sm_moves": 0, "write": 0.0, "stalls": 0, "stall": 0.0,\
+            "move_ms": 0, "lifts": ad_ref.pen.status.lifts}
+        self._motion_end = None
+
+    def end_path(self, ad_ref, planning_time):
+        ''' Report one path '''
+        path = self._path
+        if path is None:
+            return
+        self._path = None
+        self.paths += 1
+        times = ad_ref.pen.heights.times
+        lifts = ad_ref.pen.status.lifts - path["lifts"]
+        self.planned += (path["move_ms"] + lifts * (times.raise_time + times.lower_time)) / 1000
+        self.emit(ad_ref, "path", path=self.paths - 1,\
+            planning_ms=round(1000 * planning_time, 3), sm_moves=path["sm_moves"],\
+            write_ms=round(1000 * path["write"], 3), stalls=path["stalls"],\
+            stall_ms=round(1000 * path["stall"], 3), **self._totals(ad_ref))
+
+    def _totals(self, ad_ref):
+        ''' Running totals, and the ETA '''
+        if ad_ref.options.preview:
+            elapsed = (ad_ref.plot_status.stats.pt_estimate - self.start_estimate) / 1000
+        else:
+            elapsed = time.perf_counter() - self.start_time
+        eta = None
+        if self.planned_total is not None:
+            ratio = elapsed / self.planned if self.planned > 0 else 1.0
+            eta = round(max(self.planned_total - self.planned, 0) * ratio, 3)
+        stats = ad_ref.plot_status.stats # Totals of previous copies, plus the current one
+        down = stats.down_travel_tot + stats.down_travel_inch
+        return {"pen_lifts": ad_ref.pen.status.lifts, "distance_pendown": round(down, 4),\
+            "distance_total": round(down + stats.up_travel_tot + stats.up_travel_inch, 4),\
+            "planned_s": round(self.planned, 3), "elapsed_s": round(elapsed, 3), "eta_s": eta}
+
+    def emit(self, ad_ref, event, **data):
+        ''' Send one event '''
+        record = {"event": event, "time": round(time.time(), 3)}
+        record.update(data)
+        if self.file is not None:
+            self.file.write(record)
+        if self.callback is not None:
+            self.callback(record)
+
+    def measure_sm(self, ad_ref, move, drip_logger):
+        '''
+        Send one "SM" command with dripfeed.feed_sm(), measuring the time taken
+        to send it, and detecting when the motors ran out of queued moves.
+        '''
+        pen_up = ad_ref.pen.phys.z_up
+        if pen_up != self._pen_up: # The pen moved since the last command
+            self._motion_end = None
+        self._pen_up = pen_up
+        move_time = move[1][2]
+        start = time.perf_counter()
+        _unmeasured_feed_sm(ad_ref, move, drip_logger)
+        path = self._path
+        if path is None:
+            return
+        path["sm_moves"] += 1
+        path["move_ms"] += move_time
+        if ad_ref.options.preview:
+            return
+        write = time.perf_counter() - start
+        if move_time > 50 and ad_ref.options.mode != "manual":
+            write -= (move_time - 30) / 1000.0 # Waiting before the next command
+        write = max(write, 0.0)
+        path["write"] += write
+        sent = start + write
+        if self._motion_end is not None and start > self._motion_end:
+            path["stalls"] += 1
+            path["stall"] += start - self._motion_end
+        self._motion_end = max(sent, self._motion_end or sent) + move_time / 1000.0
+
+
+def feed_sm(ad_ref, move, drip_logger):
+    '''
+    Swapped in for dripfeed.feed_sm while telemetry is active, so that
+    dripfeed.feed() stays the one feed loop: send an "SM" command, measured if
+    ad_ref is reporting telemetry. Other AxiDraw instances, e.g., in other
+    threads, are not measured.
+    '''
+    recorder = getattr(ad_ref, "_telemetry", None)
+    if recorder is None or recorder.context is None:
+        _unmeasured_feed_sm(ad_ref, move, drip_logger)
+    else:
+        recorder.measure_sm(ad_ref, move, drip_logger)
+
+
+def _install():
+    ''' Install feed_sm as dripfeed.feed_sm, for one more active session '''
+    global _active_sessions # pylint: disable=global-statement
+    with _install_lock:
+        if _active_sessions == 0:
+            dripfeed.feed_sm = feed_sm
+        _active_sessions += 1
+
+
+def _uninstall():
+    ''' Restore the original dripfeed.feed_sm, when no session remains active '''
+    global _active_sessions # pylint: disable=global-statement
+    with _install_lock:
+        _active_sessions -= 1
+        if _active_sessions == 0:
+            dripfeed.feed_sm = _unmeasured_feed_sm
+
+
+_unmeasured_feed_sm = getattr(dripfeed.feed_sm, "unmeasured", dripfeed.feed_sm)
+feed_sm.unmeasured = _unmeasured_feed_sm # In case this module is reloaded while installed
+_install_lock = threading.Lock()
+_active_sessions = 0
@@ -0,0 +1,295 @@
+# coding=utf-8
+#
+# Copyright 2023 Windell H. Oskay, Evil Mad Scientist Laboratories
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+
+"""
+pyaxidraw/tiling.py
+
+Tile artwork larger than the travel of an AxiDraw over several sheets.
+
+The document is digested once, without clipping at the travel of the model,
+and then cut into a grid of tiles, each the size of the travel. Neighbouring
+tiles overlap by a given distance, so that the sheets can be trimmed and
+joined, or plotted on one large sheet that is moved between tiles.
+
+Each tile is a DocDigest of its own, in coordinates from its own corner:
+paths are clipped at the edges of the tile, and then joined and reordered
+within the tile, as the reordering option would for a whole document. An
+optional registration layer holds cross marks at the corners of the part of
+the tile that it "owns", halfway across each overlap, so that the same marks
+are drawn on both tiles at each seam.
+
+Each tile can be written as a plob, for the model, and so plotted directly
+without further processing, or be turned into a fleet.Job, so that the tiles
+can be plotted in parallel on several AxiDraw units.
+
+Example:
+
+    from pyaxidraw import tiling
+    tiles = tiling.tile_document("mural.svg", model=2, overlap=0.5)
+    tiling.save_tiles(tiles, "mural_tiles")
+"""
+
+import copy
+import math
+import os
+
+from lxml import etree
+
+from axidrawinternal import boundsclip, plot_optimizations
+from axidrawinternal.plot_utils_import import from_dependency_import # plotink
+path_objects = from_dependency_import('axidrawinternal.path_objects')
+
+from pyaxidraw import axidraw
+from pyaxidraw import fleet
+
+UNBOUNDED = 1e6 # Travel (inches) used to digest the whole document without clipping
+REGISTRATION_LAYER = "registration" # Name of the layer of registration marks
+MARK_SIZE = 0.25 # Default length (inches) of each arm of a registration cross
+
+
+class _DocumentDigest(axidraw.AxiDraw):
+    ''' AxiDraw that digests a document without clipping it at the travel of the model '''
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.travel = None      # Travel (inches) of the model: [x, y]
+        self.plob_data = {}     # Plot data of a plob of the document, for the model
+
+    def update_options(self):
+        super().update_options()
+        self.travel = list(self.bounds[1])
+        self.bounds = [[-1e-9, -1e-9], [UNBOUNDED, UNBOUNDED]]
+
+    def digest_document(self, svg_input, model, options):
+        '''
+        Digest an SVG document (file name or string) for an AxiDraw model,
+        clipped at the page but not at the travel, and without joining or
+        reordering paths. Sets digest, travel, and plob_data.
+        '''
+        self.plot_setup(svg_input)
+        for name, value in (options or {}).items():
+            setattr(self.options, name, value)
+        reordering = self.options.reordering
+        self.options.model = model
+        self.options.digest = 2
+        self.options.reordering = 4 # Join and reorder paths within each tile instead
+        self.options.auto_rotate = False # Tile the document as drawn
+        try:
+            plob = self.plot_run(True)
+        finally:
+            self.options.reordering = reordering
+        if plob:
+            nodes = etree.fromstring(plob.encode('utf-8')).xpath("//*[local-name()='plotdata']")
+            if nodes:
+                self.plob_data = dict(nodes[0].attrib)
+        self.plob_data['model'] = model
+        self.digest.plotdata = dict(self.plob_data)
+        self.digest.flatten()
+
+
+class Tile: # pylint: disable=too-few-public-methods
+    '''
+    One tile of a document: its row and column in the grid, the position of its
+    corner in the document, its size (inches), and its digest.
+    '''
+
+    def __init__(self, row, col, origin, size, digest):
+        self.row = row
+        self.col = col
+        self.x, self.y = origin
+        self.width, self.height = size
+        self.digest = digest
+
+    def __repr__(self):
+        return f"Tile({self.row}, {self.col})"
+
+    @property
+    def name(self):
+        ''' Name of the tile, for file and job names: "r<row>c<col>", from 1 '''
+        return f"r{self.row + 1}c{self.col + 1}"
+
+    def to_plob(self):
+        ''' Plob of the tile, as an lxml etree '''
+        return copy.deepcopy(self.digest).to_plob()
+
+    def to_string(self):
+        ''' Plob of the tile, as a string '''
+        return etree.tostring(self.to_plob(), encoding='unicode')
+
+    def save(self, file_name):
+        ''' Write the plob of the tile to file_name '''
+        with open(file_name, 'w', encoding='utf-8') as plob_file:
+            plob_file.write(self.to_string())
+
+    def job(self, name=None, copies=1, options=None):
+        ''' A fleet.Job that plots the tile '''
+        return fleet.Job(self.to_string(), name=name or self.name, copies=copies,\
+            options=options)
+
+
+def grid(length, travel, overlap):
+    '''
+    Start positions of the tiles along one axis of a document of the given
+    length, with tiles of size travel overlapping by overlap.
+    '''
+    if length <= travel:
+        return [0.0]
+    step = travel - overlap
+    count = math.ceil((length - overlap) / step - 1e-9)
+    return [index * step for index in range(count)]
+
+
+def _bounding_box(vertex_list):
+    ''' (x_min, y_min, x_max, y_max) of a vertex list '''
+    x_values = [vertex[0] for vertex in vertex_list]
+    y_values = [vertex[1] for vertex in vertex_list]
+    return min(x_values), min(y_values), max(x_values), max(y_values)
+
+
+def _cross(x_center, y_center, size, width, height):
+    ''' Vertex lists of a cross with arms of length size, clipped at a tile of width, height '''
+    half = size / 2
+    arms = []
+    if 0 <= y_center <= height:
+        arms.append([[max(x_center - half, 0.0), y_center],\
+            [min(x_center + half, width), y_center]])
+    if 0 <= x_center <= width:
+        arms.append([[x_center, max(y_center - half, 0.0)],\
+            [x_center, min(y_center + half, height)]])
+    return [arm for arm in arms if arm[0] != arm[1]]
+
+
+def _registration_layer(corners, size, tile_size, item_id):
+    ''' LayerItem with a registration cross at each corner of a tile '''
+    layer = path_objects.LayerItem()
+    layer.name = REGISTRATION_LAYER
+    layer.item_id = item_id
+    layer.props.parse(REGISTRATION_LAYER)
+    for index, (x_corner, y_corner) in enumerate(corners):
+        for arm, vertex_list in enumerate(_cross(x_corner, y_corner, size, *tile_size)):
+            layer.paths.append(path_objects.PathItem.from_attrs(subpaths=[vertex_list],\
+                item_id=f"{item_id}_{index}_{arm}"))
+    return layer
+
+
+class _Tiler: # pylint: disable=too-few-public-methods
+    ''' Cut a flat document digest into tiles '''
+
+    def __init__(self, digest, travel, overlap):
+        self.digest = digest
+        self.travel = travel
+        self.overlap = overlap
+        self.x_starts = grid(digest.width, travel[0], overlap)
+        self.y_starts = grid(digest.height, travel[1], overlap)
+        self.boxes = [[_bounding_box(path.subpaths[0]) if path.subpaths and path.subpaths[0]\
+            else None for path in layer.paths] for layer in digest.layers]
+
+    def size(self, row, col):
+        ''' Width and height of a tile; tiles at the right and bottom may be smaller '''
+        return min(self.travel[0], self.digest.width - self.x_starts[col]),\
+            min(self.travel[1], self.digest.height - self.y_starts[row])
+
+    def core(self, row, col):
+        '''
+        Corners of the part of a tile not shared with its neighbours, in tile
+        coordinates: inset by half of the overlap at each edge with a neighbour.
+        '''
+        width, height = self.size(row, col)
+        inset = self.overlap / 2
+        left = inset if col > 0 else 0.0
+        top = inset if row > 0 else 0.0
+        right = width - inset if col < len(self.x_starts) - 1 else width
+        bottom = height - inset if row < len(self.y_starts) - 1 else height
+        return [[left, top], [right, top], [right, bottom], [left, bottom]]
+
+    def cut(self, row, col):
+        ''' DocDigest of one tile, clipped at its edges, in tile coordinates '''
+        x_start, y_start = self.x_starts[col], self.y_starts[row]
+        width, height = self.size(row, col)
+        tile = copy.copy(self.digest)
+        tile.width, tile.height = width, height
+        tile.viewbox = f"0 0 {width:f} {height:f}"
+        tile.plotdata = dict(self.digest.plotdata)
+        tile.metadata = dict(self.digest.metadata)
+        tile.layers = []
+        for layer, boxes in zip(self.digest.layers, self.boxes):
+            paths = []
+            for path, box in zip(layer.paths, boxes):
+                if box is None or box[0] > x_start + width or box[2] < x_start or\
+                        box[1] > y_start + height or box[3] < y_start:
+                    continue # Entirely outside of the tile
+                paths.append(path_objects.PathItem.from_attrs(subpaths=[[[v_x - x_start,\
+                    v_y - y_start] for v_x, v_y in path.subpaths[0]]], stroke=path.stroke,\
+                    fill=path.fill, fill_rule=path.fill_rule, item_id=path.item_id))
+            if paths:
+                tile_layer = copy.copy(layer)
+                tile_layer.paths = paths
+                tile.layers.append(tile_layer)
+        tile.flat = True
+        boundsclip.clip_at_bounds(tile, [[-1e-9, -1e-9], [width + 1e-9, height + 1e-9]],\
+            [width + 1e-9, height + 1e-9], 0, False)
+        tile.layers = [layer for layer in tile.layers if layer.paths]
+        return tile
+
+
+def optimize(digest, reordering, params):
+    ''' Join and reorder the paths of a tile digest, as prepare_document would '''
+    allow_reverse = reordering in [2, 3]
+    if reordering < 3:
+        plot_optimizations.connect_nearby_ends(digest, allow_reverse, params.min_gap)
+    if reordering in [1, 2, 3]:
+        plot_optimizations.reorder(digest, allow_reverse)
+
+
+def tile_document(svg_input, model=1, overlap=0.5, marks=True, mark_size=MARK_SIZE,\
+        options=None, params=None):
+    '''
+    Cut an SVG document (file name or string) into tiles the size of the
+    travel of an AxiDraw model, overlapping by overlap (inches), with
+    registration marks if marks is True. options is a dictionary of
+    AxiDraw options, as for plot_setup. Returns a list of Tile objects, by
+    row and then by column.
+    '''
+    ad_ref = _DocumentDigest(params=params, user_message_fun=lambda _message: None)
+    ad_ref.digest_document(svg_input, model, options)
+    if overlap < 0 or 2 * overlap >= min(ad_ref.travel):
+        raise ValueError("Tile overlap must be at least 0 and less than half of the travel")
+    tiler = _Tiler(ad_ref.digest, ad_ref.travel, overlap)
+    tiles = []
+    for row in range(len(tiler.y_starts)):
+        for col in range(len(tiler.x_starts)):
+            tile_digest = tiler.cut(row, col)
+            optimize(tile_digest, ad_ref.options.reordering, ad_ref.params)
+            tile = Tile(row, col, (tiler.x_starts[col], tiler.y_starts[row]),\
+                tiler.size(row, col), tile_digest)
+            if marks:
+                tile_digest.layers.append(_registration_layer(tiler.core(row, col),\
+                    mark_size, (tile.width, tile.height), f"registration_{tile.name}"))
+            tiles.append(tile)
+    return tiles
+
+
+def save_tiles(tiles, directory, base_name="tile"):
+    ''' Write each tile as a plob, <base_name>_<tile name>.svg, in directory. Returns file names. '''
+    os.makedirs(directory, exist_ok=True)
+    file_names = []
+    for tile in tiles:
+        file_name = os.path.join(directory, f"{base_name}_{tile.name}.svg")
+        tile.save(file_name)
+        file_names.append(file_name)
+    return file_names
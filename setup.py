@@ -30,6 +30,6 @@ if depdir.is_dir(): #installing on a non-privileged machine
         install_requires.append(f"{pkg_name} @ {wheel_path.as_uri()}")
 
 setuptools.setup(
-    packages=setuptools.find_packages(exclude=['contrib', 'docs', 'test']),
+    packages=setuptools.find_packages(exclude=['benchmarks', 'contrib', 'docs', 'test']),
     install_requires=install_requires,
 )
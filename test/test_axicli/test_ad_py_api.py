@@ -63,6 +63,48 @@ class AxiDrawPythonAPITestCase(unittest.TestCase):
         m_get_output.assert_called_once()
 
 
+    @patch.object(axidraw.AxiDraw, "penup")
+    @patch.object(axidraw.AxiDraw, "plot_polyline")
+    @patch.object(axidraw.AxiDraw, "_verify_interactive", return_value=True)
+    def test_draw_paths(self, m_verify, m_plot_polyline, m_penup):
+        print("test draw_paths plots each path, skipping short ones")
+        ad = axidraw.AxiDraw()
+        ad.interactive()
+        ad.update_options()
+        ad.simplify_tolerance = None # One motor step
+        ad.draw_paths([[[1, 1], [2, 1], [3, 1]], [[1, 2]], [[1, 3], [2, 3]]])
+
+        self.assertEqual(m_plot_polyline.call_count, 2)
+        self.assertEqual(m_plot_polyline.call_args_list[0][0][0], [[1, 1], [3, 1]])
+        self.assertEqual(ad.turtle_pos(), (2, 3))
+        self.assertEqual(ad.simplify_stats.vertices_removed, 1)
+
+    @patch.object(axidraw.AxiDraw, "penup")
+    @patch.object(axidraw.AxiDraw, "_verify_interactive", return_value=True)
+    def test_draw_path_resume(self, m_verify, m_penup):
+        print("test resume of an interrupted draw_path")
+        ad = axidraw.AxiDraw()
+        ad.interactive()
+        ad.update_options()
+        plotted = []
+
+        def interrupted_plot(vertex_list):
+            ''' Draw 1 inch of pen-down travel; stop by KeyboardInterrupt the first time '''
+            plotted.append([list(vertex) for vertex in vertex_list])
+            ad.plot_status.stats.down_travel_inch += 1.0
+            if len(plotted) == 1:
+                raise KeyboardInterrupt
+
+        path = [[0.5, 1], [3.5, 1]]
+        with patch.object(axidraw.AxiDraw, "plot_polyline", side_effect=interrupted_plot):
+            with self.assertRaises(KeyboardInterrupt):
+                ad.draw_path(path)
+            ad.draw_path(path, resume=True)
+
+        self.assertEqual(plotted[1], [[1.5, 1], [3.5, 1]]) # Continues after 1 inch
+        self.assertIsNone(ad._interrupted_batch)
+        self.assertFalse(ad.resume()) # Nothing left to resume
+
     def _setup_axidraw_with_args(self, args=None, m_emit=None):
         ''' returns an AxiDraw '''
         ad = axidraw.AxiDraw() if m_emit is None else axidraw.AxiDraw(user_message_fun=m_emit)
@@ -1,13 +1,17 @@
 from mock import patch
+import json
 import sys
 
 from pyfakefs.fake_filesystem import PatchMode
 from pyfakefs.fake_filesystem_unittest import TestCase
 
 from axidrawinternal import axidraw
+from axidrawinternal import axidraw_control
 
 from axicli import axidraw_cli
 
+from pyaxidraw import control
+
 # python -m unittest discover in top-level package dir
 
 class AxiDrawCliTestCase(TestCase):
@@ -36,6 +40,83 @@ preview = False """)
         self.assertTrue(adc.options.preview) # overridden by the command line (see sys.argv)
         self.assertEqual(adc.params.servo_timeout, "willnotbeoverridden")
 
+    def test_cli_plot_stock_wrapper(self):
+        """ A plain plot or preview runs through the stock AxiDrawWrapperClass """
+        sys.argv = ['axicli', 'AxiDraw_trivial.svg', '--preview']
+        adc = axidraw_cli.axidraw_CLI(dev=True)
+
+        self.assertIs(type(adc), axidraw_control.AxiDrawWrapperClass)
+
+    def test_control_pause_event(self):
+        """ The pyaxidraw AxiDraw of each unit receives pauses from the wrapper's event """
+        sys.argv = ['axicli', 'AxiDraw_trivial.svg', '--preview', '--profile', 'profile.json']
+        with patch.object(control.axidraw.AxiDraw, "set_up_pause_receiver",\
+                autospec=True, side_effect=control.axidraw.AxiDraw.set_up_pause_receiver)\
+                as m_receiver:
+            adc = axidraw_cli.axidraw_CLI(dev=True)
+        m_receiver.assert_called_once_with(adc.axidraw, adc.software_initiated_pause_event)
+        self.assertIs(adc.axidraw._software_pause_event, adc.software_initiated_pause_event)
+
+    def test_cli_estimate(self):
+        """ --estimate reports a plot time estimate without running the plot """
+        sys.argv = ['axicli', 'AxiDraw_trivial.svg', '--estimate']
+        adc = axidraw_cli.axidraw_CLI(dev=True)
+
+        self.assertGreater(adc.axidraw.time_estimate, 0)
+        self.assertFalse(adc.axidraw.options.preview)
+        self.assertTrue(adc.axidraw.plot_status.cli_api)
+
+    def test_cli_preview_file(self):
+        """ --preview_file receives the streamed preview """
+        sys.argv = ['axicli', 'AxiDraw_trivial.svg', '--preview', '-g', '4',\
+            '--preview_file', 'preview.svg']
+        ad = axidraw_cli.axidraw_CLI(dev=True)
+
+        self.assertEqual(ad.options.rendering, 4)
+        with open('preview.svg', encoding='utf-8') as preview_file:
+            self.assertIn('Pen-down movement', preview_file.read())
+
+    def test_cli_profile(self):
+        """ --profile saves the time of each phase as JSON """
+        sys.argv = ['axicli', 'AxiDraw_trivial.svg', '--preview', '--profile', 'profile.json']
+        axidraw_cli.axidraw_CLI(dev=True)
+
+        with open('profile.json', encoding='utf-8') as profile_file:
+            report = json.load(profile_file)
+        self.assertIn("parse", report["phases"])
+        self.assertIn("output", report["phases"])
+
+    def test_cli_exit_status(self):
+        """ A plot that fails to connect, even when profiled, exits with a non-zero status """
+        sys.argv = ['axicli', 'AxiDraw_trivial.svg', '--profile', 'profile.json']
+        with patch.object(control.axidraw.device_cache, "open_device", return_value=None):
+            with self.assertRaises(SystemExit) as context:
+                axidraw_cli.axidraw_CLI(dev=True)
+        self.assertEqual(context.exception.code, 1)
+
+    def test_cli_lightburn_exit_status(self):
+        """ A LightBurn project that fails to plot also exits with a non-zero status """
+        self.fs.add_real_file('./test/assets/LightBurn_shapes.lbrn2',\
+            target_path='LightBurn_shapes.lbrn2')
+        sys.argv = ['axicli', 'LightBurn_shapes.lbrn2']
+        with patch.object(control.axidraw.device_cache, "open_device", return_value=None):
+            with self.assertRaises(SystemExit) as context:
+                axidraw_cli.axidraw_CLI(dev=True)
+        self.assertEqual(context.exception.code, 1)
+
+    def test_cli_lightburn(self):
+        """ A LightBurn project is plotted from its file, by extension """
+        self.fs.add_real_file('./test/assets/LightBurn_shapes.lbrn2',\
+            target_path='LightBurn_shapes.lbrn2')
+        sys.argv = ['axicli', 'LightBurn_shapes.lbrn2', '--preview', '--mode', 'layers',\
+            '--layer', '2']
+        adc = axidraw_cli.axidraw_CLI(dev=True)
+
+        self.assertIsNotNone(adc.imported_digest)
+        self.assertIs(adc.axidraw.imported_digest, adc.imported_digest)
+        self.assertTrue(adc.axidraw.plot_status.cli_api)
+        self.assertAlmostEqual(adc.axidraw.distance_pendown, 2 * 0.03 * 2 ** 0.5, places=5)
+
     @patch.object(axidraw, "AxiDraw")
     def test_noncli_conf_options(self, m_axidraw):
         """ Some values used by axidraw are configurable but not settable via command line. `axidraw` grabs those values directly from the configurations, i.e. without an intermediary `options` object. (see https://gitlab.com/evil-mad/AxiDraw-Internal/-/blob/7e9e27434b3a4356e34ec7dc8858a1c5881fbbc9/axidrawinternal/axidraw.py#L203). Such values that are configured via the custom config (using the `--config` command line option) need to be properly sent to the AxiDraw class and override configured values in the default config file. """
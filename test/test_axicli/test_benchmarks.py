@@ -0,0 +1,46 @@
+import unittest
+
+from benchmarks import documents
+from benchmarks import run
+from benchmarks import stages
+
+# python -m unittest discover in top-level package dir
+
+class BenchmarksTestCase(unittest.TestCase):
+
+    def test_synthetic_reproducible(self):
+        """ Synthetic documents depend only on the number of paths and the seed """
+        self.assertEqual(documents.synthetic_svg(50), documents.synthetic_svg(50))
+        self.assertNotEqual(documents.synthetic_svg(50), documents.synthetic_svg(50, seed=2))
+        self.assertEqual(documents.synthetic_svg(50).count('<polyline'), 50)
+
+    def test_run_document_stages(self):
+        """ Each document stage runs, and is measured """
+        results = run.run_benchmarks(documents.synthetic([20]), repeat=1, generators=False)
+        self.assertEqual(set(results),\
+            {'synthetic-20/' + stage for stage in stages.document_stages('').keys()})
+        for result in results.values():
+            self.assertGreaterEqual(result['time_s'], 0)
+            self.assertGreaterEqual(result['peak_memory'], 0)
+
+    def test_select_stages(self):
+        """ Only stages matching the given patterns are run """
+        results = run.run_benchmarks(documents.synthetic([20]), repeat=1, memory=False,\
+            selected=['*/reorder_*'], generators=False)
+        self.assertEqual(sorted(results),\
+            ['synthetic-20/reorder_0', 'synthetic-20/reorder_1', 'synthetic-20/reorder_2'])
+        self.assertIsNone(results['synthetic-20/reorder_0']['peak_memory'])
+
+    def test_compare(self):
+        """ Increases beyond the tolerance are flagged as regressions """
+        baseline = {'a/digest': {'time_s': 1.0, 'peak_memory': 1000},\
+            'a/preview': {'time_s': 2.0, 'peak_memory': None},\
+            'a/removed': {'time_s': 1.0, 'peak_memory': 1000}}
+        results = {'a/digest': {'time_s': 1.2, 'peak_memory': 1200},\
+            'a/preview': {'time_s': 3.0, 'peak_memory': 5000},\
+            'a/added': {'time_s': 9.0, 'peak_memory': 9000}}
+        regressions = run.compare(results, baseline, time_tolerance=0.25, memory_tolerance=0.1)
+        self.assertEqual([(item['key'], item['quantity']) for item in regressions],\
+            [('a/digest', 'peak_memory'), ('a/preview', 'time_s')])
+        self.assertEqual(regressions[1]['ratio'], 1.5)
+        self.assertEqual(run.compare(results, results), [])
@@ -0,0 +1,79 @@
+import math
+import os
+import random
+import sys
+import unittest
+
+from pyaxidraw import estimate
+
+MY_ART_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(\
+    os.path.abspath(__file__)))), '_my_art')
+
+# python -m unittest discover in top-level package dir
+
+DISTANCE_PER_LOAD = 100.0
+
+
+def stroke_length(points):
+    return sum(math.hypot(end[0] - start[0], end[1] - start[1])\
+        for start, end in zip(points[:-1], points[1:]))
+
+
+def random_strokes(seed=1):
+    """ Strokes of assorted lengths, including some longer than one load """
+    rand = random.Random(seed)
+    strokes = []
+    for _index in range(40):
+        point = [rand.uniform(0, 200), rand.uniform(0, 200)]
+        stroke = [point]
+        for _vertex in range(rand.randint(1, 30)):
+            point = [point[0] + rand.uniform(-15, 15), point[1] + rand.uniform(-15, 15)]
+            stroke.append(point)
+        strokes.append(stroke)
+    return strokes
+
+
+@unittest.skipIf(estimate.np is None, "requires NumPy")
+class BrushTestCase(unittest.TestCase):
+
+    def setUp(self):
+        if MY_ART_DIR not in sys.path:
+            sys.path.append(MY_ART_DIR)
+        import brush # pylint: disable=import-outside-toplevel, import-error
+        self.brush = brush
+
+    def test_loads_not_exceeded(self):
+        """ No stretch of pen-down distance between reloads is longer than one load """
+        strokes = random_strokes()
+        self.assertGreater(max(stroke_length(stroke) for stroke in strokes), DISTANCE_PER_LOAD)
+        paint = self.brush.PaintLoad(DISTANCE_PER_LOAD, [(0, 0), (200, 200)])
+        steps = paint.schedule(strokes)
+
+        self.assertEqual(steps[0][0], 'reload') # The brush starts dry
+        painted = 0.0
+        since_reload = 0.0
+        for kind, data in steps:
+            if kind == 'reload':
+                self.assertIn(data, [(0, 0), (200, 200)])
+                since_reload = 0.0
+            else:
+                length = stroke_length(data)
+                painted += length
+                since_reload += length
+                self.assertLessEqual(since_reload, DISTANCE_PER_LOAD * (1 + 1e-9))
+        self.assertAlmostEqual(painted, sum(stroke_length(stroke) for stroke in strokes),\
+            places=6)
+
+        reloads = sum(1 for kind, _data in steps if kind == 'reload')
+        self.assertEqual(paint.simulate(strokes)['reloads'], reloads)
+        self.assertGreaterEqual(reloads, math.ceil(painted / DISTANCE_PER_LOAD))
+
+    def test_split_stroke(self):
+        """ A long stroke is split into equal pieces that join up end to end """
+        stroke = [[0, 0], [30, 0], [30, 40], [0, 40]]
+        pieces = self.brush._split_stroke(stroke, 25) # pylint: disable=protected-access
+        self.assertEqual(len(pieces), 4)
+        for piece in pieces:
+            self.assertAlmostEqual(stroke_length(piece.tolist()), 25)
+        for before, after in zip(pieces[:-1], pieces[1:]):
+            self.assertEqual(before[-1].tolist(), after[0].tolist())
@@ -0,0 +1,50 @@
+import os
+import random
+import sys
+import unittest
+
+from pyaxidraw import estimate
+
+MY_ART_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(\
+    os.path.abspath(__file__)))), '_my_art')
+
+# python -m unittest discover in top-level package dir
+
+BOX = (0, 0, 10, 5)
+
+
+@unittest.skipIf(estimate.np is None, "requires NumPy")
+class ClipTestCase(unittest.TestCase):
+
+    def setUp(self):
+        if MY_ART_DIR not in sys.path:
+            sys.path.append(MY_ART_DIR)
+        import clip # pylint: disable=import-outside-toplevel, import-error
+        self.clip = clip
+
+    def test_within_bounds(self):
+        """ Clipped strokes lie within the box; interior points are all kept """
+        rand = random.Random(1)
+        polylines = [[(rand.uniform(-5, 15), rand.uniform(-5, 10))\
+            for _vertex in range(rand.randint(2, 12))] for _line in range(200)]
+        strokes = self.clip.clip_polylines(polylines, BOX)
+        self.assertGreater(len(strokes), 100)
+        for stroke in strokes:
+            self.assertGreaterEqual(len(stroke), 2)
+            for x_pos, y_pos in stroke:
+                self.assertTrue(-1e-9 <= x_pos <= 10 + 1e-9 and -1e-9 <= y_pos <= 5 + 1e-9,\
+                    (x_pos, y_pos))
+        np = estimate.np
+        kept = np.array([point for stroke in strokes for point in stroke])
+        for line in polylines:
+            for point in line:
+                if 0 < point[0] < 10 and 0 < point[1] < 5:
+                    distances = np.hypot(kept[:, 0] - point[0], kept[:, 1] - point[1])
+                    self.assertLess(np.min(distances), 1e-9, point)
+
+    def test_split_at_edges(self):
+        """ A polyline that leaves the box ends on its edge, and starts again on return """
+        line = [(2, 1), (12, 1), (12, 4), (8, 4), (8, 7)]
+        self.assertEqual(self.clip.clip_polylines([line], BOX),\
+            [[(2, 1), (10, 1)], [(10, 4), (8, 4), (8, 5)]])
+        self.assertEqual(self.clip.clip_polylines([[(-1, -1), (-1, 6)], [(0, 0)]], BOX), [])
@@ -0,0 +1,94 @@
+import random
+import tracemalloc
+import unittest
+
+from mock import patch
+
+from axidrawinternal import path_objects
+
+from pyaxidraw import axidraw
+from pyaxidraw import compact_paths
+
+from test.test_axicli.test_estimate import spiral_svg
+
+# python -m unittest discover in top-level package dir
+
+
+def random_path(vertex_count, seed=1):
+    rand = random.Random(seed)
+    return [[rand.uniform(0, 10), rand.uniform(0, 10)] for _index in range(vertex_count)]
+
+
+class CompactPathsTestCase(unittest.TestCase):
+
+    def _check_same(self, vertices):
+        ''' CompactPathItem gives the same results as PathItem, for one vertex list '''
+        path = path_objects.PathItem.from_attrs(subpaths=[[v[:] for v in vertices]],\
+            item_id="p")
+        compact = compact_paths.CompactPathItem.from_path(path)
+        self.assertEqual(compact.subpaths, path.subpaths)
+        self.assertEqual(compact.first_point(), path.first_point())
+        self.assertEqual(compact.last_point(), path.last_point())
+        self.assertEqual(compact.closed(), path.closed())
+        self.assertEqual(compact.to_string(), path.to_string())
+        self.assertAlmostEqual(compact.length(), path.length(), places=9)
+        compact.reverse()
+        path.reverse()
+        self.assertEqual(compact.subpaths, path.subpaths)
+        for fraction in (0, 0.3, 0.999, 1.5):
+            cropped = compact_paths.CompactPathItem.from_path(path)
+            expected = path_objects.PathItem.from_attrs(subpaths=path.subpaths)
+            target = fraction * path.length()
+            cropped.crop_by_distance(target)
+            expected.crop_by_distance(target)
+            self.assertEqual(len(cropped.subpaths[0]), len(expected.subpaths[0]))
+            for vertex, expected_vertex in zip(cropped.subpaths[0], expected.subpaths[0]):
+                self.assertAlmostEqual(vertex[0], expected_vertex[0], places=9)
+                self.assertAlmostEqual(vertex[1], expected_vertex[1], places=9)
+
+    def test_same_as_path_item(self):
+        """ Short and long paths behave as PathItems do, with and without NumPy """
+        for numpy in (compact_paths.np, None):
+            with patch.object(compact_paths, "np", numpy):
+                for count in (2, 5, 200):
+                    self._check_same(random_path(count, seed=count))
+        self._check_same([[0, 0], [1, 0], [1, 1], [0, 0]]) # Closed
+
+    def test_subpaths_are_copies(self):
+        """ Changing the vertex lists returned does not change the path """
+        compact = compact_paths.CompactPathItem.from_attrs(subpaths=[[[0, 0], [1, 1]]])
+        compact.subpaths[0].append([2, 2])
+        self.assertEqual(compact.vertex_count(), 2)
+        self.assertEqual(compact.nbytes(), 32)
+        with self.assertRaises(AttributeError):
+            compact.color = "red" # __slots__
+
+    def test_expand_digest(self):
+        """ A compact digest expands into an equal digest of PathItems, each time """
+        ad = axidraw.AxiDraw()
+        ad.plot_setup(spiral_svg())
+        ad.options.digest = 2
+        ad.plot_run()
+        compact = compact_paths.compact(ad.digest)
+        expanded = compact_paths.expand(compact)
+        self.assertEqual([[path.subpaths for path in layer.paths] for layer in expanded.layers],\
+            [[path.subpaths for path in layer.paths] for layer in ad.digest.layers])
+        self.assertIsInstance(expanded.layers[0].paths[0], path_objects.PathItem)
+        expanded.layers[0].paths[0].reverse()
+        self.assertEqual(compact_paths.expand(compact).layers[0].paths[0].subpaths,\
+            ad.digest.layers[0].paths[0].subpaths)
+
+    def test_memory(self):
+        """ A long path takes a fraction of the memory of a list of vertices """
+        vertices = random_path(20000)
+        tracemalloc.start()
+        try:
+            before = tracemalloc.get_traced_memory()[0]
+            path = path_objects.PathItem.from_attrs(subpaths=[[v[:] for v in vertices]])
+            list_size = tracemalloc.get_traced_memory()[0] - before
+            before = tracemalloc.get_traced_memory()[0]
+            compact = compact_paths.CompactPathItem.from_path(path)
+            compact_size = tracemalloc.get_traced_memory()[0] - before
+        finally:
+            tracemalloc.stop()
+        self.assertLess(compact_size, list_size / 4)
@@ -0,0 +1,113 @@
+import os
+import shutil
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+from mock import patch
+
+from pyaxidraw import axidraw
+from pyaxidraw import device_cache
+
+# python -m unittest discover in top-level package dir
+
+VERSION = b'EBBv13_and_above EB Firmware Version 2.8.1\r\n'
+
+
+class FakeSerial:
+    ''' Serial port with a simulated EBB; devices maps port name to nickname '''
+    devices = {}
+    opened = []
+
+    def __init__(self, port_name, timeout=None):
+        if port_name not in self.devices:
+            raise device_cache.serial.SerialException("No such port")
+        self.port_name = port_name
+        self.timeout = timeout
+        self.lines = []
+        self.closed = False
+        self.opened.append(port_name)
+
+    def reset_input_buffer(self):
+        self.lines = []
+
+    def write(self, data):
+        if data.lower() == b'v\r':
+            self.lines.append(VERSION)
+        elif data == b'QT\r':
+            self.lines.extend([self.devices[self.port_name].encode() + b'\r\n', b'OK\r\n'])
+
+    def readline(self):
+        return self.lines.pop(0) if self.lines else b''
+
+    def close(self):
+        self.closed = True
+
+
+def port_info(device, nickname):
+    return SimpleNamespace(device=device, description=f'EiBotBoard {nickname}',\
+        hwid='USB VID:PID=04D8:FD92', serial_number=nickname)
+
+
+class DeviceCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.cache_file = os.path.join(self.temp_dir, 'axidraw', 'devices.json')
+        FakeSerial.devices = {'/dev/ttyACM0': 'left', '/dev/ttyACM1': 'right'}
+        FakeSerial.opened = []
+        self.ports = [port_info(name, nickname) for name, nickname in FakeSerial.devices.items()]
+        for patcher in (patch.object(device_cache.serial, "Serial", FakeSerial),\
+                patch.object(device_cache.list_ports, "comports", lambda: self.ports)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def _connect(self, name=None):
+        ad = axidraw.AxiDraw()
+        ad.interactive()
+        ad.options.port = name
+        ad.device_cache_file = self.cache_file
+        ad.serial_connect()
+        return ad
+
+    def test_discovery_then_cache(self):
+        """ The first connection probes the ports; the next tries the cached port only """
+        ad = self._connect("right")
+        self.assertEqual(ad.connect_source, "discovery")
+        self.assertEqual(ad.plot_status.port.port_name, '/dev/ttyACM1')
+        self.assertEqual(ad.plot_status.fw_version, '2.8.1')
+        self.assertTrue(ad.connected)
+        FakeSerial.opened = []
+        self.ports = [] # Listing the ports would find nothing
+        ad = self._connect("right")
+        self.assertEqual(ad.connect_source, "cache")
+        self.assertEqual(FakeSerial.opened, ['/dev/ttyACM1'])
+
+    def test_moved_device(self):
+        """ If another AxiDraw is at the cached port, the ports are probed again """
+        self._connect("right")
+        FakeSerial.devices = {'/dev/ttyACM0': 'right', '/dev/ttyACM1': 'left'}
+        self.ports = [port_info('/dev/ttyACM0', 'unlisted'), port_info('/dev/ttyACM1', 'other')]
+        ad = self._connect("right")
+        self.assertEqual(ad.connect_source, "discovery")
+        self.assertEqual(ad.plot_status.port.port_name, '/dev/ttyACM0')
+
+    def test_first_available(self):
+        """ With no name, the first listed AxiDraw is used, and others are closed """
+        with patch.object(device_cache.ebb_serial, "closePort") as m_close:
+            ad = self._connect()
+        self.assertEqual(ad.plot_status.port.port_name, '/dev/ttyACM0')
+        self.assertEqual(m_close.call_count, 1)
+        cache = device_cache.DeviceCache(self.cache_file)
+        self.assertEqual(cache.lookup(None)['port'], '/dev/ttyACM0')
+        self.assertEqual(cache.lookup('left')['port'], '/dev/ttyACM0')
+
+    def test_not_found(self):
+        """ Failing to connect is reported as before """
+        ad = self._connect("middle")
+        self.assertIsNone(ad.plot_status.port)
+        self.assertEqual(ad.plot_status.stopped, 101)
+        self.assertFalse(os.path.exists(self.cache_file))
@@ -0,0 +1,64 @@
+import math
+import unittest
+
+from mock import patch
+
+from pyaxidraw import axidraw
+from pyaxidraw import estimate
+
+# python -m unittest discover in top-level package dir
+
+def spiral_svg():
+    """ Document with a mix of curves, corners, and short and long pen-up moves """
+    paths = []
+    for index in range(12):
+        center_x = 20 + 22 * (index % 6)
+        center_y = 30 + 50 * (index // 6)
+        points = " ".join(f"{center_x + 0.1 * t * math.cos(0.2 * t):.3f},"\
+            f"{center_y + 0.1 * t * math.sin(0.2 * t):.3f}" for t in range(100))
+        paths.append(f'<polyline fill="none" stroke="black" points="{points}"/>')
+        paths.append(f'<rect fill="none" stroke="black" x="{center_x}" y="{center_y + 15}"'\
+            ' width="8" height="3"/>')
+    return '<svg xmlns="http://www.w3.org/2000/svg" width="150mm" height="120mm"'\
+        ' viewBox="0 0 150 120">' + "".join(paths) + '</svg>'
+
+
+class EstimateTestCase(unittest.TestCase):
+
+    def _preview(self, svg, **options):
+        ad = axidraw.AxiDraw()
+        ad.plot_setup(svg)
+        ad.options.preview = True
+        for name, value in options.items():
+            setattr(ad.options, name, value)
+        ad.plot_run()
+        return ad
+
+    def _estimate(self, svg, **options):
+        ad = axidraw.AxiDraw()
+        ad.plot_setup(svg)
+        for name, value in options.items():
+            setattr(ad.options, name, value)
+        ad.estimate()
+        return ad
+
+    def test_matches_preview(self):
+        """ Closed-form estimate is within 2% of the preview time; same distances & lifts """
+        svg = spiral_svg()
+        for options in ({}, {"const_speed": True}, {"speed_pendown": 70, "accel": 30}):
+            preview = self._preview(svg, **options)
+            estimated = self._estimate(svg, **options)
+            self.assertAlmostEqual(estimated.time_estimate / preview.time_estimate, 1,\
+                delta=0.02, msg=str(options))
+            self.assertAlmostEqual(estimated.distance_pendown, preview.distance_pendown, places=3)
+            self.assertAlmostEqual(estimated.distance_total, preview.distance_total, places=3)
+            self.assertEqual(estimated.pen_lifts, preview.pen_lifts)
+            self.assertFalse(estimated.options.preview) # Options restored
+
+    def test_no_numpy_runs_preview(self):
+        """ Without NumPy, estimate() runs the standard preview """
+        svg = spiral_svg()
+        preview = self._preview(svg)
+        with patch.object(estimate, "np", None):
+            estimated = self._estimate(svg)
+        self.assertEqual(estimated.time_estimate, preview.time_estimate)
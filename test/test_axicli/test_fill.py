@@ -0,0 +1,89 @@
+import math
+import os
+import sys
+import unittest
+
+from pyaxidraw import estimate
+
+MY_ART_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(\
+    os.path.abspath(__file__)))), '_my_art')
+
+# python -m unittest discover in top-level package dir
+
+L_SHAPE = [(0, 0), (20, 0), (20, 8), (8, 8), (8, 20), (0, 20)]
+DUMBBELL = [(0, 0), (10, 0), (10, 4), (12, 4), (12, 0), (22, 0), (22, 10), (12, 10),\
+    (12, 6), (10, 6), (10, 10), (0, 10)] # Splits in two once inset by 1
+
+
+def inside(point, polygon):
+    """ Even-odd test: True if point is inside polygon """
+    result = False
+    for index, (x_1, y_1) in enumerate(polygon):
+        x_2, y_2 = polygon[index - 1]
+        if (y_1 > point[1]) != (y_2 > point[1]) and\
+                point[0] < x_1 + (point[1] - y_1) * (x_2 - x_1) / (y_2 - y_1):
+            result = not result
+    return result
+
+
+def outline_distance(point, polygon):
+    """ Distance from point to the nearest edge of polygon """
+    distances = []
+    for index, (x_1, y_1) in enumerate(polygon):
+        x_2, y_2 = polygon[index - 1]
+        d_x, d_y = x_2 - x_1, y_2 - y_1
+        t = ((point[0] - x_1) * d_x + (point[1] - y_1) * d_y) / (d_x * d_x + d_y * d_y)
+        t = min(max(t, 0.0), 1.0)
+        distances.append(math.hypot(point[0] - x_1 - t * d_x, point[1] - y_1 - t * d_y))
+    return min(distances)
+
+
+@unittest.skipIf(estimate.np is None, "requires NumPy")
+class FillTestCase(unittest.TestCase):
+
+    def setUp(self):
+        if MY_ART_DIR not in sys.path:
+            sys.path.append(MY_ART_DIR)
+        import fill # pylint: disable=import-outside-toplevel, import-error
+        self.fill = fill
+
+    def _check_rings(self, polygon, spacing):
+        """ Rings are closed, inside the polygon, and inset by whole multiples of spacing """
+        rings, unfilled = self.fill.inset_rings(polygon, spacing)
+        self.assertEqual(unfilled, [])
+        self.assertGreater(len(rings), 1)
+        for ring in rings:
+            self.assertEqual(ring[0].tolist(), ring[-1].tolist())
+            for vertex in ring.tolist():
+                self.assertTrue(inside(vertex, polygon), vertex)
+            inset = min(outline_distance(vertex, polygon) for vertex in ring.tolist())
+            self.assertGreaterEqual(inset, spacing - 1e-9)
+            self.assertAlmostEqual(inset / spacing, round(inset / spacing), places=6)
+        return rings
+
+    def test_rings_concave(self):
+        """ Rings of a concave polygon step inward by the spacing, outermost first """
+        rings = self._check_rings(L_SHAPE, 1.0)
+        insets = [min(outline_distance(vertex, L_SHAPE) for vertex in ring.tolist())\
+            for ring in rings]
+        for number, inset in enumerate(insets, 1):
+            self.assertAlmostEqual(inset, number, places=6)
+        self.assertEqual(self.fill.inset_rings(L_SHAPE[::-1], 1.0)[0][0].shape,\
+            rings[0].shape) # Either orientation
+
+    def test_rings_split(self):
+        """ A polygon that falls apart is filled in both pieces """
+        try:
+            import pyclipper # pylint: disable=import-outside-toplevel, unused-import
+        except ImportError:
+            self.skipTest("requires pyclipper")
+        rings = self._check_rings(DUMBBELL, 1.0)
+        self.assertTrue(any(ring[:, 0].max() < 11 for ring in rings))
+        self.assertTrue(any(ring[:, 0].min() > 11 for ring in rings))
+
+    def test_contour_fill(self):
+        """ Rings are linked into one continuous stroke, inside the polygon """
+        strokes = self.fill.contour_fill(L_SHAPE, 1.0)
+        self.assertEqual(len(strokes), 1)
+        for vertex in strokes[0]:
+            self.assertTrue(inside(vertex, L_SHAPE), vertex)
@@ -0,0 +1,87 @@
+import threading
+import time
+import unittest
+
+from pyaxidraw import fleet
+
+from test.test_axicli.test_estimate import spiral_svg
+
+# python -m unittest discover in top-level package dir
+
+
+def fixed_estimates(durations):
+    ''' estimate_function giving each job the duration in its name, on every model '''
+    def estimate(job, model, _params):
+        return durations[job.name].get(model) if isinstance(durations[job.name], dict)\
+            else durations[job.name]
+    return estimate
+
+
+class FleetTestCase(unittest.TestCase):
+
+    def _scheduler(self, durations, units, plot_function=None):
+        scheduler = fleet.FleetScheduler(units, plot_function=plot_function or\
+            (lambda unit, job, params: 0), estimate_function=fixed_estimates(durations))
+        for name in durations:
+            scheduler.add(fleet.Job("<svg/>", name=name))
+        return scheduler
+
+    def test_longest_first_plan(self):
+        """ Jobs are planned longest first, each on the unit that finishes it earliest """
+        durations = {"a": 7, "b": 5, "c": 4, "d": 3, "e": 1}
+        scheduler = self._scheduler(durations, [fleet.Unit("left"), fleet.Unit("right")])
+        plan = scheduler.plan()
+        self.assertEqual([job.name for job in plan["left"]], ["a", "d"])
+        self.assertEqual([job.name for job in plan["right"]], ["b", "c", "e"])
+        self.assertEqual(scheduler.planned, 10)
+
+    def test_model_constraints(self):
+        """ Jobs only go to units whose model fits; others are left unplaced """
+        durations = {"big": {2: 10, 1: None}, "small": 1, "huge": {1: None, 2: None}}
+        scheduler = self._scheduler(durations, [fleet.Unit("a4", model=1),\
+            fleet.Unit("a3", model=2)])
+        plan = scheduler.plan()
+        self.assertEqual([job.name for job in plan["a3"]], ["big"])
+        self.assertEqual([job.name for job in plan["a4"]], ["small"])
+        self.assertEqual([job.name for job in scheduler.unplaced], ["huge"])
+
+    def test_fault_rebalances(self):
+        """ The jobs of a unit that fails are plotted by the others """
+        plotted = []
+        lock = threading.Lock()
+        def plot(unit, job, _params):
+            if unit.name == "broken":
+                return fleet.CONNECT_FAILED
+            with lock:
+                plotted.append(job.name)
+            return 0
+        durations = {name: 1 for name in "abcdef"}
+        scheduler = self._scheduler(durations, [fleet.Unit("broken"), fleet.Unit("ok")], plot)
+        report = scheduler.run()
+        self.assertEqual(sorted(plotted), list("abcdef"))
+        self.assertEqual(report['jobs'], {"done": 6})
+        self.assertFalse(report['units']['broken']['in_service'])
+        self.assertEqual(report['units']['broken']['faults'], 1)
+        self.assertEqual(report['units']['ok']['jobs_done'], 6)
+
+    def test_idle_unit_takes_work(self):
+        """ A unit that finishes early takes queued jobs from a busier unit """
+        def plot(unit, job, _params):
+            time.sleep(0.05 if unit.name == "slow" else 0.001)
+            return 0
+        durations = {name: 1 for name in "abcdefgh"}
+        scheduler = self._scheduler(durations, [fleet.Unit("slow"), fleet.Unit("fast")], plot)
+        report = scheduler.run()
+        self.assertEqual(report['jobs'], {"done": 8})
+        self.assertGreater(report['units']['fast']['jobs_done'], 4)
+        self.assertGreater(report['units']['slow']['utilisation'], 0.5)
+
+    def test_estimate_job(self):
+        """ Estimates include copies; a page too large for the model does not fit """
+        job = fleet.Job(spiral_svg(), copies=2, options={"page_delay": 3})
+        single = fleet.estimate_job(fleet.Job(spiral_svg()), 1)
+        self.assertAlmostEqual(fleet.estimate_job(job, 1), 2 * single + 3)
+        large = spiral_svg().replace('width="150mm" height="120mm"',\
+            'width="400mm" height="280mm"')
+        self.assertIsNone(fleet.estimate_job(fleet.Job(large), 1))
+        self.assertIsNotNone(fleet.estimate_job(fleet.Job(large), 2))
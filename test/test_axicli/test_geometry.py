@@ -0,0 +1,63 @@
+import math
+import os
+import sys
+import unittest
+
+from pyaxidraw import estimate
+
+MY_ART_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(\
+    os.path.abspath(__file__)))), '_my_art')
+
+# python -m unittest discover in top-level package dir
+
+@unittest.skipIf(estimate.np is None, "requires NumPy")
+class GeometryTestCase(unittest.TestCase):
+
+    def setUp(self):
+        if MY_ART_DIR not in sys.path:
+            sys.path.append(MY_ART_DIR)
+        import geometry # pylint: disable=import-outside-toplevel, import-error
+        self.geometry = geometry
+        self.np = estimate.np
+
+    def _chord_errors(self, points, curve):
+        """ Largest distance from each chord to the curve between its ends """
+        np = self.np
+        errors = []
+        for start, end in zip(points[:-1], points[1:]):
+            between = curve(start, end)
+            delta = end - start
+            along = np.clip((between - start) @ delta / (delta @ delta), 0, 1)
+            nearest = start + along[:, None] * delta
+            errors.append(np.max(np.hypot(*(between - nearest).T)))
+        return np.array(errors)
+
+    def test_circle_chord_error(self):
+        """ Circles are closed, with chord error within tolerance """
+        np = self.np
+        for radius in (0.05, 0.5, 5, 150):
+            points = self.geometry.circle_points(10, 20, radius)
+            self.assertEqual(points[0].tolist(), points[-1].tolist())
+            middles = (points[1:] + points[:-1]) / 2
+            sagitta = radius - np.hypot(middles[:, 0] - 10, middles[:, 1] - 20)
+            self.assertLessEqual(np.max(sagitta), self.geometry.TOLERANCE)
+            self.assertTrue(np.allclose(np.hypot(points[:, 0] - 10, points[:, 1] - 20), radius))
+
+    def test_spiral_chord_error(self):
+        """ Spirals keep the chord error within tolerance, including at the center """
+        np = self.np
+        for total_radius, spacing in ((50, 2), (100, 5), (5, 0.5)):
+            points = self.geometry.archimedean_spiral_points(3, 4, total_radius, spacing)
+            scale = spacing / (2 * math.pi)
+
+            def spiral(start, end, scale=scale):
+                theta = np.linspace(*(np.hypot(*(np.array([start, end]) - (3, 4)).T) / scale),\
+                    40)
+                return np.column_stack((3 + scale * theta * np.cos(theta),\
+                    4 + scale * theta * np.sin(theta)))
+
+            self.assertEqual(points[0].tolist(), [3, 4])
+            self.assertAlmostEqual(np.hypot(*(points[-1] - (3, 4))), total_radius)
+            errors = self._chord_errors(points, spiral)
+            self.assertLessEqual(np.max(errors), self.geometry.TOLERANCE)
+            self.assertGreater(np.mean(errors), self.geometry.TOLERANCE / 2) # Not oversampled
@@ -0,0 +1,77 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from mock import patch
+
+from pyaxidraw import axidraw
+from pyaxidraw import journal
+
+# python -m unittest discover in top-level package dir
+
+class JournalTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.file_name = os.path.join(self.temp_dir, "journal.jsonl")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_truncated_record_ignored(self):
+        """ A partial last line, as left by a crash, is ignored """
+        test_journal = journal.Journal(self.file_name, sync_count=2)
+        test_journal.open()
+        test_journal.write({"event": "start", "batch": 0, "key": "abc"})
+        test_journal.write({"event": "path", "batch": 0, "dist": 1.5})
+        test_journal.close()
+        with open(self.file_name, "a", encoding="utf-8") as journal_file:
+            journal_file.write('{"event": "path", "ba')
+        recovery = journal.JournalRecovery(journal.Journal.read(self.file_name))
+        self.assertEqual(recovery.progress(0, "abc"), (False, 1.5))
+        self.assertIsNone(recovery.progress(0, "xyz")) # Different paths
+        self.assertIsNone(recovery.progress(1, "abc")) # Not reached
+
+    @patch.object(axidraw.AxiDraw, "penup")
+    @patch.object(axidraw.AxiDraw, "_connect", return_value=True)
+    @patch.object(axidraw.AxiDraw, "_verify_interactive", return_value=True)
+    def test_recover_skips_drawn_paths(self, m_verify, m_connect, m_penup):
+        """ After a crash, recover() skips completed batches and resumes the interrupted one """
+        batches = [[[[0.5, 1], [1.5, 1]]], [[[0.5, 2], [1.5, 2]], [[0.5, 3], [3.5, 3]]],\
+            [[[0.5, 4], [1.5, 4]]]]
+        plotted = []
+
+        def session(ad, crash_after=None):
+            ''' Run a script drawing all batches, crashing after some number of paths '''
+            def plot(vertex_list):
+                if len(plotted) == crash_after:
+                    ad.plot_status.stats.down_travel_inch += 1.0 # Partway through path
+                    raise RuntimeError("Lost USB connectivity")
+                plotted.append([list(vertex) for vertex in vertex_list])
+                ad.plot_status.stats.down_travel_inch +=\
+                    vertex_list[-1][0] - vertex_list[0][0]
+            with patch.object(axidraw.AxiDraw, "plot_polyline", side_effect=plot):
+                for path_list in batches:
+                    ad.draw_paths(path_list)
+
+        ad = axidraw.AxiDraw()
+        ad.interactive()
+        ad.update_options()
+        ad.journal_file = self.file_name
+        ad.journal_data = {"seed": 42}
+        ad.connect()
+        with self.assertRaises(RuntimeError):
+            session(ad, crash_after=2)
+        self.assertEqual(len(plotted), 2)
+
+        del plotted[:]
+        ad = axidraw.AxiDraw()
+        ad.interactive()
+        ad.update_options()
+        self.assertTrue(ad.recover(self.file_name))
+        self.assertEqual(ad.journal_data, {"seed": 42})
+        self.assertTrue(ad.recovering)
+        session(ad)
+        self.assertFalse(ad.recovering)
+        self.assertEqual(plotted, [[[1.5, 3], [3.5, 3]], [[0.5, 4], [1.5, 4]]])
@@ -0,0 +1,108 @@
+import math
+import unittest
+
+from mock import MagicMock, patch
+
+from axidrawinternal import digest_svg
+
+from pyaxidraw import axidraw
+
+# python -m unittest discover in top-level package dir
+
+def layered_svg():
+    """ Document with three numbered layers, plus content that layers mode skips """
+    parts = ['<svg xmlns="http://www.w3.org/2000/svg"'\
+        ' xmlns:inkscape="http://www.inkscape.org/namespaces/inkscape"'\
+        ' width="200mm" height="150mm" viewBox="0 0 200 150">',\
+        '<path d="M 5 5 L 50 50" stroke="black" fill="none"/>',\
+        '<g inkscape:groupmode="layer" inkscape:label="% Notes">'\
+        '<path d="M 1 1 L 9 9" stroke="black"/></g>',\
+        '<g inkscape:groupmode="layer" inkscape:label="7 hidden" style="display:none">'\
+        '<path d="M 1 1 L 9 9" stroke="black"/></g>',\
+        '<g inkscape:groupmode="layer" inkscape:label="Unnumbered">'\
+        '<path d="M 1 1 L 9 9" stroke="black"/></g>']
+    for layer in (3, 1, 2):
+        parts.append(f'<g inkscape:groupmode="layer" inkscape:label="{layer} Pen {layer}">')
+        for index in range(8):
+            center_x = 20 + 20 * index
+            center_y = 20 + 30 * layer
+            points = " ".join(f"{center_x + 5 * math.cos(t / 4):.3f},"\
+                f"{center_y + 5 * math.sin(t / 4):.3f}" for t in range(20 + layer))
+            parts.append(f'<polyline fill="none" stroke="black" points="{points}"/>')
+        parts.append('</g>')
+    parts.append('</svg>')
+    return "\n".join(parts)
+
+
+def plot_one_layer(layer, **options):
+    """ Preview one layer in layers mode, without a layer session """
+    ad = axidraw.AxiDraw()
+    ad.plot_setup(layered_svg())
+    ad.options.preview = True
+    ad.options.mode = "layers"
+    ad.options.layer = layer
+    for name, value in options.items():
+        setattr(ad.options, name, value)
+    ad.plot_run()
+    return ad
+
+
+class LayerSessionTestCase(unittest.TestCase):
+
+    def _session(self, **options):
+        ad = axidraw.AxiDraw()
+        ad.plot_setup(layered_svg())
+        ad.options.preview = True
+        for name, value in options.items():
+            setattr(ad.options, name, value)
+        return ad
+
+    def test_layer_numbers(self):
+        """ Visible, numbered layers, in increasing order """
+        self.assertEqual(self._session().layer_numbers(), [1, 2, 3])
+
+    def test_plot_layers_digests_once(self):
+        """ The document is digested once; each layer plots as in layers mode """
+        ad = self._session()
+        tool_change = MagicMock(return_value=None)
+        results = []
+        def plot_layer(layer_number, output=False):
+            plot_layer.original(layer_number, output)
+            results.append((ad.time_estimate, ad.distance_pendown, ad.pen_lifts))
+        plot_layer.original = ad.plot_layer
+        ad.plot_layer = plot_layer
+        with patch.object(digest_svg.DigestSVG, "process_svg", autospec=True,\
+                side_effect=digest_svg.DigestSVG.process_svg) as m_process:
+            plotted = ad.plot_layers(tool_change=tool_change)
+        self.assertEqual(plotted, [1, 2, 3])
+        self.assertEqual(m_process.call_count, 1)
+        self.assertEqual([call.args[0] for call in tool_change.call_args_list], [2, 3])
+        for layer, result in zip(plotted, results):
+            single = plot_one_layer(layer)
+            self.assertEqual(result, (single.time_estimate, single.distance_pendown,\
+                single.pen_lifts))
+            self.assertEqual(result[2], 8)
+
+    def test_tool_change_stops(self):
+        """ plot_layers stops if tool_change returns False """
+        ad = self._session()
+        self.assertEqual(ad.plot_layers([2, 1], tool_change=lambda _layer: False), [2])
+
+    def test_hiding(self):
+        """ With hidden-line removal, layers plot as in layers mode """
+        ad = self._session(hiding=True)
+        ad.plot_layer(2)
+        single = plot_one_layer(2, hiding=True)
+        self.assertEqual((ad.time_estimate, ad.pen_lifts),\
+            (single.time_estimate, single.pen_lifts))
+
+    def test_options_change(self):
+        """ Changing an option that affects the digest prepares a new one """
+        ad = self._session()
+        with patch.object(digest_svg.DigestSVG, "process_svg", autospec=True,\
+                side_effect=digest_svg.DigestSVG.process_svg) as m_process:
+            ad.plot_layer(1)
+            ad.plot_layer(2)
+            ad.options.reordering = 4
+            ad.plot_layer(1)
+        self.assertEqual(m_process.call_count, 2)
@@ -0,0 +1,98 @@
+import copy
+import random
+import unittest
+
+from axidrawinternal.plot_utils_import import from_dependency_import # plotink
+from pyaxidraw import length_index
+
+path_objects = from_dependency_import('axidrawinternal.path_objects')
+
+# python -m unittest discover in top-level package dir
+
+def make_digest(seed=1):
+    """ Flat digest with several layers of random polylines, including an empty layer """
+    rand = random.Random(seed)
+    digest = path_objects.DocDigest()
+    for layer_number in range(4):
+        layer = path_objects.LayerItem()
+        layer.name = str(layer_number)
+        layer.props.delay = 1000
+        layer.props.pause = True
+        path_count = 0 if layer_number == 2 else rand.randint(1, 8)
+        for _path in range(path_count):
+            vertices = [[rand.uniform(0, 5), rand.uniform(0, 5)]\
+                for _vertex in range(rand.randint(2, 6))]
+            layer.paths.append(path_objects.PathItem.from_attrs(subpaths=[vertices]))
+        digest.layers.append(layer)
+    return digest
+
+def summarize(digest):
+    """ Layers, layer properties and vertices of a digest """
+    return [(layer.name, layer.props.delay, layer.props.pause,\
+        [[[round(value, 9) for value in vertex] for vertex in path.subpaths[0]]\
+        for path in layer.paths]) for layer in digest.layers]
+
+
+class LengthIndexTestCase(unittest.TestCase):
+
+    def test_crop_matches_digest_crop(self):
+        """ Indexed crop gives the same result as DocDigest.crop, at any distance """
+        digest = make_digest()
+        total = digest.length()
+        index = length_index.LengthIndex.from_digest(digest)
+        self.assertAlmostEqual(index.ends[-1], total)
+        distances = [0, 1e-7, total, total + 1] + [total * i / 97 for i in range(1, 97)]
+        distances += index.ends + [end + 0.0005 for end in index.ends]
+        for distance in distances:
+            expected = copy.deepcopy(digest)
+            expected.crop(distance)
+            indexed = length_index.IndexedDocDigest(copy.deepcopy(digest), index)
+            indexed.crop(distance)
+            self.assertEqual(summarize(indexed), summarize(expected), distance)
+
+    def test_string_round_trip(self):
+        """ Index survives storage as text, and still matches its digest """
+        digest = make_digest()
+        index = length_index.LengthIndex.from_digest(digest)
+        restored = length_index.LengthIndex.from_string(index.to_string())
+        self.assertTrue(restored.matches(digest))
+        for end, restored_end in zip(index.ends, restored.ends):
+            self.assertAlmostEqual(end, restored_end, places=6)
+        self.assertIsNone(length_index.LengthIndex.from_string("3:1,2;x y"))
+        self.assertIsNone(length_index.LengthIndex.from_string(None))
+
+    def test_mismatched_index_falls_back(self):
+        """ An index built for another digest is not used """
+        digest = make_digest(seed=1)
+        other_index = length_index.LengthIndex.from_digest(make_digest(seed=2))
+        self.assertFalse(other_index.matches(digest))
+        expected = copy.deepcopy(digest)
+        expected.crop(3.0)
+        indexed = length_index.IndexedDocDigest(copy.deepcopy(digest), other_index)
+        indexed.crop(3.0)
+        self.assertEqual(summarize(indexed), summarize(expected))
+
+    def test_signature_covers_every_path(self):
+        """ Changing or reordering an inner path gives a different signature """
+        digest = make_digest()
+        index = length_index.LengthIndex.from_digest(digest)
+        reordered = copy.deepcopy(digest)
+        paths = reordered.layers[1].paths
+        paths[2], paths[4] = paths[4], paths[2]
+        changed = copy.deepcopy(digest)
+        changed.layers[1].paths[3].subpaths[0].insert(1, [9.0, 9.0])
+        for other in (reordered, changed):
+            self.assertFalse(index.matches(other))
+
+    def test_built_on_crop(self):
+        """ Without a saved index, the index is built when the digest is cropped """
+        digest = make_digest()
+        indexed = length_index.IndexedDocDigest(copy.deepcopy(digest))
+        self.assertIsNone(indexed.length_index)
+        indexed.crop(0)
+        self.assertIsNone(indexed.length_index)
+        indexed.crop(3.0)
+        self.assertTrue(indexed.length_index.matches(digest))
+        expected = copy.deepcopy(digest)
+        expected.crop(3.0)
+        self.assertEqual(summarize(indexed), summarize(expected))
@@ -0,0 +1,61 @@
+import math
+import unittest
+
+from pyaxidraw import axidraw
+from pyaxidraw import lightburn
+
+# python -m unittest discover in top-level package dir
+
+PROJECT = 'test/assets/LightBurn_shapes.lbrn2'
+
+
+def to_mm(vertex_list):
+    return [[round(25.4 * value, 4) for value in vertex] for vertex in vertex_list]
+
+
+class LightBurnTestCase(unittest.TestCase):
+
+    def test_vertices(self):
+        """ Control points are present only if both coordinates are given """
+        vertices = lightburn.parse_vertices("V1 2c0x3c0y4c1x1V5 -6.5c0x1c1x7c1y8S")
+        self.assertEqual(vertices, [([1, 2], [3, 4], None), ([5, -6.5], None, [7, 8])])
+        self.assertEqual(lightburn.parse_primitives("B0 1L1 2", 3), [("B", 0, 1), ("L", 1, 2)])
+        self.assertEqual(lightburn.parse_primitives("LineClosed", 3),\
+            [("L", 0, 1), ("L", 1, 2), ("L", 2, 0)])
+
+    def test_read_project(self):
+        """ Cut layers become layers, by priority; non-output layers only set the page """
+        digest = lightburn.read_project(PROJECT)
+        self.assertAlmostEqual(digest.width, 100 / 25.4)
+        self.assertAlmostEqual(digest.height, 50 / 25.4)
+        self.assertEqual([layer.compose_name() for layer in digest.layers],\
+            ["2 First", "0 Outline"])
+        lines = [to_mm(path.subpaths[0]) for path in digest.layers[0].paths]
+        self.assertEqual(lines, [[[60, 40], [90, 10]], [[60, 30], [90, 0]]]) # Y down; shared
+        circle = digest.layers[1].paths[0].subpaths[0]
+        self.assertGreater(len(circle), 16)
+        for v_x, v_y in to_mm(circle):
+            self.assertAlmostEqual(math.hypot(v_x - 20, v_y - 25), 10, delta=0.1)
+
+    def test_plot_project(self):
+        """ plot_setup reads a project straight into a digest, for each plot """
+        ad = axidraw.AxiDraw()
+        ad.plot_setup(PROJECT)
+        ad.options.preview = True
+        ad.plot_run()
+        self.assertAlmostEqual(ad.distance_pendown, (2 * 30 * 2 ** 0.5 + 20 * math.pi) / 1000,\
+            places=3)
+        ad.options.mode = "layers"
+        ad.options.layer = 0
+        ad.plot_run()
+        self.assertAlmostEqual(ad.distance_pendown, 20 * math.pi / 1000, places=3)
+        self.assertEqual(len(ad.imported_digest.layers), 2) # Not changed by plotting
+
+    def test_import_project(self):
+        """ import_project gives a compact digest and a page-sized stand-in document """
+        digest, document = lightburn.import_project(PROJECT)
+        self.assertIsInstance(digest.layers[0].paths[0], lightburn.compact_paths.CompactPathItem)
+        self.assertEqual(document.getroot().get('viewBox'),\
+            f"0 0 {digest.width:f} {digest.height:f}")
+        with self.assertLogs(lightburn.logger, "ERROR"), self.assertRaises(RuntimeError):
+            lightburn.import_project('test/assets/missing.lbrn2')
@@ -0,0 +1,41 @@
+import math
+import os
+import sys
+import unittest
+
+from pyaxidraw import estimate
+
+MY_ART_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(\
+    os.path.abspath(__file__)))), '_my_art')
+
+# python -m unittest discover in top-level package dir
+
+@unittest.skipIf(estimate.np is None, "requires NumPy")
+class NautilusTestCase(unittest.TestCase):
+
+    def setUp(self):
+        if MY_ART_DIR not in sys.path:
+            sys.path.append(MY_ART_DIR)
+        import bench_nautilus # pylint: disable=import-outside-toplevel, import-error
+        import nautilus # pylint: disable=import-outside-toplevel, import-error
+        self.bench_nautilus = bench_nautilus
+        self.nautilus = nautilus
+
+    def test_same_as_reference(self):
+        """ The vectorized generator gives exactly the output of the original """
+        cases = self.bench_nautilus.CASES + [(0, 0, 100, 100, 1, 0.15, 0.9, 1000, 4 * math.pi,\
+            0.3, 7)]
+        for case in cases:
+            with self.subTest(num_points=case[7]):
+                expected = self.bench_nautilus.reference_nautilus_with_crossbeams(*case)
+                result = self.nautilus.generate_nautilus_with_crossbeams(*case)
+                self.assertGreater(len(result['crossbeams']), 1)
+                self.assertEqual(result, expected)
+
+    def test_select_beams(self):
+        """ Each beam is at least its own length from the last one """
+        np = estimate.np
+        inner = np.column_stack((np.arange(10.0), np.zeros(10)))
+        beams = self.nautilus.select_beams(inner, np.full(10, 2.5), window=2)
+        self.assertEqual(beams.tolist(), [0, 3, 6, 9])
+        self.assertEqual(self.nautilus.select_beams(inner[:0], np.zeros(0)).tolist(), [])
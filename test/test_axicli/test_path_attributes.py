@@ -0,0 +1,77 @@
+import unittest
+
+from mock import patch
+
+from axidrawinternal import motion
+
+from pyaxidraw import axidraw
+from pyaxidraw import journal
+from pyaxidraw import path_attributes
+
+from test.test_axicli.test_replay import fake_connect
+
+# python -m unittest discover in top-level package dir
+
+
+class PathAttributesTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.ad = axidraw.AxiDraw()
+        self.ad.interactive()
+        for patcher in (patch.object(axidraw.AxiDraw, "serial_connect", fake_connect),\
+                patch.object(axidraw.AxiDraw, "pause_check"), patch("time.sleep")):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.assertTrue(self.ad.connect())
+        self.ad.connected = True
+
+    def _draw(self, path_list):
+        ''' Plot path_list; return (speed, accel, pen-down height) as planned for each path '''
+        planned = []
+        trajectory = motion.trajectory
+        def record(ad_ref, vertex_list, *args):
+            planned.append((ad_ref.speed_pendown, ad_ref.options.accel,\
+                ad_ref.pen.heights.pen_pos_down))
+            return trajectory(ad_ref, vertex_list, *args)
+        with patch.object(motion, "trajectory", record):
+            self.ad.draw_paths(path_list)
+        return planned
+
+    def test_split_path(self):
+        """ Paths are vertex lists, or dictionaries of vertices and attributes """
+        vertices = [[0, 0], [1, 1]]
+        self.assertEqual(path_attributes.split_path(vertices), (vertices, {}))
+        self.assertEqual(path_attributes.split_path({'vertices': vertices, 'accel': 500,\
+            'speed_pendown': None}), (vertices, {'accel': 110}))
+        with self.assertRaises(ValueError):
+            path_attributes.split_path({'vertices': vertices, 'speed': 10})
+
+    def test_attributes_per_path(self):
+        """ Attributes apply to their own path only, and options are restored after """
+        default = (self.ad.speed_pendown, self.ad.options.accel, self.ad.options.pen_pos_down)
+        planned = self._draw([[[1, 1], [2, 2]],\
+            {'vertices': [[2, 2], [3, 1]], 'speed_pendown': 10, 'accel': 30, 'pen_pos_down': 20},\
+            [[3, 1], [4, 4]]])
+        self.assertEqual(planned[0], default)
+        self.assertAlmostEqual(planned[1][0], default[0] * 10 / self.ad.options.speed_pendown)
+        self.assertEqual(planned[1][1:], (30, 20))
+        self.assertEqual(planned[2], default)
+        self.assertEqual((self.ad.speed_pendown, self.ad.options.accel,\
+            self.ad.pen.heights.pen_pos_down), default)
+
+    def test_height_sent_as_one_command(self):
+        """ A pen-down height attribute sends only the new pen-down position """
+        port = self.ad.plot_status.port
+        port.write.reset_mock()
+        self.ad.draw_path([[1, 1], [2, 2]], pen_pos_down=20)
+        sent = [call.args[0] for call in port.write.call_args_list]
+        self.assertEqual(len([command for command in sent if command.startswith(b'SC,')]), 2)
+        self.assertEqual(self.ad.update_stats.full_servo_inits, 0)
+
+    def test_fingerprint(self):
+        """ Journal fingerprints depend on path attributes, if any """
+        vertices = [[0, 0], [1, 1]]
+        self.assertEqual(journal.fingerprint([vertices]),\
+            journal.fingerprint([{'vertices': vertices}]))
+        self.assertNotEqual(journal.fingerprint([vertices]),\
+            journal.fingerprint([{'vertices': vertices, 'accel': 20}]))
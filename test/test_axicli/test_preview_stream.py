@@ -0,0 +1,86 @@
+import os
+import re
+import struct
+import tempfile
+import unittest
+
+from lxml import etree
+
+from pyaxidraw import axidraw
+from pyaxidraw import preview_stream
+
+from test.test_axicli.test_estimate import spiral_svg
+
+# python -m unittest discover in top-level package dir
+
+SVG_NS = '{http://www.w3.org/2000/svg}'
+
+
+def _numbers(path_data):
+    return re.findall(r'[-\d.]+', path_data)
+
+
+class PreviewStreamTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def _preview(self, rendering, preview_file=None):
+        ad = axidraw.AxiDraw()
+        ad.plot_setup(spiral_svg())
+        ad.options.preview = True
+        ad.options.rendering = rendering
+        ad.preview_file = preview_file
+        ad.plot_run()
+        return ad
+
+    def test_svg_stream_matches_document_preview(self):
+        """ rendering 4 streams the same pen-down path data to the preview file """
+        standard = etree.fromstring(self._preview(3).get_output().encode())
+        pd_data = [node.get('d') for node in standard.iter(SVG_NS + 'path')\
+            if 'pen-down' in str(node.attrib)]
+
+        file_name = os.path.join(self.tempdir.name, 'preview.svg')
+        ad = self._preview(4, file_name)
+        stream = etree.parse(file_name).getroot()
+        layers = stream.findall(SVG_NS + 'g')
+        self.assertEqual(len(layers), 2) # Pen-up and pen-down layers
+        self.assertGreater(len(layers[0]), 0)
+        self.assertEqual(_numbers(pd_data[0]),\
+            _numbers("".join(node.get('d') for node in layers[1])))
+        self.assertNotIn('% Preview', ad.get_output()) # Nothing rendered into the document
+        self.assertIsNone(ad.preview.writer)
+
+    def test_svg_chunks(self):
+        """ Path data is written out in chunks of bounded size """
+        file_name = os.path.join(self.tempdir.name, 'preview.svg')
+        writer = preview_stream.SvgPreviewWriter(file_name, 2, 1, ('red', 'blue'), chunk_size=3)
+        for index in range(10):
+            writer.move(False, index, 0, index + 1, 0, index == 0, 0)
+            self.assertLessEqual(len(writer._buffers[1]), 3)
+        writer.close()
+        layers = etree.parse(file_name).getroot().findall(SVG_NS + 'g')
+        numbers = _numbers("".join(node.get('d') for node in layers[1]))
+        self.assertEqual(numbers[:2], ['0.000', '0.000'])
+        self.assertEqual(numbers[-2:], ['10.000', '0.000'])
+        self.assertGreater(len(layers[1]), 1)
+
+    @unittest.skipIf(preview_stream.np is None, "requires NumPy")
+    def test_png(self):
+        """ rendering 5 writes a PNG image of the page """
+        file_name = os.path.join(self.tempdir.name, 'preview.png')
+        ad = self._preview(5, file_name)
+        with open(file_name, 'rb') as png_file:
+            header = png_file.read(24)
+        self.assertEqual(header[:8], b'\x89PNG\r\n\x1a\n')
+        width, height = struct.unpack('>II', header[16:24])
+        self.assertAlmostEqual(width / height, ad.svg_width / ad.svg_height, delta=0.01)
+
+    def test_no_preview_file(self):
+        """ Without a preview file, rendering 4 renders all movement into the document """
+        output = self._preview(4).get_output()
+        self.assertIn('pen-down drawing', output)
+        self.assertIn('pen-up transit', output)
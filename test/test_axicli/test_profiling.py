@@ -0,0 +1,108 @@
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+import unittest
+
+from mock import patch
+
+from pyaxidraw import axidraw
+from pyaxidraw import profiling
+
+from test.test_axicli.test_estimate import spiral_svg
+
+# python -m unittest discover in top-level package dir
+
+class ProfilingTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def _profile(self, profile, **options):
+        ad = axidraw.AxiDraw()
+        ad.profile = profile
+        ad.plot_setup(spiral_svg())
+        ad.options.preview = True
+        for name, value in options.items():
+            setattr(ad.options, name, value)
+        ad.plot_run(True)
+        return ad
+
+    def test_phases(self):
+        """ Each phase of plot_setup and plot_run is timed, with peak memory """
+        report = self._profile(True, reordering=2).profile_report
+        for name in ("parse", "digest", "clip", "optimize", "reorder", "simplify", "planning",\
+                "dripfeed", "render", "output"):
+            self.assertIn(name, report["phases"])
+            self.assertGreater(report["phases"][name]["peak_memory"], 0)
+        self.assertEqual(report["phases"]["parse"]["calls"], 1)
+        self.assertEqual(report["phases"]["digest"]["calls"], 1)
+        self.assertNotIn("hidden_lines", report["phases"])
+        phase_time = sum(phase["time_s"] for phase in report["phases"].values())
+        self.assertAlmostEqual(phase_time + report["other_s"], report["total_s"], places=4)
+        self.assertGreaterEqual(report["peak_memory"],\
+            max(phase["peak_memory"] for phase in report["phases"].values()))
+
+    def test_hidden_lines(self):
+        """ With hiding, hidden-line removal is timed apart from digest and clipping """
+        try:
+            import pyclipper # pylint: disable=import-outside-toplevel, unused-import
+        except ImportError:
+            self.skipTest("requires pyclipper")
+        report = self._profile(True, hiding=True).profile_report
+        for name in ("digest", "hidden_lines", "optimize"):
+            self.assertEqual(report["phases"][name]["calls"], 1)
+        self.assertNotIn("clip", report["phases"])
+
+    def test_reset_peak_fallback(self):
+        """ Without tracemalloc.reset_peak (Python 3.8), phases are still measured """
+        with patch.object(profiling, "tracemalloc", wraps=tracemalloc) as m_tracemalloc:
+            del m_tracemalloc.reset_peak
+            report = self._profile(True).profile_report
+        self.assertFalse(tracemalloc.is_tracing())
+        self.assertGreater(report["phases"]["planning"]["peak_memory"], 0)
+
+    def test_instance_only(self):
+        """ Only the profiled instance is instrumented, and only while profiling """
+        ad = axidraw.AxiDraw()
+        other = axidraw.AxiDraw()
+        profiler = profiling.Profiler(memory=False)
+        with profiler.instrument(ad):
+            self.assertIn("_feed", vars(ad))
+            self.assertNotIn("_feed", vars(other))
+            self.assertIs(axidraw.AxiDraw._feed, vars(axidraw.AxiDraw)["_feed"])
+        self.assertNotIn("_feed", vars(ad))
+        self.assertNotIn("render", vars(ad.preview))
+        other.plot_setup(spiral_svg())
+        other.options.preview = True
+        with profiler.instrument(ad):
+            other.plot_run()
+        self.assertEqual(profiler.phases, {})
+
+    def test_nested_phases(self):
+        """ Time in a nested phase is not counted in the phase around it """
+        profiler = profiling.Profiler(memory=False)
+        with profiler.session():
+            with profiler.phase("digest"):
+                with profiler.phase("simplify"):
+                    time.sleep(0.02)
+        self.assertLess(profiler.phases["digest"][1], 0.01)
+        self.assertGreaterEqual(profiler.phases["simplify"][1], 0.02)
+        self.assertEqual(profiler.phases["digest"][0], 1)
+
+    def test_cprofile_dumps(self):
+        """ With dump_dir, cProfile statistics are saved for each phase """
+        ad = self._profile(profiling.Profiler(memory=False, dump_dir=self.temp_dir))
+        report = ad.profile_report
+        self.assertNotIn("peak_memory", report)
+        self.assertEqual(set(report["profile_files"]), set(report["phases"]))
+        self.assertTrue(os.path.isfile(os.path.join(self.temp_dir, "planning.prof")))
+
+    def test_not_profiled(self):
+        """ Without profile set, there is no report """
+        ad = self._profile(False)
+        self.assertIsNone(ad.profile_report)
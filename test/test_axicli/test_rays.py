@@ -0,0 +1,38 @@
+import math
+import os
+import sys
+import unittest
+
+from pyaxidraw import estimate
+
+MY_ART_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(\
+    os.path.abspath(__file__)))), '_my_art')
+
+# python -m unittest discover in top-level package dir
+
+@unittest.skipIf(estimate.np is None, "requires NumPy")
+class RaysTestCase(unittest.TestCase):
+
+    def setUp(self):
+        if MY_ART_DIR not in sys.path:
+            sys.path.append(MY_ART_DIR)
+        import rays # pylint: disable=import-outside-toplevel, import-error
+        self.rays = rays
+
+    def test_bounces(self):
+        """ Bounce points are where the ray meets the walls, in order """
+        ray = self.rays.bounce_rays(0, 0, [math.atan2(1, 2)], (-1, -1, 1, 1), 3)[0]
+        expected = [[0, 0], [1, 0.5], [0, 1], [-1, 0.5]]
+        self.assertEqual(ray.shape, (4, 2))
+        for point, expected_point in zip(ray.tolist(), expected):
+            self.assertAlmostEqual(point[0], expected_point[0], places=9)
+            self.assertAlmostEqual(point[1], expected_point[1], places=9)
+
+    def test_corner(self):
+        """ A ray that hits a corner bounces back once, with no repeated vertex """
+        ray = self.rays.bounce_rays(0, 0, [math.pi / 4], (-1, -1, 1, 1), 3)[0]
+        expected = [[0, 0], [1, 1], [-1, -1], [1, 1]]
+        self.assertEqual(ray.shape, (4, 2))
+        for point, expected_point in zip(ray.tolist(), expected):
+            self.assertAlmostEqual(point[0], expected_point[0], places=9)
+            self.assertAlmostEqual(point[1], expected_point[1], places=9)
@@ -0,0 +1,107 @@
+import threading
+import unittest
+
+from mock import MagicMock, patch
+
+from axidrawinternal import dripfeed, motion, plot_optimizations
+
+from pyaxidraw import axidraw
+from pyaxidraw import replay
+
+from test.test_axicli.test_estimate import spiral_svg
+
+# python -m unittest discover in top-level package dir
+
+def fake_connect(ad_ref):
+    ''' Stand-in for serial_connect: a port that acknowledges every command '''
+    ad_ref.plot_status.port = MagicMock()
+    ad_ref.plot_status.port.readline.return_value = b'OK\r\n'
+    return True
+
+
+class ReplayTestCase(unittest.TestCase):
+
+    def _plot(self, copies, replay_copies=True, **options):
+        ''' Plot copies of the test document on a simulated AxiDraw; return the moves sent '''
+        moves = []
+        ad = axidraw.AxiDraw()
+        ad.plot_setup(spiral_svg())
+        ad.options.copies = copies
+        ad.options.page_delay = 0
+        for name, value in options.items():
+            setattr(ad.options, name, value)
+        ad.replay_copies = replay_copies
+        with patch.object(axidraw.AxiDraw, "serial_connect", fake_connect),\
+                patch.object(axidraw.AxiDraw, "pause_check"),\
+                patch.object(dripfeed.time, "sleep"),\
+                patch.object(dripfeed.ebb_motion, "doXYMove",\
+                    side_effect=lambda _port, *move: moves.append(move)),\
+                patch.object(motion, "trajectory", wraps=motion.trajectory) as m_trajectory:
+            ad.plot_run()
+        return ad, moves, m_trajectory.call_count
+
+    def test_replay_copies(self):
+        """ Later copies replay the first copy's plans, sending the same moves """
+        ad, moves, planned = self._plot(3)
+        _ad, moves_planned, planned_each = self._plot(3, replay_copies=False)
+        self.assertEqual(planned, planned_each // 3) # Only the first copy was planned
+        self.assertEqual(moves, moves_planned)
+        self.assertEqual(ad.pen_lifts, _ad.pen_lifts)
+        self.assertAlmostEqual(ad.distance_pendown, _ad.distance_pendown, places=9)
+        self.assertIsNone(ad._plan) # Released after plot_run
+
+    def test_single_copy_not_recorded(self):
+        """ Plans are not kept for a single copy """
+        with patch.object(replay.PlanCache, "begin") as m_begin:
+            self._plot(1)
+        m_begin.assert_not_called()
+
+    def test_random_start_prepared_during_delay(self):
+        """ With random start points, each next copy is randomized during the page delay """
+        threads = []
+        def randomize_start(digest, seed=None):
+            threads.append(threading.current_thread())
+            randomize(digest, seed)
+        randomize = plot_optimizations.randomize_start
+        with patch.object(plot_optimizations, "randomize_start", side_effect=randomize_start):
+            ad, _moves, planned = self._plot(3, random_start=True, page_delay=1)
+        self.assertEqual(len(threads), 3) # Once per copy
+        self.assertIs(threads[0], threading.main_thread())
+        self.assertNotIn(threading.main_thread(), threads[1:])
+        self.assertEqual(planned, 3 * 24) # Every copy is planned
+        self.assertEqual(ad.pen_lifts, 3 * 24)
+        self.assertIsNone(ad._next_copy)
+
+    def test_move_stream(self):
+        """ Move lists are stored compactly and rebuilt unchanged """
+        move_lists = [[['lower', None], ['SM', (3, -4, 12), [0.5, 0.25, False, 0.1]],\
+            ['SM', (1, 1, 2), [0.75, 0.5, False, 0.2]], ['raise', None]],\
+            None, [['SM', (-2, 0, 7), [0.0, 0.0, True, 0.3]]]]
+        stream = replay.MoveStream()
+        for move_list in move_lists:
+            stream.append(move_list)
+        self.assertEqual(len(stream), 3)
+        self.assertEqual([stream.moves(index) for index in range(3)],\
+            [move_lists[0], [], move_lists[2]])
+
+    def test_plan_cache(self):
+        """ A recording is replayed only if complete, and with the same key """
+        cache = replay.PlanCache()
+        cache.begin("key")
+        cache.record([['raise', None]])
+        cache.end(False) # Stopped
+        cache.begin("key")
+        self.assertFalse(cache.replaying)
+        cache.record([['raise', None]])
+        cache.end(True)
+        cache.begin("other key")
+        self.assertFalse(cache.replaying)
+        cache.record([['lower', None]])
+        cache.end(True)
+        cache.begin("other key")
+        self.assertTrue(cache.replaying)
+        self.assertEqual(cache.next(), [['lower', None]])
+        self.assertIs(cache.next(), False) # More plans than recorded
+        self.assertFalse(cache.replaying)
+        cache.end(True)
+        self.assertFalse(cache.complete)
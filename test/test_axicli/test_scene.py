@@ -0,0 +1,55 @@
+import os
+import sys
+import unittest
+
+from pyaxidraw import estimate
+
+MY_ART_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(\
+    os.path.abspath(__file__)))), '_my_art')
+
+# python -m unittest discover in top-level package dir
+
+@unittest.skipIf(estimate.np is None, "requires NumPy")
+class SceneTestCase(unittest.TestCase):
+
+    def setUp(self):
+        if MY_ART_DIR not in sys.path:
+            sys.path.append(MY_ART_DIR)
+        import scene # pylint: disable=import-outside-toplevel, import-error
+        self.scene = scene
+
+    def _scene(self):
+        """ Scene with interleaved tools, in an order that wastes travel """
+        composition = self.scene.Scene(home=(0, 0))
+        composition.add('red', [[(50, 0), (60, 0)]], 'far')
+        composition.add('blue', [[(5, 5), (5, 10)]], 'blue')
+        composition.add('red', [[(20, 0), (10, 0)]], 'reversed')
+        composition.add('red', [[(1, 1), (2, 2)], [(3, 3), (4, 4)]], 'near')
+        composition.add('blue', [[(0, 0)]], 'empty') # No strokes; not registered
+        return composition
+
+    def test_grouped_by_tool(self):
+        """ One group per tool, in the order first registered """
+        plan = self._scene().schedule()
+        self.assertEqual([tool for tool, _elements in plan], ['red', 'blue'])
+        self.assertEqual([[element.name for element in elements] for _tool, elements in plan],\
+            [['near', 'reversed', 'far'], ['blue']])
+        self.assertTrue(all(element.tool == tool for tool, elements in plan\
+            for element in elements))
+
+    def test_nearest_neighbour_order(self):
+        """ Elements are ordered to cut travel, and reversed when their end is closer """
+        composition = self._scene()
+        plan = composition.schedule()
+        red = plan[0][1]
+        self.assertEqual(red[1].start(), (10, 0)) # Painted backwards
+        self.assertEqual(red[2].start(), (50, 0))
+        scheduled = composition.estimate(plan)
+        unscheduled = composition.estimate(None)
+        self.assertEqual(scheduled['tool_changes'], 1)
+        self.assertEqual(unscheduled['tool_changes'], 3)
+        self.assertAlmostEqual(scheduled['pendown_distance'], unscheduled['pendown_distance'])
+        self.assertLess(scheduled['travel_distance'], unscheduled['travel_distance'])
+        reordered = composition.estimate(plan[::-1]) # Group order does not change the cost
+        self.assertAlmostEqual(reordered['travel_distance'], scheduled['travel_distance'])
+        self.assertAlmostEqual(reordered['time'], scheduled['time'])
@@ -0,0 +1,56 @@
+import unittest
+
+from mock import patch
+
+from pyaxidraw import axidraw
+from pyaxidraw import simplify
+
+from test.test_axicli.test_estimate import spiral_svg
+
+# python -m unittest discover in top-level package dir
+
+class SimplifyTestCase(unittest.TestCase):
+
+    def test_collinear_vertices_removed(self):
+        """ Vertices along a straight line are removed; endpoints are kept """
+        vertices = [[0.01 * i, 0.0] for i in range(101)]
+        self.assertEqual(simplify.simplify_polyline(vertices, 0.001), [[0.0, 0.0], [1.0, 0.0]])
+
+    def test_turning_points_kept(self):
+        """ A path that doubles back on itself keeps its turning point """
+        vertices = [[0, 0], [1, 0], [2, 0], [1, 0], [0.5, 0]]
+        self.assertEqual(simplify.simplify_polyline(vertices, 0.01),
+            [[0, 0], [2, 0], [0.5, 0]])
+
+    def test_closed_path_kept(self):
+        """ Corners of a closed square are not removed """
+        square = [[0, 0], [1, 0], [1, 1], [0, 1], [0, 0]]
+        self.assertEqual(simplify.simplify_polyline(square, 0.01), square)
+
+    def test_pure_python_matches_numpy(self):
+        """ The fallback without NumPy gives the same result """
+        vertices = [[i * 0.01, (i % 7) * 0.0001 + (i // 50) * 0.02] for i in range(300)]
+        expected = simplify.simplify_polyline(vertices, 0.0005)
+        with patch.object(simplify, "np", None):
+            self.assertEqual(simplify.simplify_polyline(vertices, 0.0005), expected)
+
+    def test_stats(self):
+        """ Time saved scales planning time per vertex by vertices removed """
+        stats = simplify.SimplifyStats()
+        stats.add_counts(1000, 100)
+        stats.planned_vertices = 100
+        stats.planning_time = 0.5
+        self.assertEqual(stats.vertices_removed, 900)
+        self.assertAlmostEqual(stats.time_saved, 4.5)
+
+    def test_off_by_default(self):
+        """ Plots are not simplified unless simplify_tolerance is set """
+        ad = axidraw.AxiDraw()
+        ad.plot_setup(spiral_svg())
+        ad.options.preview = True
+        ad.plot_run()
+        self.assertEqual(ad.get_simplify_tolerance(), 0)
+        self.assertGreater(ad.simplify_stats.vertices_in, 0)
+        self.assertEqual(ad.simplify_stats.vertices_removed, 0)
+        ad.simplify_tolerance = None
+        self.assertEqual(ad.get_simplify_tolerance(), ad.params.max_step_dist_hr)
@@ -0,0 +1,113 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from mock import MagicMock, patch
+
+from pyaxidraw import axidraw
+from pyaxidraw import telemetry
+
+from test.test_axicli.test_estimate import spiral_svg
+
+# python -m unittest discover in top-level package dir
+
+class TelemetryTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.file_name = os.path.join(self.temp_dir, "telemetry.jsonl")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_preview_events(self):
+        """ A preview reports start, one event per path, and end, to callback and file """
+        events = []
+        ad = axidraw.AxiDraw()
+        ad.plot_setup(spiral_svg())
+        ad.options.preview = True
+        ad.telemetry_callback = events.append
+        ad.telemetry_file = self.file_name
+        ad.plot_run()
+
+        self.assertEqual(events[0]["event"], "start")
+        self.assertEqual(events[-1]["event"], "end")
+        paths = [event for event in events if event["event"] == "path"]
+        self.assertEqual(len(paths), events[0]["paths"])
+        self.assertTrue(all(event["sm_moves"] > 0 and event["write_ms"] == 0 for event in paths))
+        self.assertEqual(events[-1]["pen_lifts"], ad.pen_lifts)
+        self.assertAlmostEqual(0.0254 * events[-1]["distance_total"], ad.distance_total, places=3)
+        self.assertEqual(events[-1]["eta_s"], 0)
+        if telemetry.estimate.np is not None: # Planned time matches the simulated time
+            self.assertAlmostEqual(events[0]["planned_total_s"] / events[-1]["planned_s"], 1,\
+                delta=0.02)
+            self.assertAlmostEqual(paths[-1]["elapsed_s"] / paths[-1]["planned_s"], 1,\
+                delta=0.02)
+        with open(self.file_name, encoding="utf-8") as telemetry_file:
+            self.assertEqual([json.loads(line) for line in telemetry_file], events)
+        self.assertIsNone(ad._telemetry) # File closed after plot_run
+
+    def test_no_telemetry_by_default(self):
+        """ Without a callback or file, plotting is unchanged """
+        ad = axidraw.AxiDraw()
+        ad.plot_setup(spiral_svg())
+        ad.options.preview = True
+        with patch.object(telemetry.Telemetry, "measure_sm") as m_measure:
+            ad.plot_run()
+        m_measure.assert_not_called()
+        self.assertGreater(ad.time_estimate, 0)
+
+    def test_feed_sm_installed_while_active(self):
+        """ dripfeed.feed_sm is swapped only while a session is active, then restored """
+        original = telemetry.dripfeed.feed_sm
+        self.assertIs(original, telemetry._unmeasured_feed_sm)
+        ad_ref = MagicMock()
+        first = telemetry.Telemetry()
+        second = telemetry.Telemetry()
+        first.begin(ad_ref, None, "plot")
+        second.begin(ad_ref, None, "batch")
+        first.begin(ad_ref, None, "plot") # Counted once per session
+        self.assertIs(telemetry.dripfeed.feed_sm, telemetry.feed_sm)
+        first.end(ad_ref)
+        first.close()
+        self.assertIs(telemetry.dripfeed.feed_sm, telemetry.feed_sm)
+        second.close()
+        self.assertIs(telemetry.dripfeed.feed_sm, original)
+
+        ad = axidraw.AxiDraw()
+        ad.plot_setup(spiral_svg())
+        ad.options.preview = True
+        ad.telemetry_callback = lambda event: self.assertIs(telemetry.dripfeed.feed_sm,\
+            telemetry.feed_sm)
+        ad.plot_run()
+        self.assertIs(telemetry.dripfeed.feed_sm, original)
+
+    def test_stalls(self):
+        """ Commands sent after the previous move has finished are counted as stalls """
+        ad_ref = MagicMock()
+        ad_ref.options.preview = False
+        ad_ref.options.mode = "plot"
+        ad_ref.plot_status.stopped = 0
+        ad_ref.pen.status.lifts = 0
+        ad_ref.pen.heights.times.raise_time = 0
+        ad_ref.pen.heights.times.lower_time = 0
+        ad_ref.pause_check.side_effect = lambda: time.sleep(0.005) # Slow host
+        events = []
+        test_telemetry = telemetry.Telemetry(events.append)
+        test_telemetry.begin(ad_ref, None, "plot")
+        test_telemetry.start_path(ad_ref)
+        ad_ref._telemetry = test_telemetry
+        try:
+            with patch.object(telemetry, "_unmeasured_feed_sm") as m_feed_sm:
+                telemetry.dripfeed.feed(ad_ref, [['SM', (10, 10, 1), None]] * 4)
+            self.assertEqual(m_feed_sm.call_count, 4)
+            test_telemetry.end_path(ad_ref, 0.001)
+        finally:
+            test_telemetry.close()
+        self.assertEqual(events[0]["sm_moves"], 4)
+        self.assertEqual(events[0]["stalls"], 3)
+        self.assertGreater(events[0]["stall_ms"], 6)
+        self.assertEqual(events[0]["planned_s"], 0.004)
@@ -0,0 +1,71 @@
+import unittest
+
+from pyaxidraw import axidraw
+from pyaxidraw import fleet
+from pyaxidraw import tiling
+
+from test.test_axicli.test_estimate import spiral_svg
+
+# python -m unittest discover in top-level package dir
+
+
+def large_svg():
+    ''' The spiral document, scaled up to 500 x 300 mm: larger than the travel of model 1 '''
+    return spiral_svg().replace('width="150mm" height="120mm"', 'width="500mm" height="300mm"')
+
+
+class TilingTestCase(unittest.TestCase):
+
+    def test_grid(self):
+        """ Tiles step by the travel less the overlap, and cover the whole length """
+        self.assertEqual(tiling.grid(5, 10, 1), [0.0])
+        self.assertEqual(tiling.grid(19, 10, 1), [0, 9])
+        self.assertEqual(tiling.grid(19.5, 10, 1), [0, 9, 18])
+
+    def test_tiles_within_travel(self):
+        """ Each tile fits the travel of the model; all of its paths lie inside it """
+        tiles = tiling.tile_document(large_svg(), model=1, overlap=0.5, marks=False)
+        self.assertEqual([(tile.row, tile.col) for tile in tiles], [(0, 0), (0, 1), (1, 0), (1, 1)])
+        self.assertAlmostEqual(tiles[1].x, 11.81 - 0.5)
+        self.assertAlmostEqual(tiles[2].y, 8.58 - 0.5)
+        self.assertAlmostEqual(tiles[3].x + tiles[3].width, 500 / 25.4)
+        for tile in tiles:
+            self.assertLessEqual(tile.width, 11.81 + 1e-6)
+            self.assertLessEqual(tile.height, 8.58 + 1e-6)
+            self.assertTrue(tile.digest.layers)
+            for layer in tile.digest.layers:
+                for path in layer.paths:
+                    for v_x, v_y in path.subpaths[0]:
+                        self.assertTrue(-1e-6 <= v_x <= tile.width + 1e-6)
+                        self.assertTrue(-1e-6 <= v_y <= tile.height + 1e-6)
+
+    def test_registration_marks(self):
+        """ Marks at each seam are drawn at the same place on the page on both tiles """
+        tiles = tiling.tile_document(large_svg(), model=1, overlap=0.5)
+        def marks(tile):
+            layer = tile.digest.layers[-1]
+            self.assertEqual(layer.name, tiling.REGISTRATION_LAYER)
+            return {(round(tile.x + path.subpaths[0][0][0], 6),\
+                round(tile.y + path.subpaths[0][0][1], 6)) for path in layer.paths}
+        seam = tiles[0].x + tiles[0].width - 0.25
+        shared = marks(tiles[0]) & marks(tiles[1])
+        self.assertTrue(shared)
+        for mark in shared:
+            self.assertLess(abs(mark[0] - seam), 0.25)
+
+    def test_tile_plots_as_plob(self):
+        """ A tile is a valid plob for its model, and a job that fits the model """
+        tile = tiling.tile_document(large_svg(), model=1)[1]
+        ad = axidraw.AxiDraw()
+        ad.plot_setup(tile.to_string())
+        ad.options.preview = True
+        ad.plot_run()
+        self.assertEqual(ad.plot_status.resume.new.plob_version, "1")
+        self.assertEqual(ad.plot_status.stopped, 0)
+        self.assertIsNotNone(fleet.estimate_job(tile.job(), 1))
+        self.assertIsNone(fleet.estimate_job(fleet.Job(large_svg()), 1))
+
+    def test_overlap_limits(self):
+        """ The overlap must be less than half of the travel """
+        with self.assertRaises(ValueError):
+            tiling.tile_document(large_svg(), model=1, overlap=5)
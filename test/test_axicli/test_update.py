@@ -0,0 +1,74 @@
+import unittest
+
+from mock import patch
+
+from pyaxidraw import axidraw
+
+from test.test_axicli.test_replay import fake_connect
+
+# python -m unittest discover in top-level package dir
+
+
+class UpdateTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.ad = axidraw.AxiDraw()
+        self.ad.interactive()
+        patcher = patch.object(axidraw.AxiDraw, "serial_connect", fake_connect)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        sleep_patcher = patch("time.sleep")
+        sleep_patcher.start()
+        self.addCleanup(sleep_patcher.stop)
+        self.assertTrue(self.ad.connect())
+        self.ad.connected = True
+
+    def _update(self):
+        ''' Call update(); return the commands sent '''
+        port = self.ad.plot_status.port
+        port.write.reset_mock()
+        self.ad.update()
+        return [call.args[0] for call in port.write.call_args_list]
+
+    def test_no_change(self):
+        """ Without changes, update() sends nothing """
+        self.assertEqual(self._update(), [])
+        self.assertEqual(self.ad.update_stats.updates, 1)
+        self.assertGreater(self.ad.update_stats.commands_skipped, 0)
+
+    def test_speed_change(self):
+        """ Speed and acceleration changes are applied locally, for planning """
+        old_speed = self.ad.speed_pendown
+        self.ad.options.speed_pendown = 10
+        self.ad.options.accel = 40
+        self.assertEqual(self._update(), [])
+        self.assertAlmostEqual(self.ad.speed_pendown, old_speed * 10 / 25)
+
+    def test_pen_down_height(self):
+        """ A new pen-down height takes one command, or two if the pen is down """
+        self.ad.options.pen_pos_down = 20
+        commands = self._update()
+        self.assertEqual(len(commands), 1)
+        self.assertTrue(commands[0].startswith(b'SC,5,'))
+        self.ad.pendown()
+        self.ad.options.pen_pos_down = 10
+        commands = self._update()
+        self.assertEqual(len(commands), 2)
+        self.assertTrue(commands[1].startswith(b'SP,0,'))
+        self.assertEqual(self.ad.pen.status.config[1], 10)
+
+    def test_full_reconfiguration(self):
+        """ A new pen-up height or resolution is applied in full """
+        self.ad.options.pen_pos_up = 70
+        self.assertIn(b'SC,8,8\r', self._update())
+        self.assertEqual(self.ad.update_stats.full_servo_inits, 1)
+        self.ad.options.resolution = 2
+        self.assertIn(b'EM,2,2\r', self._update())
+
+    def test_usb_command_forgets_settings(self):
+        """ After a low-level command, update() sends all settings again """
+        self.ad.usb_command("SC,5,1000\r")
+        commands = self._update()
+        self.assertIn(b'SC,5,' + str(self.ad.pen.sent['pen_down_pos']).encode() + b'\r',\
+            commands)
+        self.assertIn(b'EM,1,1\r', commands)